@@ -47,18 +47,24 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'members.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'members.middleware.ServerTimingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'members.middleware.BackendDeadlineMiddleware',
+    'members.middleware.BackendPrewarmMiddleware',
 ]
 
 ROOT_URLCONF = 'ampeli.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates com a renderização medida no Server-Timing
+        'BACKEND': 'members.server_timing.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,6 +77,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'ampeli.wsgi.application'
+ASGI_APPLICATION = 'ampeli.asgi.application'
+
+# Views assíncronas de membros/autenticação (perfil ASGI, ver gunicorn.conf.py)
+AMPELI_ASYNC_VIEWS = os.environ.get('AMPELI_ASYNC_VIEWS', 'False').lower() == 'true'
 
 
 # Database
@@ -147,6 +157,122 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/members/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Configurações do cliente HTTP da API do Ampeli
+# Pool de conexões keep-alive compartilhado pelas threads de cada worker
+AMPELI_API_POOL_CONNECTIONS = int(os.environ.get('AMPELI_API_POOL_CONNECTIONS', '4'))
+AMPELI_API_POOL_SIZE = int(os.environ.get('AMPELI_API_POOL_SIZE', '10'))
+AMPELI_API_POOL_BLOCK = os.environ.get('AMPELI_API_POOL_BLOCK', 'False').lower() == 'true'
+AMPELI_API_KEEP_ALIVE = os.environ.get('AMPELI_API_KEEP_ALIVE', 'True').lower() == 'true'
+# Conexões simultâneas do cliente assíncrono (um por event loop)
+AMPELI_API_ASYNC_MAX_CONNECTIONS = int(os.environ.get('AMPELI_API_ASYNC_MAX_CONNECTIONS', '100'))
+
+# Timeouts (conexão, leitura) em segundos por classe de endpoint. Os padrões
+# ficam em members.http_client.DEFAULT_TIMEOUTS; aqui entram só os ajustes,
+# ex.: {'recommendations': (3.05, 45)}
+AMPELI_API_TIMEOUTS = {}
+
+# Tempo máximo somando todas as chamadas ao backend feitas por uma view
+# (deve ficar abaixo do timeout do worker do gunicorn, 30s por padrão)
+AMPELI_API_REQUEST_BUDGET = float(os.environ.get('AMPELI_API_REQUEST_BUDGET', '20'))
+
+# Circuit breaker por classe de endpoint: após failure_threshold falhas seguidas
+# as chamadas falham na hora por reset_timeout segundos, e então uma única
+# requisição de sonda decide se o circuito fecha de novo
+AMPELI_API_CIRCUIT_BREAKER = {
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+    'GROUPS': {
+        'recommendations': {'failure_threshold': 3, 'reset_timeout': 60},
+    },
+}
+
+# Retry de falhas transitórias (conexão, timeout, 429/502/503/504) apenas para
+# GET/PUT/DELETE (POSTs nunca são repetidos), com backoff exponencial e jitter
+AMPELI_API_RETRY = {
+    'max_attempts': 3,
+    'base_delay': 0.25,
+    'max_delay': 4.0,
+    'max_retry_after': 10.0,
+    'budget_ratio': 0.2,
+    'budget_min_per_second': 1.0,
+    'budget_max_tokens': 20,
+}
+
+# Cache de leitura (TTL em segundos + limite de entradas LRU) por endpoint.
+# BACKEND 'members.shared_cache.SharedFileCache' compartilha o cache entre os
+# workers do gunicorn num arquivo SQLite (SHARED_PATH, padrão em .cache/ no
+# projeto; o diretório tem que ser privado): um worker busca a lista e os
+# outros leem a mesma versão
+AMPELI_API_CACHE = {
+    'ENABLED': os.environ.get('AMPELI_API_CACHE_ENABLED', 'True').lower() == 'true',
+    'BACKEND': os.environ.get('AMPELI_API_CACHE_BACKEND', 'members.cache.TTLLRUCache'),
+    'SHARED_PATH': os.environ.get('AMPELI_API_CACHE_PATH', ''),
+    'SHARED_LOCK_TIMEOUT': 10,
+    'NAMESPACES': {
+        # stale-while-revalidate: após o TTL serve a lista antiga e atualiza em
+        # segundo plano; após max_stale segundos a requisição espera o backend
+        'members': {'ttl': 60, 'max_entries': 4, 'stale_while_revalidate': True, 'max_stale': 900},
+        'member': {'ttl': 120, 'max_entries': 2000},
+        'member_email': {'ttl': 120, 'max_entries': 2000},
+        'members_page': {'ttl': 60, 'max_entries': 256},
+        'member_list_page': {'ttl': 60, 'max_entries': 512},
+        'faith_stage': {'ttl': 300, 'max_entries': 64},
+        'interest': {'ttl': 300, 'max_entries': 256},
+        'volunteer_area': {'ttl': 300, 'max_entries': 256},
+    },
+}
+
+# Filtros (status, search) e paginação (page, size) da lista de membros são
+# enviados ao backend; se ele os ignorar, a lista completa é filtrada localmente
+# e o suporte só é testado de novo após RECHECK segundos. MODE 'cursor' pagina
+# a lista por (nome, id) com cursores opacos, sem total; ?cursor= ou ?page= na
+# URL escolhem o modo por requisição
+AMPELI_API_BACKEND_PAGINATION = {
+    'ENABLED': os.environ.get('AMPELI_API_BACKEND_PAGINATION', 'True').lower() == 'true',
+    'PAGE_SIZE': 20,
+    'RECHECK': 300,
+    'MODE': os.environ.get('AMPELI_MEMBER_LIST_PAGINATION', 'page'),
+}
+
+# Snapshot em disco (JSON + gzip, com versão do formato) da última lista de
+# membros e dos detalhes buscados com sucesso. Na partida aquece o cache e,
+# com o backend fora do ar, as páginas mostram esses dados com a data da coleta.
+# PATH vazio usa .cache/ do projeto; para sobreviver a deploys ele tem que
+# apontar para um disco persistente
+AMPELI_API_SNAPSHOT = {
+    'ENABLED': os.environ.get('AMPELI_API_SNAPSHOT_ENABLED', 'False').lower() == 'true',
+    'PATH': os.environ.get('AMPELI_API_SNAPSHOT_PATH', ''),
+    'MIN_INTERVAL': 60,
+    'MAX_MEMBERS': 2000,
+}
+
+# Aquecimento do backend (plano gratuito do Render dorme após 15 min sem uso):
+# enquanto o site recebe tráfego, uma thread por processo pinga o backend em
+# intervalos adaptativos e para após IDLE_AFTER segundos sem requisições
+AMPELI_API_PREWARM = {
+    'ENABLED': os.environ.get('AMPELI_API_PREWARM_ENABLED', 'False').lower() == 'true',
+    'MIN_INTERVAL': 60,
+    'MAX_INTERVAL': 600,
+    'IDLE_AFTER': 1800,
+    'COLD_THRESHOLD': 2.0,
+}
+
+# Métricas no formato do Prometheus em /metrics. O coletor se autentica com
+# "Authorization: Bearer <TOKEN>"; sem TOKEN só usuários logados acessam
+AMPELI_METRICS = {
+    'TOKEN': os.environ.get('AMPELI_METRICS_TOKEN', ''),
+}
+
+# Cabeçalho Server-Timing (sessão, chamadas ao backend, renderização) para
+# diagnosticar páginas lentas pelo devtools. Sessões cujo e-mail está em
+# ADMIN_EMAILS sempre recebem; NON_ADMIN libera para as demais
+AMPELI_SERVER_TIMING = {
+    'ENABLED': os.environ.get('AMPELI_SERVER_TIMING_ENABLED', 'True').lower() == 'true',
+    'ADMIN_EMAILS': [email.strip() for email in os.environ.get('AMPELI_SERVER_TIMING_ADMINS', '').split(',') if email.strip()],
+    'NON_ADMIN': os.environ.get('AMPELI_SERVER_TIMING_NON_ADMIN', 'False').lower() == 'true',
+    'MAX_ENTRIES': 30,
+}
+
 # Logging configuration for production debugging
 LOGGING = {
     'version': 1,
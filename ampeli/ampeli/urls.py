@@ -14,9 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.urls import path, include
 from django.shortcuts import redirect
 from members.api_auth_views import APILoginView, APIRegisterView, api_logout_view
+from members.views import metrics
+
+if getattr(settings, 'AMPELI_ASYNC_VIEWS', False):
+    from members.async_views import AsyncAPILoginView as APILoginView, AsyncAPIRegisterView as APIRegisterView
 
 def redirect_to_members(request):
     return redirect('members:member_list')
@@ -24,6 +29,7 @@ def redirect_to_members(request):
 urlpatterns = [
     path('', redirect_to_members, name='home'),
     path('members/', include('members.urls')),
+    path('metrics', metrics, name='metrics'),
     
     # Authentication URLs (API-based)
     path('login/', APILoginView.as_view(), name='login'),
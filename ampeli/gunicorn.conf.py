@@ -0,0 +1,28 @@
+"""
+Configuração do gunicorn para o Ampeli.
+
+AMPELI_SERVER_PROFILE escolhe o perfil de implantação:
+
+- ``wsgi`` (padrão): workers síncronos, uma requisição por worker.
+- ``asgi``: workers uvicorn servindo ``ampeli.asgi`` com as views assíncronas
+  (AMPELI_ASYNC_VIEWS=True). Cada worker mantém centenas de chamadas ao
+  backend em andamento sem ocupar uma thread por requisição.
+"""
+
+import os
+
+profile = os.environ.get('AMPELI_SERVER_PROFILE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 20
+keepalive = 5
+
+if profile == 'asgi':
+    os.environ.setdefault('AMPELI_ASYNC_VIEWS', 'True')
+    wsgi_app = 'ampeli.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'ampeli.wsgi:application'
+    worker_class = 'sync'
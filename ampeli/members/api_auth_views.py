@@ -6,6 +6,9 @@ from django.views import View
 from .services import AmpeliAPIService
 from .forms import CustomAuthenticationForm, CustomUserCreationForm
 import json
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
 
 
 class APILoginView(View):
@@ -146,16 +149,48 @@ def api_logout_view(request):
     return redirect('members:login')
 
 
-def login_required_api(view_func):
-    """Decorator para verificar se usuário está logado via API"""
+def _session_required(view_func, anonymous_response):
+    """Executar a view só com usuário logado via API; senão devolver anonymous_response(request)"""
+    if iscoroutinefunction(view_func):
+        # Views assíncronas: a sessão é carregada sem bloquear o event loop
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if not await request.session.aget('api_user_id'):
+                return anonymous_response(request)
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+    
+    @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.session.get('api_user_id'):
-            messages.warning(request, 'Você precisa fazer login para acessar esta página.')
-            return redirect('members:login')
+            return anonymous_response(request)
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
+def _login_redirect(request):
+    messages.warning(request, 'Você precisa fazer login para acessar esta página.')
+    return redirect('members:login')
+
+
+def _unauthenticated_json(request):
+    return JsonResponse({
+        'success': False,
+        'error': 'NOT_AUTHENTICATED',
+        'message': 'Faça login para acessar esta API.'
+    }, status=401)
+
+
+def login_required_api(view_func):
+    """Decorator para verificar se usuário está logado via API"""
+    return _session_required(view_func, _login_redirect)
+
+
+def login_required_json(view_func):
+    """Como login_required_api, mas para endpoints JSON: 401 em JSON em vez de redirecionar ao login"""
+    return _session_required(view_func, _unauthenticated_json)
+
+
 @csrf_exempt
 def register_user_api(request):
     """API endpoint para registro de usuário"""
@@ -0,0 +1,739 @@
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+from .cache import EXPIRED, MISSING, STALE, cache_enabled, cache_options, entry_state, get_cache, is_fresh, off_loop
+from .filters import filter_members, matching_indices
+from .http_client import (
+    AmpeliAPIError, DeadlineExceeded, check_deadline_after_timeout, context_without_deadline, current_budget,
+    endpoint_group, parse_retry_after, remaining_time, request_timeout,
+)
+from .metrics import BackendCall
+from .pagination import (
+    backend_cursor, backend_pagination_enabled, decode_cursor, default_page_size, keyset_page, local_cursor,
+    local_members_page,
+)
+from .resilience import RETRYABLE_STATUS_CODES, get_breaker, retry_budget, retry_delay, retry_options
+from .roster import Roster, as_roster
+from .snapshot import load_snapshot, remember_member, remember_roster, snapshot_loaded
+from .services import SHARED_FETCH_POLL, AmpeliAPIService, build_roster_indexes, shared_fetch_deadline
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+class AsyncSingleFlight:
+    """Versão asyncio do SingleFlight: GETs idênticos simultâneos no event loop"""
+
+    # Totais do processo somando os event loops (exportados em /metrics); os de
+    # cada instância somem com o loop
+    totals = {'issued': 0, 'coalesced': 0}
+    _totals_lock = threading.Lock()
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def _count(self, outcome: str) -> None:
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        with self._totals_lock:
+            self.totals[outcome] += 1
+
+    async def do(self, key: Hashable, coro_fn):
+        task = self._calls.get(key)
+        if task is None:
+            self._count('issued')
+            # A chamada roda numa tarefa própria: o cancelamento de um dos
+            # interessados (cliente desconectado) não afeta os demais. Sem o
+            # orçamento de quem a iniciou: cada interessado espera até o próprio deadline
+            task = self._calls[key] = asyncio.get_running_loop().create_task(
+                coro_fn(), context=context_without_deadline()
+            )
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self._count('coalesced')
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining_time())
+        except asyncio.TimeoutError:
+            budget = current_budget()
+            if budget is not None:
+                budget.exhausted = True
+            raise DeadlineExceeded(f"Tempo limite da requisição esgotado aguardando {key}")
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Evita o aviso "exception was never retrieved" quando ninguém aguardava
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'issued': self.issued,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls),
+        }
+
+
+class _LoopState:
+    """Cliente HTTP e chamadas em andamento de um event loop"""
+
+    def __init__(self):
+        pool_size = getattr(settings, 'AMPELI_API_POOL_SIZE', 10)
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'AMPELI_API_ASYNC_MAX_CONNECTIONS', 100),
+                max_keepalive_connections=pool_size,
+            ),
+        )
+        self.flights = AsyncSingleFlight()
+        self.background_tasks = set()
+
+
+# Um cliente httpx por event loop: conexões de um loop não podem ser usadas em outro
+_loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+
+def _get_loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None or state.client.is_closed:
+        state = _loop_states[loop] = _LoopState()
+    return state
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono compartilhado pelo event loop atual"""
+    return _get_loop_state().client
+
+
+def async_flight_stats() -> Dict[str, int]:
+    """Chamadas do single-flight assíncrono somadas entre os event loops do processo"""
+    with AsyncSingleFlight._totals_lock:
+        stats = dict(AsyncSingleFlight.totals)
+    stats['in_flight'] = sum(len(state.flights._calls) for state in list(_loop_states.values()))
+    return stats
+
+
+async def close_async_client() -> None:
+    """Fechar o cliente do event loop atual (ex.: no shutdown do servidor ASGI)"""
+    state = _loop_states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+async def snapshot_off_loop(fn, *args, **kwargs):
+    """Como off_loop, mas sempre numa thread enquanto o snapshot não foi lido do disco
+
+    A primeira leitura abre o arquivo, descomprime o gzip e monta o Roster,
+    qualquer que seja o backend do cache.
+    """
+    if not snapshot_loaded():
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await off_loop(fn, *args, **kwargs)
+
+
+class AsyncAmpeliAPIService(AmpeliAPIService):
+    """Serviço assíncrono para integração com a API do Ampeli"""
+
+    async def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
+        """Método auxiliar para fazer requisições HTTP"""
+        url = f"{self.base_url}{endpoint}"
+
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise ValueError(f"Método HTTP não suportado: {method}")
+
+        headers = self.headers
+
+        if method == 'GET':
+            # GETs idênticos simultâneos no event loop compartilham uma só chamada
+            return await _get_loop_state().flights.do(
+                (method, url), lambda: self._send_with_retries(method, endpoint, url, data, headers)
+            )
+        return await self._send_with_retries(method, endpoint, url, data, headers)
+
+    async def _send_with_retries(self, method: str, endpoint: str, url: str, data: Dict, headers: Dict) -> Dict:
+        """Repetir falhas transitórias de chamadas idempotentes com backoff e jitter"""
+        options = retry_options()
+        retry_budget.deposit()
+
+        attempt = 1
+        while True:
+            try:
+                return await self._send(method, endpoint, url, data, headers)
+            except AmpeliAPIError as e:
+                delay = retry_delay(method, url, e, attempt, options)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _send(self, method: str, endpoint: str, url: str, data: Dict = None, headers: Dict = None) -> Dict:
+        """Executar a requisição HTTP no cliente compartilhado do event loop"""
+        with BackendCall(method, endpoint) as call:
+            group = endpoint_group(endpoint)
+            connect, read = request_timeout(group, url)
+
+            breaker = get_breaker(group)
+            breaker.before_call()
+
+            try:
+                response = await get_async_client().request(
+                    method,
+                    url,
+                    headers=headers or self.headers,
+                    json=data if method in ('POST', 'PUT') else None,
+                    timeout=httpx.Timeout(read, connect=connect),
+                )
+            except httpx.TimeoutException as e:
+                breaker.record_failure()
+                check_deadline_after_timeout()
+                raise AmpeliAPIError(f"Tempo esgotado na requisição para {url}: {str(e)}", retryable=True)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                raise AmpeliAPIError(f"Erro na requisição para {url}: {str(e)}", retryable=True)
+            except httpx.HTTPError as e:
+                breaker.record_failure()
+                raise AmpeliAPIError(f"Erro na requisição para {url}: {str(e)}")
+            except BaseException:
+                breaker.abandon()
+                raise
+
+            call.received(response.status_code, len(response.content))
+
+            # Erros 4xx indicam um backend saudável; apenas 5xx contam como falha
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            try:
+                response.raise_for_status()
+                return response.json() if response.content else {}
+            except (httpx.HTTPStatusError, ValueError) as e:
+                status_code = response.status_code if response.status_code >= 400 else None
+                raise AmpeliAPIError(
+                    f"Erro na requisição para {url}: {str(e)}",
+                    status_code=status_code,
+                    retryable=status_code in RETRYABLE_STATUS_CODES,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                )
+
+    async def _cached_get(self, namespace: str, endpoint: str, transform=None) -> Any:
+        """GET com leitura através do cache do namespace (TTL + LRU)
+
+        Com o SharedFileCache cada acesso ao cache roda numa thread (off_loop)
+        para não bloquear o event loop.
+        """
+        transform = transform or (lambda value: value)
+        if not cache_enabled():
+            return transform(await self._make_request('GET', endpoint))
+
+        cache = await off_loop(get_cache, namespace)
+        options = cache_options(namespace)
+        entry = await off_loop(cache.get_entry, endpoint)
+        state = entry_state(entry, options)
+        cache.record(hit=state != EXPIRED)
+        if state == STALE:
+            self._refresh_in_background(cache, endpoint, transform)
+        if state != EXPIRED:
+            return entry[0]
+
+        # Cache compartilhado entre workers: só um processo busca cada chave
+        shared = getattr(cache, 'shared', False)
+        owns_refresh = shared and await off_loop(cache.try_begin_refresh, endpoint)
+        if shared and not owns_refresh:
+            value, owns_refresh = await self._wait_for_shared_fetch(cache, endpoint, options['ttl'])
+            if value is not MISSING:
+                return value
+        try:
+            # Com a reserva em mãos, conferir de novo: outro worker pode ter gravado antes dela
+            entry = await off_loop(cache.get_entry, endpoint) if owns_refresh else None
+            if is_fresh(entry, options['ttl']):
+                return entry[0]
+            # Uma escrita durante a busca (write-through ou invalidação) prevalece
+            generation = await off_loop(lambda: cache.generation)
+            value = transform(await self._make_request('GET', endpoint))
+            await off_loop(cache.set, endpoint, value, generation=generation)
+            return value
+        finally:
+            if owns_refresh:
+                await off_loop(cache.end_refresh, endpoint)
+
+    async def _wait_for_shared_fetch(self, cache, endpoint: str, ttl: float) -> Tuple[Any, bool]:
+        """Aguardar a busca de outro worker: (valor, False), ou (MISSING, reservou)
+
+        Se o outro worker terminar sem gravar, a reserva da chave passa para este,
+        que busca segurando-a; com o tempo esgotado, (MISSING, False).
+        """
+        deadline = shared_fetch_deadline(cache)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(SHARED_FETCH_POLL)
+            entry = await off_loop(cache.get_entry, endpoint)
+            if is_fresh(entry, ttl):
+                return entry[0], False
+            if await off_loop(cache.try_begin_refresh, endpoint):
+                # O outro worker terminou (sem gravar, ou gravou após a última leitura):
+                # a reserva fica com este worker, que confere a entrada antes de buscar
+                return MISSING, True
+        return MISSING, False
+
+    def _refresh_in_background(self, cache, endpoint: str, transform) -> None:
+        """Atualizar a entrada numa tarefa do event loop, uma por chave"""
+
+        async def refresh():
+            if not await off_loop(cache.try_begin_refresh, endpoint):
+                return
+            try:
+                generation = await off_loop(lambda: cache.generation)
+                value = transform(await self._make_request('GET', endpoint))
+                # Construção dos índices (segundos para listas grandes) fora do event
+                # loop, qualquer que seja o backend do cache
+                await asyncio.to_thread(build_roster_indexes, value)
+                await off_loop(cache.set, endpoint, value, generation=generation)
+                logger.debug(f"Background refresh of {endpoint} completed")
+            except Exception as e:
+                logger.warning(f"Background refresh of {endpoint} failed: {str(e)}")
+            finally:
+                await off_loop(cache.end_refresh, endpoint)
+
+        tasks = _get_loop_state().background_tasks
+        # Contexto vazio, como a thread da versão síncrona: a atualização não é
+        # limitada pelo deadline da requisição que a disparou nem entra no Server-Timing dela
+        task = asyncio.get_running_loop().create_task(refresh(), context=contextvars.Context())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # ==================== AUTENTICAÇÃO ====================
+
+    async def register_user(self, name: str, email: str, password: str, phone: str = None) -> Dict:
+        """Registrar novo usuário com tratamento de erros"""
+        try:
+            error = self._validate_registration(name, email, password)
+            if error:
+                return error
+
+            data = {
+                "name": name,
+                "email": email,
+                "password": password
+            }
+            if phone:
+                data["phone"] = phone
+
+            logger.info(f"Registering user on: {self.base_url}/auth/register")
+            result = await self._make_request('POST', '/auth/register', data)
+            return {
+                'success': True,
+                'user': result.get('user', {}),
+                'token': result.get('token', ''),
+                'message': 'Usuário registrado com sucesso'
+            }
+        except Exception as e:
+            return self._registration_error(str(e))
+
+    async def login_user(self, email: str, password: str) -> Dict:
+        """Login de usuário com tratamento de erros"""
+        try:
+            error = self._validate_login(email, password)
+            if error:
+                return error
+
+            data = {
+                "email": email,
+                "password": password
+            }
+
+            result = await self._make_request('POST', '/auth/login', data)
+            return {
+                'success': True,
+                'user': result.get('user', {}),
+                'token': result.get('token', ''),
+                'message': 'Login realizado com sucesso'
+            }
+        except Exception as e:
+            return self._login_error(str(e))
+
+    async def check_user_status(self, user_id: int) -> Dict:
+        """Verificar status do usuário"""
+        try:
+            logger.info(f"Checking user status for ID: {user_id}")
+            return await self._make_request('GET', f'/auth/status/{user_id}')
+        except Exception as e:
+            logger.error(f"Error checking user status: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao verificar status do usuário'
+            }
+
+    async def check_email_availability(self, email: str) -> bool:
+        """Verificar disponibilidade do email"""
+        try:
+            result = await self._make_request('GET', f'/auth/check-email/{email}')
+            return result.get('available', False)
+        except Exception:
+            return True
+
+    async def change_password(self, user_id: int, current_password: str, new_password: str) -> Dict:
+        """Alterar senha do usuário"""
+        try:
+            data = {
+                "userId": user_id,
+                "currentPassword": current_password,
+                "newPassword": new_password
+            }
+            logger.info(f"Changing password for user ID: {user_id}")
+            return await self._make_request('POST', '/auth/change-password', data)
+        except Exception as e:
+            logger.error(f"Error changing password: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao alterar senha'
+            }
+
+    # ==================== USUÁRIOS ====================
+
+    async def get_all_users(self) -> List[Dict]:
+        """Listar todos os usuários"""
+        try:
+            logger.info("Fetching all users")
+            return await self._make_request('GET', '/users')
+        except Exception as e:
+            logger.error(f"Error fetching all users: {str(e)}")
+            return []
+
+    async def get_user_by_id(self, user_id: int) -> Dict:
+        """Buscar usuário por ID"""
+        try:
+            logger.info(f"Fetching user by ID: {user_id}")
+            return await self._make_request('GET', f'/users/{user_id}')
+        except Exception as e:
+            logger.error(f"Error fetching user by ID {user_id}: {str(e)}")
+            return None
+
+    async def get_user_by_email(self, email: str) -> Dict:
+        """Buscar usuário por email"""
+        try:
+            logger.info(f"Fetching user by email: {email}")
+            return await self._make_request('GET', f'/users/email/{email}')
+        except Exception as e:
+            logger.error(f"Error fetching user by email {email}: {str(e)}")
+            return None
+
+    async def create_user(self, name: str, email: str, password: str, phone: str = None) -> Dict:
+        """Criar novo usuário"""
+        try:
+            data = {
+                "name": name,
+                "email": email,
+                "password": password
+            }
+            if phone:
+                data["phone"] = phone
+
+            logger.info(f"Creating user: {email}")
+            return await self._make_request('POST', '/users', data)
+        except Exception as e:
+            logger.error(f"Error creating user {email}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao criar usuário'
+            }
+
+    async def update_user(self, user_id: int, name: str, email: str, phone: str = None, password: str = None) -> Dict:
+        """Atualizar usuário existente"""
+        try:
+            data = {
+                "name": name,
+                "email": email
+            }
+            if phone:
+                data["phone"] = phone
+            if password:
+                data["password"] = password
+
+            logger.info(f"Updating user ID: {user_id}")
+            return await self._make_request('PUT', f'/users/{user_id}', data)
+        except Exception as e:
+            logger.error(f"Error updating user {user_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao atualizar usuário'
+            }
+
+    async def delete_user(self, user_id: int) -> Dict:
+        """Remover usuário"""
+        try:
+            logger.info(f"Deleting user ID: {user_id}")
+            return await self._make_request('DELETE', f'/users/{user_id}')
+        except Exception as e:
+            logger.error(f"Error deleting user {user_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao remover usuário'
+            }
+
+    async def authenticate_user(self, email: str, password: str) -> Dict:
+        """Autenticar usuário (método alternativo)"""
+        try:
+            data = {
+                "email": email,
+                "password": password
+            }
+            logger.info(f"Authenticating user: {email}")
+            return await self._make_request('POST', '/users/authenticate', data)
+        except Exception as e:
+            logger.error(f"Error authenticating user {email}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro na autenticação'
+            }
+
+    async def user_exists(self, email: str) -> bool:
+        """Verificar se email já existe"""
+        try:
+            result = await self._make_request('GET', f'/users/exists/{email}')
+            return result.get('exists', False)
+        except Exception:
+            return False
+
+    # ==================== MEMBROS ====================
+
+    async def get_all_members(self) -> Roster:
+        """Listar todos os membros (Roster somente leitura, como no serviço síncrono)"""
+        await snapshot_off_loop(self._seed_from_snapshot)
+        try:
+            members = await self._cached_get('members', '/members', transform=as_roster)
+        except Exception as e:
+            # API indisponível: última lista salva em disco, ou lista vazia
+            snapshot = await asyncio.to_thread(load_snapshot)
+            if snapshot is None:
+                return Roster()
+            logger.warning(f"Serving members snapshot from {snapshot.saved_at.isoformat()}: {str(e)}")
+            members = snapshot.roster
+
+        self._note_data_as_of(getattr(members, 'as_of', None))
+        remember_roster(members)
+        return members
+
+    async def get_members_page(self, status: str = None, search: str = None, page: int = 1, page_size: int = None,
+                               segment: str = None) -> Dict:
+        """Buscar uma página da lista de membros, filtrada e paginada pelo backend"""
+        page_size = page_size or default_page_size()
+        page = max(page, 1)
+        if segment or (search and await off_loop(self._roster_cached)):
+            # Segmentos só existem localmente; buscas usam o índice da lista em
+            # memória sem ir ao backend
+            members = filter_members(await self.get_all_members(), status, search, segment)
+            return local_members_page(members, page, page_size)
+        if backend_pagination_enabled():
+            endpoint = self._members_page_endpoint(status, search, page, page_size)
+            roster = await snapshot_off_loop(self._cold_start_roster, endpoint)
+            if roster is not None:
+                self._refresh_cold_start(roster, endpoint)
+                return local_members_page(filter_members(roster, status, search), page, page_size)
+            try:
+                members_page = await self._fetch_members_page(status, search, page, page_size)
+                if members_page is not None:
+                    return members_page
+            except Exception as e:
+                logger.error(f"Error fetching members page {page}: {str(e)}")
+
+        members = filter_members(await self.get_all_members(), status, search)
+        return local_members_page(members, page, page_size)
+
+    async def _fetch_members_page(self, status: Optional[str], search: Optional[str], page: int, page_size: int) -> Optional[Dict]:
+        endpoint = self._members_page_endpoint(status, search, page, page_size)
+        payload = await self._cached_get('members_page', endpoint)
+        members_page, last = self._members_page(endpoint, payload, status, search, page, page_size)
+        if last is not None:
+            return await self._fetch_members_page(status, search, last, page_size)
+        return members_page
+
+    async def get_members_cursor_page(self, status: str = None, search: str = None, cursor: str = None,
+                                      page_size: int = None, segment: str = None) -> Dict:
+        """Página da lista ordenada por (nome, id) a partir de um cursor opaco, sem total"""
+        page_size = page_size or default_page_size()
+        position = decode_cursor(cursor)
+        local_only = segment or (search and await off_loop(self._roster_cached))
+        roster = None
+        remote_cursor = None if local_only else backend_cursor(position)
+        if remote_cursor is not None:
+            endpoint = self._members_cursor_endpoint(status, search, remote_cursor, page_size)
+            roster = await snapshot_off_loop(self._cold_start_roster, endpoint)
+            if roster is not None:
+                self._refresh_cold_start(roster, endpoint)
+            else:
+                try:
+                    members_page = await self._fetch_members_cursor_page(status, search, remote_cursor, page_size)
+                    if members_page is not None:
+                        return members_page
+                except Exception as e:
+                    logger.error(f"Error fetching members cursor page: {str(e)}")
+
+        position = local_cursor(position)
+        if roster is None:
+            roster = as_roster(await self.get_all_members())
+        return keyset_page(roster, position, page_size, matching_indices(roster, status, search, segment))
+
+    async def _fetch_members_cursor_page(self, status: Optional[str], search: Optional[str], cursor: Optional[str],
+                                         page_size: int) -> Optional[Dict]:
+        endpoint = self._members_cursor_endpoint(status, search, cursor, page_size)
+        payload = await self._cached_get('members_page', endpoint)
+        return self._members_cursor_page(endpoint, payload, status, search, page_size)
+
+    async def get_member_by_id(self, member_id: int) -> Dict:
+        """Buscar membro por ID"""
+        try:
+            logger.info(f"Fetching member by ID: {member_id}")
+            member = await self._cached_get('member', f'/members/{member_id}')
+        except Exception as e:
+            logger.error(f"Error fetching member by ID {member_id}: {str(e)}")
+            return await asyncio.to_thread(self._snapshot_member, member_id, e)
+        remember_member(member)
+        return member
+
+    async def get_member_by_user_id(self, user_id: int) -> Dict:
+        """Buscar membro por ID do usuário"""
+        try:
+            logger.info(f"Fetching member by user ID: {user_id}")
+            return await self._make_request('GET', f'/members/user/{user_id}')
+        except Exception as e:
+            logger.error(f"Error fetching member by user ID {user_id}: {str(e)}")
+            return None
+
+    async def get_member_by_email(self, email: str) -> Dict:
+        """Buscar membro por email"""
+        try:
+            return await self._cached_get('member_email', f'/members/email/{email}')
+        except Exception:
+            return None
+
+    async def get_members_by_faith_stage(self, faith_stage: str) -> List[Dict]:
+        """Buscar membros por estágio da fé"""
+        try:
+            logger.info(f"Fetching members by faith stage: {faith_stage}")
+            return await self._cached_get('faith_stage', f'/members/faith-stage/{faith_stage}')
+        except Exception as e:
+            logger.error(f"Error fetching members by faith stage {faith_stage}: {str(e)}")
+            return []
+
+    async def get_members_by_interest(self, interest: str) -> List[Dict]:
+        """Buscar membros por área de interesse"""
+        try:
+            logger.info(f"Fetching members by interest: {interest}")
+            return await self._cached_get('interest', f'/members/interest/{interest}')
+        except Exception as e:
+            logger.error(f"Error fetching members by interest {interest}: {str(e)}")
+            return []
+
+    async def get_members_by_volunteer_area(self, area: str) -> List[Dict]:
+        """Buscar membros por área de voluntariado"""
+        try:
+            logger.info(f"Fetching members by volunteer area: {area}")
+            return await self._cached_get('volunteer_area', f'/members/volunteer-area/{area}')
+        except Exception as e:
+            logger.error(f"Error fetching members by volunteer area {area}: {str(e)}")
+            return []
+
+    async def create_member(self, member_data: Dict) -> Dict:
+        """Criar novo membro"""
+        try:
+            logger.info(f"Creating member: {member_data.get('fullName', 'Unknown')}")
+            return await self._make_request('POST', '/members', member_data)
+        except Exception as e:
+            logger.error(f"Error creating member: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao criar membro'
+            }
+        finally:
+            await off_loop(self._invalidate_member_caches)
+
+    async def update_member(self, member_id: int, member_data: Dict) -> Dict:
+        """Atualizar membro existente"""
+        updated_member = None
+        try:
+            logger.info(f"Updating member ID: {member_id}")
+            updated_member = await self._make_request('PUT', f'/members/{member_id}', member_data)
+            return updated_member
+        except Exception as e:
+            logger.error(f"Error updating member {member_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao atualizar membro'
+            }
+        finally:
+            await off_loop(self._invalidate_member_caches, member_id, updated_member=updated_member)
+
+    async def delete_member(self, member_id: int) -> Dict:
+        """Remover membro"""
+        deleted = False
+        try:
+            logger.info(f"Deleting member ID: {member_id}")
+            result = await self._make_request('DELETE', f'/members/{member_id}')
+            deleted = True
+            return result
+        except Exception as e:
+            logger.error(f"Error deleting member {member_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao remover membro'
+            }
+        finally:
+            await off_loop(self._invalidate_member_caches, member_id, deleted=deleted)
+
+    # ==================== RECOMENDAÇÕES ====================
+
+    async def get_member_recommendations(self, member_id: int) -> Dict:
+        """Gerar recomendações para um membro específico"""
+        try:
+            logger.info(f"Getting recommendations for member ID: {member_id}")
+            return await self._make_request('POST', f'/recommendations/member/{member_id}')
+        except Exception as e:
+            logger.error(f"Error getting recommendations for member {member_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao gerar recomendações'
+            }
+
+    async def get_custom_recommendations(self, recommendation_data: Dict) -> Dict:
+        """Gerar recomendações customizadas"""
+        try:
+            logger.info("Getting custom recommendations")
+            return await self._make_request('POST', '/recommendations/custom', recommendation_data)
+        except Exception as e:
+            logger.error(f"Error getting custom recommendations: {str(e)}")
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro ao gerar recomendações customizadas'
+            }
+
+    async def check_recommendations_health(self) -> Dict:
+        """Verificar saúde do serviço LLM"""
+        try:
+            return await self._make_request('GET', '/recommendations/health')
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,358 @@
+from django.shortcuts import render, redirect
+from django.contrib import messages
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+from .forms import CustomAuthenticationForm, CustomUserCreationForm, MemberOnboardingForm
+from .async_services import AsyncAmpeliAPIService
+from .exports import export_chunks
+from .conditional import member_last_modified, member_list_etag, member_page_etag, not_modified, with_validators
+from .cache import off_loop
+from .page_cache import cached_member_list_page, member_list_cache_key, store_member_list_page
+from .filters import iter_filtered_members
+from .api_auth_views import login_required_api, login_required_json
+from .views import (
+    _member_api_response, _member_detail_context, _member_list_context, _member_list_cursor,
+    _member_list_error_context, _member_list_query, _member_profile_context, _members_api_error,
+    _members_api_fields, _members_api_page_size, _members_api_response, _members_export_format,
+    _members_export_format_error, _members_export_response, _typeahead_query, _typeahead_response,
+)
+
+
+# Versões assíncronas das views de membros e autenticação, usadas quando o
+# projeto roda em ASGI com AMPELI_ASYNC_VIEWS=True. Enquanto aguardam o backend
+# elas liberam o event loop para atender outras requisições.
+
+
+async def _store_login_session(request, login_result):
+    """Armazenar informações da API na sessão"""
+    user_data = login_result.get('user', {})
+    await request.session.aset('api_user_id', user_data.get('id'))
+    await request.session.aset('api_token', login_result.get('token'))
+    await request.session.aset('user_email', user_data.get('email'))
+    await request.session.aset('user_name', user_data.get('name'))
+    return user_data
+
+
+@login_required_api
+async def member_list(request):
+    """Lista de membros com filtros e busca via API"""
+    cache_key = member_list_cache_key(request, await request.session.aget('api_user_id'))
+    api_service = AsyncAmpeliAPIService()
+    etag = None
+
+    try:
+        # Filtros e paginação são aplicados pelo backend; só a página atual é baixada
+        status_filter, search_query, segment_query, page_number = _member_list_query(request)
+        cursor = _member_list_cursor(request)
+        if cursor is not None:
+            # Keyset: o custo de qualquer página é o mesmo da primeira
+            members_page = await api_service.get_members_cursor_page(status_filter, search_query, cursor,
+                                                                     segment=segment_query)
+        else:
+            members_page = await api_service.get_members_page(status_filter, search_query, page_number,
+                                                              segment=segment_query)
+        # Mesmos dados da última visita: 304 sem renderizar
+        etag = member_list_etag(cache_key, members_page, api_service.data_as_of)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        # Mesmos filtros e dados vistos por outra aba/navegação: devolver o HTML já renderizado
+        cached = await off_loop(cached_member_list_page, cache_key, etag)
+        if cached is not None:
+            return with_validators(cached, etag)
+        context = _member_list_context(request, members_page)
+    except Exception as e:
+        context = _member_list_error_context(request, e)
+        cache_key = etag = None
+    # Backend fora do ar: a página indica a data dos dados salvos em disco
+    context['data_as_of'] = api_service.data_as_of
+
+    response = render(request, 'members/member_list.html', context)
+    await off_loop(store_member_list_page, cache_key, etag, response)
+    return with_validators(response, etag)
+
+
+@login_required_json
+async def member_typeahead(request):
+    """API de autocompletar nomes de membros a partir da lista em cache"""
+    query, limit = _typeahead_query(request)
+    members_data = await AsyncAmpeliAPIService().get_all_members() if query else []
+    return _typeahead_response(members_data, query, limit)
+
+
+@gzip_page
+@require_GET
+@login_required_json
+async def members_api(request):
+    """API JSON da lista de membros, com filtros, paginação e projeção de campos"""
+    api_service = AsyncAmpeliAPIService()
+    status_filter, search_query, segment_query, page_number = _member_list_query(request)
+    page_size, fields = _members_api_page_size(request), _members_api_fields(request)
+
+    try:
+        cursor = _member_list_cursor(request)
+        if cursor is not None:
+            members_page = await api_service.get_members_cursor_page(status_filter, search_query, cursor, page_size,
+                                                                     segment=segment_query)
+        else:
+            members_page = await api_service.get_members_page(status_filter, search_query, page_number, page_size,
+                                                              segment=segment_query)
+    except Exception as e:
+        return _members_api_error(e, status=502)
+    return _members_api_response(members_page, fields)
+
+
+async def _aiter_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@gzip_page
+@require_GET
+@login_required_json
+async def members_export(request):
+    """Exportar a lista de membros (com os filtros da lista) em CSV ou NDJSON, via streaming"""
+    export_format = _members_export_format(request)
+    if export_format is None:
+        return _members_export_format_error()
+    status_filter, search_query, segment_query, _ = _member_list_query(request)
+
+    try:
+        members = iter_filtered_members(await AsyncAmpeliAPIService().get_all_members(), status_filter, search_query,
+                                        segment_query)
+    except Exception as e:
+        return _members_api_error(e, status=502)
+    # Em ASGI o conteúdo em streaming precisa ser um iterador assíncrono
+    chunks = _aiter_chunks(export_chunks(members, export_format, _members_api_fields(request)))
+    return _members_export_response(chunks, export_format)
+
+
+@gzip_page
+@require_GET
+@login_required_json
+async def member_api_detail(request, member_id):
+    """API JSON de um membro, com projeção de campos"""
+    member_data = await AsyncAmpeliAPIService().get_member_by_id(member_id)
+    return _member_api_response(member_data, _members_api_fields(request))
+
+
+@login_required_api
+async def member_detail(request, member_id):
+    """Detalhes de um membro específico via API"""
+    api_service = AsyncAmpeliAPIService()
+
+    try:
+        member_data = await api_service.get_member_by_id(member_id)
+
+        if not member_data:
+            messages.error(request, 'Membro não encontrado.')
+            return redirect('members:member_list')
+
+        etag = member_page_etag(request, await request.session.aget('api_user_id'), 'member_detail', member_data)
+        last_modified = member_last_modified(member_data)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        context = {**_member_detail_context(member_data), 'data_as_of': api_service.data_as_of}
+    except Exception as e:
+        messages.error(request, f'Erro ao carregar detalhes do membro: {str(e)}')
+        return redirect('members:member_list')
+
+    return with_validators(render(request, 'members/member_detail.html', context), etag, last_modified)
+
+
+@login_required_api
+async def member_profile(request, member_id):
+    """Perfil completo do membro com todas as informações via API"""
+    api_service = AsyncAmpeliAPIService()
+
+    try:
+        member_data = await api_service.get_member_by_id(member_id)
+
+        if not member_data:
+            messages.error(request, 'Membro não encontrado.')
+            return redirect('members:member_list')
+
+        etag = member_page_etag(request, await request.session.aget('api_user_id'), 'member_profile', member_data)
+        last_modified = member_last_modified(member_data)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        context = {**_member_profile_context(member_data), 'data_as_of': api_service.data_as_of}
+    except Exception as e:
+        messages.error(request, f'Erro ao carregar perfil do membro: {str(e)}')
+        return redirect('members:member_list')
+
+    return with_validators(render(request, 'members/member_profile.html', context), etag, last_modified)
+
+
+@login_required_api
+async def member_onboarding(request):
+    """Formulário de onboarding para novos membros"""
+    api_service = AsyncAmpeliAPIService()
+
+    # Verificar se o usuário já tem um perfil de membro via API
+    try:
+        user_email = await request.session.aget('user_email')
+        if user_email:
+            member_data = await api_service.get_member_by_email(user_email)
+            if member_data:
+                messages.info(request, 'Você já completou seu cadastro!')
+                return redirect('members:member_list')
+    except Exception:
+        # Se não encontrou membro, continua com o onboarding
+        pass
+
+    if request.method == 'POST':
+        form = MemberOnboardingForm(request.POST)
+
+        if form.is_valid():
+            try:
+                user_id = await request.session.aget('api_user_id')
+                if not user_id:
+                    messages.error(request, 'Sessão expirada. Faça login novamente.')
+                    return redirect('members:login')
+
+                member_data = api_service.format_member_data_for_api(form.cleaned_data, user_id)
+
+                if api_service.validate_member_data(member_data):
+                    await api_service.create_member(member_data)
+
+                    messages.success(request, 'Perfil completado com sucesso! Bem-vindo à comunidade!')
+                    return redirect('members:member_list')
+                else:
+                    messages.error(request, 'Dados inválidos. Verifique os campos obrigatórios.')
+            except Exception as e:
+                messages.error(request, f'Erro ao salvar perfil: {str(e)}')
+    else:
+        form = MemberOnboardingForm()
+
+    return render(request, 'members/onboarding.html', {
+        'form': form,
+        'is_editing': False
+    })
+
+
+@login_required_json
+async def check_onboarding_status(request):
+    """API endpoint para verificar se usuário completou onboarding"""
+    try:
+        api_service = AsyncAmpeliAPIService()
+        user_email = await request.session.aget('user_email')
+        if user_email:
+            member_data = await api_service.get_member_by_email(user_email)
+            has_completed = bool(member_data)
+        else:
+            has_completed = False
+    except Exception:
+        has_completed = False
+
+    return JsonResponse({'completed': has_completed})
+
+
+class AsyncAPILoginView(View):
+    """View de login assíncrona baseada apenas na API do Ampeli"""
+    template_name = 'registration/login.html'
+
+    async def get(self, request):
+        if await request.session.aget('api_user_id'):
+            return redirect('members:member_list')
+
+        form = CustomAuthenticationForm()
+        return render(request, self.template_name, {'form': form})
+
+    async def post(self, request):
+        email = request.POST.get('username')  # Usando 'username' do form padrão
+        password = request.POST.get('password')
+
+        if not email or not password:
+            messages.error(request, 'Email e senha são obrigatórios.')
+            form = CustomAuthenticationForm()
+            return render(request, self.template_name, {'form': form})
+
+        api_service = AsyncAmpeliAPIService()
+        result = await api_service.login_user(email=email, password=password)
+
+        if result.get('success'):
+            user_data = await _store_login_session(request, result)
+            messages.success(request, f'Bem-vindo, {user_data.get("name", "usuário")}!')
+            return redirect('members:member_list')
+        else:
+            error_type = result.get('error', 'UNKNOWN')
+            error_message = result.get('message', 'Erro desconhecido')
+
+            if error_type == 'INVALID_CREDENTIALS':
+                messages.error(request, 'Email ou senha incorretos.')
+            elif error_type == 'USER_NOT_FOUND':
+                messages.error(request, 'Usuário não encontrado.')
+            elif error_type in ['SERVICE_UNAVAILABLE', 'CONNECTION_ERROR']:
+                messages.error(request, 'Serviço temporariamente indisponível. Tente novamente.')
+            else:
+                messages.error(request, f'Erro no login: {error_message}')
+
+            form = CustomAuthenticationForm()
+            return render(request, self.template_name, {'form': form})
+
+
+class AsyncAPIRegisterView(View):
+    """View de registro assíncrona baseada apenas na API do Ampeli"""
+    template_name = 'registration/register.html'
+
+    async def get(self, request):
+        if await request.session.aget('api_user_id'):
+            return redirect('members:member_list')
+
+        form = CustomUserCreationForm()
+        return render(request, self.template_name, {'form': form})
+
+    async def post(self, request):
+        name = request.POST.get('first_name', '') + ' ' + request.POST.get('last_name', '')
+        name = name.strip() or request.POST.get('username', '')
+        email = request.POST.get('email')
+        password = request.POST.get('password1')
+        password_confirm = request.POST.get('password2')
+
+        if not all([name, email, password, password_confirm]):
+            messages.error(request, 'Todos os campos são obrigatórios.')
+            form = CustomUserCreationForm()
+            return render(request, self.template_name, {'form': form})
+
+        if password != password_confirm:
+            messages.error(request, 'As senhas não coincidem.')
+            form = CustomUserCreationForm()
+            return render(request, self.template_name, {'form': form})
+
+        api_service = AsyncAmpeliAPIService()
+        result = await api_service.register_user(name=name, email=email, password=password)
+
+        if result.get('success'):
+            # Fazer login automático após registro
+            login_result = await api_service.login_user(email=email, password=password)
+
+            if login_result.get('success'):
+                user_data = await _store_login_session(request, login_result)
+                messages.success(request, f'Bem-vindo ao Ampeli, {user_data.get("name", "usuário")}!')
+                messages.info(request, 'Complete seu perfil para uma melhor experiência!')
+                return redirect('members:member_onboarding')
+            else:
+                messages.success(request, 'Conta criada com sucesso! Faça login para continuar.')
+                return redirect('members:login')
+        else:
+            error_type = result.get('error', 'UNKNOWN')
+            error_message = result.get('message', 'Erro desconhecido')
+
+            if error_type == 'USER_EXISTS':
+                messages.error(request, 'Este email já está cadastrado.')
+            elif error_type == 'INVALID_EMAIL':
+                messages.error(request, 'Formato de email inválido.')
+            elif error_type == 'WEAK_PASSWORD':
+                messages.error(request, 'Senha muito fraca. Use pelo menos 6 caracteres.')
+            elif error_type in ['SERVICE_UNAVAILABLE', 'CONNECTION_ERROR']:
+                messages.error(request, 'Serviço temporariamente indisponível. Tente novamente.')
+            else:
+                messages.error(request, f'Erro no cadastro: {error_message}')
+
+            form = CustomUserCreationForm()
+            return render(request, self.template_name, {'form': form})
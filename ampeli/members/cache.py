@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+# Sentinela para diferenciar "não está no cache" de valores falsy
+MISSING = object()
+
+DEFAULT_NAMESPACES = {
+    # Lista completa de membros (uma única chave); serve a versão antiga
+    # enquanto atualiza em segundo plano, até o limite de max_stale segundos
+    'members': {'ttl': 60, 'max_entries': 4, 'stale_while_revalidate': True, 'max_stale': 900},
+    # Membro por ID e por email
+    'member': {'ttl': 120, 'max_entries': 2000},
+    'member_email': {'ttl': 120, 'max_entries': 2000},
+    # Páginas da lista de membros já filtradas e paginadas pelo backend
+    'members_page': {'ttl': 60, 'max_entries': 256},
+    # HTML renderizado da lista de membros (por usuário, filtros e versão dos dados)
+    'member_list_page': {'ttl': 60, 'max_entries': 512},
+    # Buscas por estágio da fé, interesse e área de voluntariado
+    'faith_stage': {'ttl': 300, 'max_entries': 64},
+    'interest': {'ttl': 300, 'max_entries': 256},
+    'volunteer_area': {'ttl': 300, 'max_entries': 256},
+}
+
+
+class TTLLRUCache:
+    """Cache em memória com expiração por TTL e despejo LRU, seguro entre threads"""
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        # Incrementado a cada invalidação; impede que uma atualização em
+        # segundo plano iniciada antes de uma escrita grave dados antigos
+        self.generation = 0
+        # Contadores para a taxa de acerto do namespace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """Valor ainda dentro do TTL, ou MISSING"""
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > self.ttl:
+            self.record(hit=False)
+            return MISSING
+        self.record(hit=True)
+        return entry[0]
+
+    def record(self, hit: bool) -> None:
+        """Contabilizar uma leitura feita por fora de get (ex.: stale-while-revalidate)"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(valor, idade em segundos) mesmo se expirado, ou None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None, age: float = 0.0) -> None:
+        """Gravar o valor; age > 0 grava como se tivesse sido obtido há age segundos"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() - age)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key: str, fn) -> bool:
+        """Aplicar fn ao valor em cache mantendo sua idade; False se ausente"""
+        with self._lock:
+            # Atualizações em segundo plano iniciadas antes desta escrita são descartadas
+            self.generation += 1
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            value, stored_at = entry
+            self._data[key] = (fn(value), stored_at)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def try_begin_refresh(self, key: str) -> bool:
+        """Reservar a atualização da chave; False se já há uma em andamento"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entradas, acertos, faltas, despejos LRU e taxa de acerto"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_caches: Dict[str, Any] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_settings() -> Dict:
+    return getattr(settings, 'AMPELI_API_CACHE', {})
+
+
+def cache_enabled() -> bool:
+    return _cache_settings().get('ENABLED', True)
+
+
+def cache_is_shared() -> bool:
+    """Backend com E/S de arquivo entre processos (SharedFileCache)"""
+    backend = import_string(_cache_settings().get('BACKEND', 'members.cache.TTLLRUCache'))
+    return cache_enabled() and getattr(backend, 'shared', False)
+
+
+async def off_loop(fn, *args, **kwargs):
+    """Chamar fn fora do event loop se o cache for compartilhado
+
+    As consultas ao SQLite, o BEGIN IMMEDIATE (que espera até 30 s) e o flock
+    do SharedFileCache bloqueiam; o cache em memória é chamado diretamente.
+    """
+    if cache_is_shared():
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def cache_options(namespace: str) -> Dict:
+    """Opções do namespace (ttl, max_entries, stale_while_revalidate, max_stale)"""
+    return {
+        'stale_while_revalidate': False,
+        'max_stale': 0,
+        **DEFAULT_NAMESPACES.get(namespace, {'ttl': 60, 'max_entries': 256}),
+        **_cache_settings().get('NAMESPACES', {}).get(namespace, {}),
+    }
+
+
+# O que fazer com uma entrada lida do cache: servir, servir e atualizar, ou buscar
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+
+
+def is_fresh(entry: Optional[Tuple[Any, float]], ttl: float) -> bool:
+    """Se a entrada (valor, idade) de get_entry existe e está dentro do TTL"""
+    return entry is not None and entry[1] <= ttl
+
+
+def entry_state(entry: Optional[Tuple[Any, float]], options: Dict) -> str:
+    """FRESH, STALE ou EXPIRED (também para entrada ausente) segundo as opções do namespace
+
+    STALE só com stale_while_revalidate e até max_stale segundos: a versão
+    antiga é servida e a entrada atualizada em segundo plano.
+    """
+    if is_fresh(entry, options['ttl']):
+        return FRESH
+    if entry is not None and options['stale_while_revalidate'] and entry[1] <= options['max_stale']:
+        return STALE
+    return EXPIRED
+
+
+def get_cache(namespace: str):
+    """Cache do processo para o namespace, criado a partir de AMPELI_API_CACHE"""
+    cache = _caches.get(namespace)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(namespace)
+            if cache is None:
+                options = cache_options(namespace)
+                backend = import_string(_cache_settings().get('BACKEND', 'members.cache.TTLLRUCache'))
+                cache = backend(namespace, options['ttl'], options['max_entries'])
+                _caches[namespace] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Estatísticas de cada namespace já usado no processo"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
+
+
+def clear_caches() -> None:
+    """Esvaziar todos os caches do processo"""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
@@ -0,0 +1,89 @@
+import hashlib
+import json
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, Optional
+
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+
+# Respostas condicionais (ETag/Last-Modified/304) das páginas de membros: o
+# ETag vem dos dados exibidos e da sessão, e é conferido antes de renderizar
+
+
+def _etag(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return '"%s"' % hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def member_page_etag(request, user_id, page: str, member_data: Dict) -> Optional[str]:
+    """ETag da página do membro: usuário, cookie CSRF (o token vai no HTML) e dados do membro
+
+    Sem usuário ou com mensagens pendentes não há ETag: a página mostraria as
+    mensagens e um 304 esconderia isso.
+    """
+    if not user_id or len(messages.get_messages(request)):
+        return None
+    return _etag(page, str(user_id), request.META.get('CSRF_COOKIE'), member_data)
+
+
+def _page_fingerprint(members_page: Dict) -> Dict:
+    """Conteúdo da página (itens, total, cursores) em forma serializável"""
+    return {
+        **members_page,
+        'results': [row.to_dict() if hasattr(row, 'to_dict') else row for row in members_page.get('results', [])],
+    }
+
+
+def member_list_etag(cache_key: Optional[str], members_page: Dict, data_as_of=None) -> Optional[str]:
+    """ETag da lista: chave do cache de páginas mais uma impressão dos dados exibidos
+
+    Contadores de versão só mudam com escritas locais; uma página do backend
+    que expira e volta diferente (alterada por outro worker ou cliente) tem
+    que mudar o ETag, então o hash é feito sobre os itens e o total da página.
+    """
+    if cache_key is None:
+        return None
+    return _etag('member_list', cache_key, _page_fingerprint(members_page), data_as_of)
+
+
+def member_last_modified(member_data: Dict) -> Optional[int]:
+    """updatedAt do membro (ISO 8601 ou epoch em ms) como timestamp, se existir"""
+    updated_at = member_data.get('updatedAt') if isinstance(member_data, dict) else None
+    if isinstance(updated_at, (int, float)) and not isinstance(updated_at, bool):
+        return int(updated_at / 1000)
+    if not isinstance(updated_at, str):
+        return None
+    try:
+        parsed = parse_datetime(updated_at)
+    except ValueError:
+        return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return int(parsed.timestamp())
+
+
+def not_modified(request, etag: Optional[str], last_modified: Optional[int] = None):
+    """304 quando If-None-Match/If-Modified-Since conferem, senão None"""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        with_validators(response, etag, last_modified)
+    return response
+
+
+def with_validators(response, etag: Optional[str], last_modified: Optional[int] = None):
+    """Adicionar ETag/Last-Modified à resposta 200, sempre revalidada pelo navegador"""
+    if etag is None or response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Página por usuário: só o navegador guarda, e sempre pergunta antes de reusar
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,84 @@
+import csv
+import json
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+from .roster import project_member
+
+
+# Colunas do CSV quando ?fields= não é informado
+CSV_EXPORT_FIELDS = (
+    'id', 'fullName', 'email', 'phone', 'memberStatus', 'birthDate', 'gender',
+    'maritalStatus', 'faithStage', 'howFoundChurch',
+)
+
+# Formato -> (content type, extensão do arquivo)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+# Linhas são agrupadas em blocos deste tamanho antes de ir para a resposta
+# (e para o gzip): poucos writes grandes em vez de um por membro
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+class _LineBuffer:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de acumulá-la"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+# Início de célula que planilhas (Excel, LibreOffice, Sheets) interpretam como fórmula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _neutralize_formula(value: str) -> str:
+    """Prefixar com ' textos que a planilha executaria como fórmula (ex.: =HYPERLINK(...))"""
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str):
+        return _neutralize_formula(value)
+    return value
+
+
+def csv_lines(members: Iterable[Dict], fields: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Cabeçalho e uma linha CSV por membro"""
+    fields = fields or CSV_EXPORT_FIELDS
+    writer = csv.writer(_LineBuffer())
+    # Os nomes das colunas vêm de ?fields= e também são protegidos
+    yield writer.writerow([_neutralize_formula(field) for field in fields])
+    for member in members:
+        yield writer.writerow([_csv_value(member.get(field)) for field in fields])
+
+
+def ndjson_lines(members: Iterable[Dict], fields: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Um objeto JSON por linha, com os campos pedidos (todos se fields for None)"""
+    for member in members:
+        yield json.dumps(project_member(member, fields), ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+
+
+def export_chunks(members: Iterable[Dict], export_format: str,
+                  fields: Optional[Sequence[str]] = None) -> Iterator[bytes]:
+    """Arquivo de exportação gerado sob demanda, em blocos de até EXPORT_CHUNK_BYTES
+
+    Os membros são lidos um a um (do Roster, só as colunas exportadas); a
+    memória usada não depende do tamanho da lista.
+    """
+    lines = csv_lines(members, fields) if export_format == 'csv' else ndjson_lines(members, fields)
+    chunk, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
@@ -0,0 +1,89 @@
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from .roster import Roster, as_roster
+from .search import digits, match_rank, member_keys, normalize
+from .segments import bit_membership, filter_segment, iter_bits, segment_bits, select_segment
+
+
+def member_matches(member: Dict, status: Optional[str] = None, search: Optional[str] = None) -> bool:
+    """Verificar se o membro atende aos filtros de status e busca"""
+    if status and member.get('memberStatus') != status:
+        return False
+    if search:
+        query = normalize(search).strip()
+        return match_rank(member_keys(member), query, digits(query)) is not None
+    return True
+
+
+def filter_members(members: Iterable[Dict], status: Optional[str] = None, search: Optional[str] = None,
+                   segment: Optional[str] = None) -> Sequence[Dict]:
+    """Aplicar localmente os filtros de status, busca e segmento da lista de membros"""
+    if segment and not isinstance(members, Roster):
+        members = as_roster(list(members))
+    if isinstance(members, Roster):
+        if search:
+            # Índice de trigramas da lista em cache, com resultados por relevância
+            rows = members.search(search)
+            if segment:
+                rows = filter_segment(members, segment, rows)
+            members, search = rows, None
+        elif segment:
+            # Segmentos e status são combinados nos bitsets dos campos de escolha
+            return select_segment(members, segment, status)
+        elif status:
+            # Status é um campo de escolha: compara os códigos da coluna
+            return members.where('memberStatus', status)
+        else:
+            # Sem filtros a própria lista serve para recortar a página
+            return members
+    if not status and not search:
+        return list(members)
+    return [m for m in members if member_matches(m, status, search)]
+
+
+def iter_filtered_members(members: Iterable[Dict], status: Optional[str] = None, search: Optional[str] = None,
+                          segment: Optional[str] = None) -> Iterator[Dict]:
+    """Os membros de filter_members, um a um, sem montar a lista filtrada (exportação)
+
+    Segmento e busca são avaliados na chamada, para que erros de segmento
+    aconteçam antes do streaming; os membros são lidos depois, do bitset do
+    segmento, da coluna de status ou do resultado do índice de busca.
+    """
+    if segment and not isinstance(members, Roster):
+        members = as_roster(list(members))
+    if not isinstance(members, Roster):
+        return (m for m in members if member_matches(m, status, search))
+
+    if search:
+        # Ordem de relevância da busca; segmento e status testados por posição
+        tests = []
+        if segment:
+            tests.append(bit_membership(segment_bits(members, segment)))
+        if status:
+            tests.append(members.matcher('memberStatus', status))
+        return (row for row in members.search(search) if all(test(row.index) for test in tests))
+    if segment:
+        return (members.row(index) for index in iter_bits(segment_bits(members, segment, status)))
+    if status:
+        matches = members.matcher('memberStatus', status)
+        return (members.row(index) for index in members.indices() if matches(index))
+    return iter(members)
+
+
+def matching_indices(roster: Roster, status: Optional[str] = None, search: Optional[str] = None,
+                     segment: Optional[str] = None) -> Optional[Callable[[int], bool]]:
+    """Teste de pertinência das posições físicas do Roster aos filtros (None: sem filtros)
+
+    A página por cursor percorre a ordem (nome, id) e testa cada posição:
+    segmento e status leem o bitset e os códigos da coluna sem montar conjuntos
+    do tamanho da lista; só a busca guarda as posições encontradas pelo índice.
+    """
+    tests = []
+    if segment:
+        tests.append(bit_membership(segment_bits(roster, segment, status)))
+    elif status:
+        tests.append(roster.matcher('memberStatus', status))
+    if search:
+        found = {row.index for row in roster.search(search) if all(test(row.index) for test in tests)}
+        return found.__contains__
+    return tests[0] if tests else None
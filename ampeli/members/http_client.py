@@ -0,0 +1,240 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+DEFAULT_TIMEOUTS = {
+    'default': (3.05, 10),
+    'auth': (3.05, 10),
+    'members': (3.05, 15),
+    'recommendations': (3.05, 30),
+}
+
+
+class DeadlineExceeded(Exception):
+    """Orçamento de tempo da requisição atual esgotado antes da chamada ao backend"""
+
+
+class AmpeliAPIError(Exception):
+    """Falha numa chamada HTTP ao backend do Ampeli"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+# Um único adapter (pool de conexões do urllib3) por processo, compartilhado
+# por sessões locais a cada thread. O pool do urllib3 é thread-safe; o estado
+# da Session (cookies, headers) não é, por isso cada thread tem a sua.
+_pool_lock = threading.Lock()
+_adapter = None
+_thread_sessions = threading.local()
+_pool_generation = 0
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """Adapter HTTP com TCP keep-alive habilitado nos sockets do pool"""
+
+    def __init__(self, *args, keep_alive: bool = True, **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keep_alive:
+            from urllib3.connection import HTTPConnection
+
+            socket_options = list(HTTPConnection.default_socket_options)
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _build_adapter() -> HTTPAdapter:
+    pool_size = getattr(settings, 'AMPELI_API_POOL_SIZE', 10)
+    keep_alive = getattr(settings, 'AMPELI_API_KEEP_ALIVE', True)
+    logger.info(f"Creating HTTP connection pool (size={pool_size}, keep_alive={keep_alive}, pid={os.getpid()})")
+    return KeepAliveHTTPAdapter(
+        pool_connections=getattr(settings, 'AMPELI_API_POOL_CONNECTIONS', 4),
+        pool_maxsize=pool_size,
+        pool_block=getattr(settings, 'AMPELI_API_POOL_BLOCK', False),
+        keep_alive=keep_alive,
+    )
+
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _pool_lock:
+            if _adapter is None:
+                _adapter = _build_adapter()
+    return _adapter
+
+
+def get_session() -> requests.Session:
+    """Retorna a sessão HTTP da thread atual, ligada ao pool do processo"""
+    session = getattr(_thread_sessions, 'session', None)
+    if session is None or getattr(_thread_sessions, 'generation', None) != _pool_generation:
+        adapter = _get_adapter()
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not getattr(settings, 'AMPELI_API_KEEP_ALIVE', True):
+            session.headers['Connection'] = 'close'
+        _thread_sessions.session = session
+        _thread_sessions.generation = _pool_generation
+    return session
+
+
+def reset_pool() -> None:
+    """Descartar o pool atual (usado após fork e em testes)"""
+    global _adapter, _pool_generation
+    with _pool_lock:
+        adapter, _adapter = _adapter, None
+        _pool_generation += 1
+    if adapter is not None:
+        try:
+            adapter.close()
+        except Exception:
+            pass
+
+
+def _reset_pool_after_fork() -> None:
+    # Sockets herdados do processo pai (gunicorn --preload) não podem ser
+    # compartilhados entre workers: cada worker abre o próprio pool.
+    global _adapter, _pool_lock, _thread_sessions, _pool_generation
+    _pool_lock = threading.Lock()
+    _adapter = None
+    _thread_sessions = threading.local()
+    _pool_generation += 1
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+# ==================== TIMEOUTS E DEADLINE ====================
+
+class RequestBudget:
+    """Orçamento de tempo das chamadas ao backend de uma requisição"""
+
+    __slots__ = ('expires_at', 'exhausted')
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.exhausted = False
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+# Orçamento da requisição atual. Como é um ContextVar, vale tanto para threads
+# quanto para tarefas asyncio; o objeto é mutável para que a marcação de
+# esgotamento feita dentro de sync_to_async seja vista pelo middleware.
+_budget: ContextVar[Optional[RequestBudget]] = ContextVar('ampeli_api_budget', default=None)
+
+
+def endpoint_group(endpoint: str) -> str:
+    """Classe do endpoint ('auth', 'members', ...) a partir do primeiro segmento"""
+    return endpoint.split('?', 1)[0].strip('/').split('/', 1)[0] or 'default'
+
+
+def get_timeouts(group: str) -> Tuple[float, float]:
+    """Timeouts (conexão, leitura) configurados para a classe de endpoint"""
+    timeouts = {**DEFAULT_TIMEOUTS, **getattr(settings, 'AMPELI_API_TIMEOUTS', {})}
+    return tuple(timeouts.get(group, timeouts['default']))
+
+
+def set_deadline(seconds: Optional[float]):
+    """Definir o orçamento total da requisição atual; retorna token para reset"""
+    return _budget.set(RequestBudget(seconds) if seconds is not None else None)
+
+
+def reset_deadline(token) -> None:
+    _budget.reset(token)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Limitar o tempo total das chamadas ao backend dentro do bloco"""
+    token = set_deadline(seconds)
+    try:
+        yield _budget.get()
+    finally:
+        reset_deadline(token)
+
+
+def current_budget() -> Optional[RequestBudget]:
+    return _budget.get()
+
+
+def context_without_deadline() -> Context:
+    """Cópia do contexto atual sem o orçamento da requisição
+
+    Tarefas asyncio herdam o contexto de quem as cria; uma chamada que serve a
+    várias requisições não pode ficar presa ao deadline (nem esgotar o
+    orçamento) de uma delas.
+    """
+    context = copy_context()
+    context.run(_budget.set, None)
+    return context
+
+
+def remaining_time() -> Optional[float]:
+    """Segundos restantes do orçamento atual (None se não houver deadline)"""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return budget.remaining()
+
+
+def request_timeout(group: str, url: str = '') -> Tuple[float, float]:
+    """Timeouts da chamada limitados pelo que resta do deadline da requisição"""
+    connect, read = get_timeouts(group)
+    budget = _budget.get()
+    if budget is None:
+        return connect, read
+    remaining = budget.remaining()
+    if remaining <= 0:
+        budget.exhausted = True
+        raise DeadlineExceeded(f"Tempo limite da requisição esgotado antes de chamar {url or group}")
+    return min(connect, remaining), min(read, remaining)
+
+
+def check_deadline_after_timeout() -> None:
+    """Marcar o orçamento como esgotado se um timeout coincidiu com o deadline"""
+    budget = _budget.get()
+    if budget is not None and budget.remaining() <= 0:
+        budget.exhausted = True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos indicados pelo header Retry-After (número ou data HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,299 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .server_timing import record_timing
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+# Limites (s) dos histogramas de latência; os maiores cobrem a partida a frio do Render
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Limites (bytes) do tamanho das respostas do backend
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico por combinação de labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self, pid: str) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f'{self.name}{_format_labels(self.labelnames, labels, pid)} {_format_value(value)}'
+                for labels, value in sorted(values.items())]
+
+
+class Histogram:
+    """Histograma com limites fixos por combinação de labels
+
+    Guarda a contagem de cada faixa (não acumulada) e só acumula ao exportar,
+    então observe() é uma busca binária e três somas sob o lock da métrica.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [contagens por faixa (+Inf no fim), soma, total]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: Tuple = ()) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[2] if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def samples(self, pid: str) -> List[str]:
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        lines = []
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, pid + "," + le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels, pid)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels, pid)} {count}')
+        return lines
+
+
+BACKEND_LATENCY = Histogram(
+    'ampeli_backend_request_duration_seconds',
+    'Duração das chamadas HTTP ao backend por modelo de endpoint',
+    ('method', 'endpoint', 'status'),
+)
+BACKEND_RESPONSE_BYTES = Histogram(
+    'ampeli_backend_response_bytes',
+    'Tamanho do corpo das respostas do backend',
+    ('method', 'endpoint'),
+    buckets=SIZE_BUCKETS,
+)
+BACKEND_ERRORS = Counter(
+    'ampeli_backend_errors_total',
+    'Chamadas ao backend que falharam, por classe de erro',
+    ('method', 'endpoint', 'error'),
+)
+VIEW_LATENCY = Histogram(
+    'ampeli_http_request_duration_seconds',
+    'Duração das requisições ao front-end por view',
+    ('view', 'method', 'status'),
+)
+
+# Valor numérico de cada estado do circuit breaker no gauge ampeli_backend_circuit_state
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+REGISTRY = [BACKEND_LATENCY, BACKEND_RESPONSE_BYTES, BACKEND_ERRORS, VIEW_LATENCY]
+
+
+_NUMERIC_SEGMENT = re.compile(r'^\d+$')
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Modelo do endpoint sem query string nem ids ('/members/{id}'), para limitar as séries"""
+    segments = []
+    for segment in endpoint.split('?', 1)[0].split('/'):
+        if _NUMERIC_SEGMENT.match(segment):
+            segment = '{id}'
+        elif '@' in segment or '%40' in segment:
+            segment = '{email}'
+        segments.append(segment)
+    return '/'.join(segments) or '/'
+
+
+def error_class(exc: BaseException) -> str:
+    """Classe do erro de origem (Timeout, ConnectionError...) em vez do AmpeliAPIError que o embrulha"""
+    cause = exc.__cause__ or exc.__context__
+    if cause is not None and type(exc).__name__ == 'AmpeliAPIError':
+        return type(cause).__name__
+    return type(exc).__name__
+
+
+class BackendCall:
+    """Mede uma chamada ao backend: latência, status, bytes recebidos e erro
+
+    Uso: ``with BackendCall(method, endpoint) as call: ... call.received(status, size)``.
+    """
+
+    def __init__(self, method: str, endpoint: str):
+        self.method = method
+        self.endpoint = endpoint_template(endpoint)
+        self.status_code: Optional[int] = None
+        self.size: Optional[int] = None
+        self.started = 0.0
+
+    def __enter__(self) -> 'BackendCall':
+        self.started = time.perf_counter()
+        return self
+
+    def received(self, status_code: int, size: int) -> None:
+        self.status_code, self.size = status_code, size
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.started
+        status = str(self.status_code) if self.status_code is not None else 'none'
+        BACKEND_LATENCY.observe(elapsed, (self.method, self.endpoint, status))
+        record_timing('backend', elapsed, f'{self.method} {self.endpoint} {status}')
+        if self.size is not None:
+            BACKEND_RESPONSE_BYTES.observe(self.size, (self.method, self.endpoint))
+        if exc is not None:
+            BACKEND_ERRORS.inc((self.method, self.endpoint, error_class(exc)))
+        return False
+
+
+def observe_view(view: str, method: str, status_code: int, elapsed: float) -> None:
+    VIEW_LATENCY.observe(elapsed, (view, method, str(status_code)))
+
+
+def _collected_samples(pid: str) -> List[str]:
+    """Estatísticas dos caches, do single-flight, dos retries, dos circuit breakers e do aquecimento
+
+    Lidas no momento da exportação.
+    """
+    from .async_services import async_flight_stats
+    from .cache import cache_stats
+    from .prewarm import prewarm_status
+    from .resilience import backend_flights, breaker_stats, retry_budget
+
+    lines = []
+    stats = sorted(cache_stats().items())
+    for name, key, kind, documentation in (
+        ('ampeli_cache_hits_total', 'hits', 'counter', 'Leituras atendidas pelo cache'),
+        ('ampeli_cache_misses_total', 'misses', 'counter', 'Leituras que não encontraram valor válido no cache'),
+        ('ampeli_cache_evictions_total', 'evictions', 'counter', 'Entradas despejadas por limite de tamanho'),
+        ('ampeli_cache_entries', 'entries', 'gauge', 'Entradas em cache'),
+    ):
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_format_labels(("namespace",), (namespace,), pid)} {values[key]}'
+                  for namespace, values in stats]
+
+    flights = (('sync', backend_flights.stats()), ('async', async_flight_stats()))
+    for name, key, kind, documentation in (
+        ('ampeli_backend_singleflight_issued_total', 'issued', 'counter', 'GETs ao backend iniciados pelo single-flight'),
+        ('ampeli_backend_singleflight_coalesced_total', 'coalesced', 'counter',
+         'GETs que aguardaram uma chamada idêntica já em andamento'),
+        ('ampeli_backend_singleflight_in_flight', 'in_flight', 'gauge', 'GETs ao backend em andamento'),
+    ):
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_format_labels(("mode",), (mode,), pid)} {values[key]}' for mode, values in flights]
+
+    budget = retry_budget.stats()
+    for name, key, kind, documentation in (
+        ('ampeli_backend_retries_total', 'retries', 'counter', 'Retries liberados pelo orçamento de retries'),
+        ('ampeli_backend_retry_budget_exhausted_total', 'exhausted', 'counter',
+         'Retries recusados por falta de orçamento'),
+        ('ampeli_backend_retry_budget_tokens', 'tokens', 'gauge', 'Retries disponíveis no orçamento do worker'),
+    ):
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}',
+                  f'{name}{{{pid}}} {_format_value(budget[key])}']
+
+    breakers = sorted(breaker_stats().items())
+    for name, key, kind, documentation in (
+        ('ampeli_backend_circuit_state', 'state', 'gauge', 'Estado do circuit breaker (0 fechado, 1 meio-aberto, 2 aberto)'),
+        ('ampeli_backend_circuit_opened_total', 'times_opened', 'counter', 'Vezes que o circuito abriu'),
+        ('ampeli_backend_circuit_short_circuited_total', 'short_circuited', 'counter',
+         'Chamadas recusadas na hora com o circuito aberto'),
+    ):
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_format_labels(("group",), (group,), pid)} '
+                  f'{CIRCUIT_STATES.get(values[key], 0) if key == "state" else values[key]}'
+                  for group, values in breakers]
+
+    status = prewarm_status()
+    if status['last_latency'] is not None:
+        name = 'ampeli_backend_prewarm_last_latency_seconds'
+        lines += [f'# HELP {name} Latência do último ping de aquecimento ao backend',
+                  f'# TYPE {name} gauge', f'{name}{{{pid}}} {_format_value(status["last_latency"])}']
+    name = 'ampeli_backend_prewarm_cold_starts_total'
+    lines += [f'# HELP {name} Pings de aquecimento que encontraram o backend dormindo',
+              f'# TYPE {name} counter', f'{name}{{{pid}}} {status["cold_starts"]}']
+    return lines
+
+
+def render_metrics() -> str:
+    """Todas as métricas do processo no formato de texto do Prometheus
+
+    Cada worker do gunicorn tem os próprios contadores; o label pid separa as
+    séries para que reinícios e trocas de worker não pareçam resets.
+    """
+    pid = f'pid="{os.getpid()}"'
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples(pid))
+    try:
+        lines.extend(_collected_samples(pid))
+    except Exception as e:
+        logger.warning(f"Could not collect cache/resilience/prewarm metrics: {str(e)}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics() -> None:
+    """Zerar as métricas do processo (testes)"""
+    for metric in REGISTRY:
+        metric.clear()
@@ -0,0 +1,185 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from .http_client import DeadlineExceeded, current_budget, reset_deadline, set_deadline
+from .metrics import observe_view
+from .prewarm import counts_as_traffic, prewarmer
+from .server_timing import (
+    begin_timings, end_timings, format_server_timing, server_timing, server_timing_allowed, server_timing_options,
+)
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+def _deadline_response():
+    return HttpResponse(
+        'O servidor de dados demorou demais para responder. Tente novamente em instantes.',
+        status=504,
+        content_type='text/plain; charset=utf-8',
+    )
+
+
+class BackendDeadlineMiddleware:
+    """Define o orçamento de tempo das chamadas ao backend em cada requisição"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = set_deadline(getattr(settings, 'AMPELI_API_REQUEST_BUDGET', 20))
+        try:
+            return self._check_budget(request, self.get_response(request))
+        finally:
+            reset_deadline(token)
+
+    async def __acall__(self, request):
+        token = set_deadline(getattr(settings, 'AMPELI_API_REQUEST_BUDGET', 20))
+        try:
+            return self._check_budget(request, await self.get_response(request))
+        finally:
+            reset_deadline(token)
+
+    def _check_budget(self, request, response):
+        budget = current_budget()
+        if budget is not None and budget.exhausted:
+            # A view degradou para o fallback (lista vazia, None...) porque o
+            # orçamento acabou: responder com erro explícito em vez de dados incompletos
+            logger.warning(f"Backend deadline exceeded for {request.path}")
+            return _deadline_response()
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DeadlineExceeded):
+            logger.warning(f"Backend deadline exceeded for {request.path}: {exception}")
+            return _deadline_response()
+        return None
+
+
+class BackendPrewarmMiddleware:
+    """Registra o tráfego do site para o aquecimento do backend (AMPELI_API_PREWARM)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._note_traffic(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._note_traffic(request)
+        return await self.get_response(request)
+
+    def _note_traffic(self, request):
+        # /metrics e o status do backend são chamados por máquinas, não por usuários
+        if counts_as_traffic(request.path):
+            prewarmer.note_traffic()
+
+
+class RequestMetricsMiddleware:
+    """Histograma da duração das requisições por view, método e status (exposto em /metrics)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, started)
+        return response
+
+    def _observe(self, request, response, started):
+        # Nome da rota ('members:member_list'), não a URL: uma série por view
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        observe_view(view, request.method, response.status_code, time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """Cabeçalho Server-Timing com o tempo da sessão, das chamadas ao backend e da renderização
+
+    Deve vir logo após o SessionMiddleware. Por padrão só sessões de
+    administradores (AMPELI_SERVER_TIMING['ADMIN_EMAILS']) recebem o cabeçalho;
+    NON_ADMIN libera para todos.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        options = server_timing_options()
+        if not options['ENABLED']:
+            return self.get_response(request)
+        token = begin_timings()
+        started = time.perf_counter()
+        try:
+            # A sessão é carregada aqui (a view faria o mesmo) para medir a leitura
+            with server_timing('session'):
+                request.session.get('user_email')
+            response = self.get_response(request)
+        finally:
+            timings = end_timings(token)
+        return self._add_header(request, response, timings, started, options)
+
+    async def __acall__(self, request):
+        options = server_timing_options()
+        if not options['ENABLED']:
+            return await self.get_response(request)
+        token = begin_timings()
+        started = time.perf_counter()
+        try:
+            with server_timing('session'):
+                await request.session.aget('user_email')
+            response = await self.get_response(request)
+        finally:
+            timings = end_timings(token)
+        return self._add_header(request, response, timings, started, options)
+
+    def _add_header(self, request, response, timings, started, options):
+        # Sessão já carregada: decidir pelo e-mail ao final (após login/logout)
+        if not server_timing_allowed(request.session.get('user_email'), options):
+            return response
+        timings.insert(0, ('total', (time.perf_counter() - started) * 1000, ''))
+        header = format_server_timing(timings, options['MAX_ENTRIES'])
+        if response.has_header('Server-Timing'):
+            header = f"{response['Server-Timing']}, {header}"
+        response['Server-Timing'] = header
+        return response
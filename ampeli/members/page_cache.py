@@ -0,0 +1,51 @@
+import hashlib
+from typing import Optional
+
+from django.contrib import messages
+from django.http import HttpResponse
+
+from .cache import MISSING, cache_enabled, get_cache
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+# HTML renderizado da lista de membros, por usuário, filtros e ETag dos dados exibidos
+PAGE_CACHE_NAMESPACE = 'member_list_page'
+
+
+def member_list_cache_key(request, user_id) -> Optional[str]:
+    """Chave da página: usuário da sessão, cookie CSRF e querystring normalizada
+
+    O token CSRF embutido no HTML só vale para o cookie de quem renderizou; sem
+    cookie (primeira visita) ou com mensagens pendentes a página não é cacheada.
+    """
+    csrf_cookie = request.META.get('CSRF_COOKIE')
+    if not cache_enabled() or not user_id or not csrf_cookie or len(messages.get_messages(request)):
+        return None
+    params = sorted(
+        (name, value.strip()) for name, values in request.GET.lists()
+        for value in values if value.strip()
+    )
+    raw = repr((str(user_id), csrf_cookie, params))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def cached_member_list_page(key: Optional[str], etag: Optional[str]) -> Optional[HttpResponse]:
+    """Resposta gravada para a chave, se foi renderizada com os mesmos dados (mesmo ETag)"""
+    if key is None or etag is None:
+        return None
+    cached = get_cache(PAGE_CACHE_NAMESPACE).get(key)
+    if cached is MISSING:
+        return None
+    stored_etag, content, content_type = cached
+    if stored_etag != etag:
+        return None
+    return HttpResponse(content, content_type=content_type)
+
+
+def store_member_list_page(key: Optional[str], etag: Optional[str], response: HttpResponse) -> None:
+    if key is None or etag is None or response.status_code != 200:
+        return
+    get_cache(PAGE_CACHE_NAMESPACE).set(key, (etag, response.content, response['Content-Type']))
@@ -0,0 +1,315 @@
+import base64
+import binascii
+import bisect
+import json
+import math
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from .filters import member_matches
+from .roster import Roster
+from .search import normalize
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+DEFAULT_BACKEND_PAGINATION = {
+    'ENABLED': True,
+    'PAGE_SIZE': 20,
+    'RECHECK': 300,
+    'MODE': 'page',
+}
+
+# Momento até o qual o backend é tratado como sem suporte a cada modo de
+# paginação: 'page' (número da página) ou 'cursor' (keyset)
+_unsupported_until = {'page': 0.0, 'cursor': 0.0}
+_lock = threading.Lock()
+
+
+def pagination_options() -> Dict:
+    """Opções de AMPELI_API_BACKEND_PAGINATION com os valores padrão"""
+    return {**DEFAULT_BACKEND_PAGINATION, **getattr(settings, 'AMPELI_API_BACKEND_PAGINATION', {})}
+
+
+def default_page_size() -> int:
+    return pagination_options()['PAGE_SIZE']
+
+
+def cursor_pagination_default() -> bool:
+    """Lista de membros paginada por cursor quando a querystring não diz o modo"""
+    return pagination_options()['MODE'] == 'cursor'
+
+
+def backend_pagination_enabled(mode: str = 'page') -> bool:
+    """Enviar filtros e paginação ao backend, salvo se ele os ignorou há pouco"""
+    return pagination_options()['ENABLED'] and time.monotonic() >= _unsupported_until[mode]
+
+
+def mark_backend_pagination_unsupported(mode: str = 'page') -> None:
+    """Usar o filtro local até o próximo teste de suporte do backend"""
+    with _lock:
+        if time.monotonic() >= _unsupported_until[mode]:
+            logger.warning(f"Backend ignored member list filters/{mode} pagination, filtering locally")
+        _unsupported_until[mode] = time.monotonic() + pagination_options()['RECHECK']
+
+
+def reset_backend_pagination() -> None:
+    with _lock:
+        for mode in _unsupported_until:
+            _unsupported_until[mode] = 0.0
+
+
+def last_page(count: int, page_size: int) -> int:
+    return max(1, math.ceil(count / page_size))
+
+
+def parse_members_page(payload, status: Optional[str], search: Optional[str],
+                       page_size: int) -> Optional[Tuple[List[Dict], int]]:
+    """Extrair (itens, total) de uma resposta paginada do backend
+
+    Aceita o formato do Spring (content/totalElements) e items|results com
+    total|count. Retorna None quando a resposta indica que o backend ignorou os
+    parâmetros: lista simples, página maior que o pedido ou itens fora do filtro.
+    """
+    if not isinstance(payload, dict):
+        return None
+
+    results = next((payload[k] for k in ('content', 'items', 'results') if isinstance(payload.get(k), list)), None)
+    count = next((payload[k] for k in ('totalElements', 'total', 'count') if isinstance(payload.get(k), int)), None)
+    if results is None or count is None or len(results) > page_size:
+        return None
+
+    if status and any(not member_matches(m, status=status) for m in results):
+        return None
+    # A busca do backend pode ser mais ampla (acentos, outros campos); só
+    # considerar ignorada quando nenhum item da página contém o termo
+    if search and results and not any(member_matches(m, search=search) for m in results):
+        return None
+    return results, count
+
+
+def local_members_page(members: List[Dict], page: int, page_size: int) -> Dict:
+    """Recortar localmente a página de uma lista já filtrada"""
+    page = min(page, last_page(len(members), page_size))
+    start = (page - 1) * page_size
+    return {
+        'results': members[start:start + page_size],
+        'count': len(members),
+        'page': page,
+        'page_size': page_size,
+        'backend_paginated': False,
+    }
+
+
+class MembersPageResults:
+    """Adapta uma página já buscada (backend ou cache) à interface do Paginator
+
+    O Paginator só precisa do total (count) e do recorte da página atual, que
+    já vem pronto do serviço; nenhuma outra página é materializada.
+    """
+
+    def __init__(self, members_page: Dict):
+        self.members_page = members_page
+
+    def count(self) -> int:
+        return self.members_page['count']
+
+    def __len__(self) -> int:
+        return self.members_page['count']
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.members_page['results']
+        offset = (self.members_page['page'] - 1) * self.members_page['page_size']
+        return self.members_page['results'][index - offset]
+
+
+def paginate_members_page(members_page: Dict):
+    """Página do Paginator para o resultado de get_members_page"""
+    paginator = Paginator(MembersPageResults(members_page), members_page['page_size'])
+    return paginator.page(members_page['page'])
+
+
+# Paginação por cursor (keyset) sobre (nome, id)
+
+def encode_cursor(payload: Dict) -> str:
+    """Cursor opaco para a querystring"""
+    data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """Conteúdo do cursor; cursores inválidos ou adulterados voltam ao início da lista"""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('k') == 'backend':
+        return payload if isinstance(payload.get('c'), str) else None
+    if payload.get('k') in ('a', 'b') and isinstance(payload.get('n'), str) and 'i' in payload:
+        return payload
+    return None
+
+
+def backend_cursor(position: Optional[Dict]) -> Optional[str]:
+    """Cursor a repassar ao backend ('' na primeira página), ou None se a página é montada localmente"""
+    if position is not None and position['k'] != 'backend':
+        return None
+    if not backend_pagination_enabled('cursor'):
+        return None
+    return position['c'] if position is not None else ''
+
+
+def local_cursor(position: Optional[Dict]) -> Optional[Dict]:
+    """Posição para o keyset sobre a lista em cache; cursores do backend recomeçam do início"""
+    return None if position is not None and position['k'] == 'backend' else position
+
+
+def _id_key(member_id: Any) -> Tuple:
+    # IDs numéricos em ordem numérica, antes dos textuais
+    if isinstance(member_id, int) and not isinstance(member_id, bool):
+        return (0, member_id)
+    return (1, str(member_id))
+
+
+def _name_key(member) -> str:
+    return normalize(member.get('fullName') or '')
+
+
+_sorted_keys: "weakref.WeakKeyDictionary[Roster, Tuple[int, List[Tuple]]]" = weakref.WeakKeyDictionary()
+_sorted_keys_lock = threading.Lock()
+
+
+def sorted_keys(roster: Roster) -> List[Tuple]:
+    """(nome normalizado, id, posição física) de cada membro, em ordem
+
+    Construída uma vez por versão do Roster; cada página é então uma busca
+    binária seguida da leitura de page_size linhas, qualquer que seja a página.
+    """
+    cached = _sorted_keys.get(roster)
+    if cached is None or cached[0] != roster.version:
+        with _sorted_keys_lock:
+            cached = _sorted_keys.get(roster)
+            if cached is None or cached[0] != roster.version:
+                version = roster.version
+                keys = sorted(
+                    (_name_key(row), _id_key(row.get('id')), row.index) for row in roster
+                )
+                cached = _sorted_keys[roster] = (version, keys)
+    return cached[1]
+
+
+def _local_cursor(direction: str, key: Tuple) -> str:
+    return encode_cursor({'k': direction, 'n': key[0], 'i': key[1][1]})
+
+
+def keyset_page(roster: Roster, cursor: Optional[Dict], page_size: int,
+                allowed: Optional[Callable[[int], bool]] = None) -> Dict:
+    """Página da lista ordenada por (nome, id) a partir de um cursor local
+
+    allowed testa se uma posição física atende aos filtros; sem filtros o custo
+    não depende da profundidade da página e o total não é contado.
+    """
+    keys = sorted_keys(roster)
+
+    def collect(positions) -> List[Tuple]:
+        # page_size + 1 chaves: a extra só indica que há mais uma página
+        page = []
+        for position in positions:
+            if allowed is None or allowed(keys[position][2]):
+                page.append(keys[position])
+                if len(page) > page_size:
+                    break
+        return page
+
+    if cursor is not None and cursor.get('k') == 'b':
+        position = bisect.bisect_left(keys, (cursor['n'], _id_key(cursor['i'])))
+        page = collect(range(position - 1, -1, -1))
+        if len(page) >= page_size:
+            return _keyset_result(roster, page[:page_size][::-1], page_size,
+                                  has_next=True, has_previous=len(page) > page_size)
+        # Voltou até o início com uma página incompleta: mostrar a primeira
+        cursor = None
+
+    if cursor is None:
+        position, has_previous = 0, False
+    else:
+        boundary = (cursor['n'], _id_key(cursor['i']), math.inf)
+        position, has_previous = bisect.bisect_right(keys, boundary), True
+
+    page = collect(range(position, len(keys)))
+    return _keyset_result(roster, page[:page_size], page_size,
+                          has_next=len(page) > page_size, has_previous=has_previous)
+
+
+def _keyset_result(roster: Roster, page: List[Tuple], page_size: int, has_next: bool, has_previous: bool) -> Dict:
+    return {
+        'results': [roster.row(key[2]) for key in page],
+        'page_size': page_size,
+        'next_cursor': _local_cursor('a', page[-1]) if has_next and page else None,
+        'prev_cursor': _local_cursor('b', page[0]) if has_previous and page else None,
+        'backend_paginated': False,
+    }
+
+
+def parse_cursor_page(payload, status: Optional[str], search: Optional[str],
+                      page_size: int) -> Optional[Tuple[List[Dict], Optional[str], Optional[str]]]:
+    """Extrair (itens, próximo cursor, cursor anterior) de uma resposta do backend
+
+    O backend com suporte a cursores devolve nextCursor (null na última página)
+    e, opcionalmente, prevCursor. Sem nextCursor, ou com itens fora do filtro,
+    os parâmetros foram ignorados e a resposta retorna None.
+    """
+    if not isinstance(payload, dict) or 'nextCursor' not in payload:
+        return None
+
+    results = next((payload[k] for k in ('content', 'items', 'results') if isinstance(payload.get(k), list)), None)
+    if results is None or len(results) > page_size:
+        return None
+    if status and any(not member_matches(m, status=status) for m in results):
+        return None
+    if search and results and not any(member_matches(m, search=search) for m in results):
+        return None
+
+    next_cursor = payload.get('nextCursor')
+    prev_cursor = payload.get('prevCursor', payload.get('previousCursor'))
+    return (
+        results,
+        encode_cursor({'k': 'backend', 'c': next_cursor}) if isinstance(next_cursor, str) and next_cursor else None,
+        encode_cursor({'k': 'backend', 'c': prev_cursor}) if isinstance(prev_cursor, str) and prev_cursor else None,
+    )
+
+
+class CursorPage:
+    """Página por cursor para o template: só anterior/próxima, sem total de membros"""
+
+    def __init__(self, members_page: Dict):
+        self.object_list = members_page['results']
+        self.next_cursor = members_page['next_cursor']
+        self.prev_cursor = members_page['prev_cursor']
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from django.conf import settings
+from django.urls import NoReverseMatch, reverse
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+DEFAULT_PREWARM = {
+    'ENABLED': False,
+    # Intervalo (s) logo após uma partida a frio ou erro; dobra a cada resposta rápida até MAX_INTERVAL
+    'MIN_INTERVAL': 60,
+    # Abaixo dos 15 min de inatividade que fazem o plano gratuito do Render dormir
+    'MAX_INTERVAL': 600,
+    # Sem requisições ao front-end por esse tempo (s), o aquecimento para
+    'IDLE_AFTER': 1800,
+    # Latência (s) a partir da qual o ping conta como partida a frio do backend
+    'COLD_THRESHOLD': 2.0,
+    # Rotas (nomes de URL) que não contam como tráfego: o scraper do Prometheus e
+    # o painel de status chamam sem parar e manteriam o backend acordado para sempre
+    'IGNORE_URLS': ('metrics', 'members:backend_status'),
+}
+
+
+def prewarm_options() -> Dict:
+    return {**DEFAULT_PREWARM, **getattr(settings, 'AMPELI_API_PREWARM', {})}
+
+
+@lru_cache(maxsize=8)
+def _ignored_paths(url_names: Tuple[str, ...]) -> FrozenSet[str]:
+    paths = set()
+    for name in url_names:
+        try:
+            paths.add(reverse(name))
+        except NoReverseMatch:
+            logger.warning(f"Unknown URL name in AMPELI_API_PREWARM['IGNORE_URLS']: {name}")
+    return frozenset(paths)
+
+
+def counts_as_traffic(path: str) -> bool:
+    """Se a requisição ao caminho mantém o aquecimento ativo"""
+    return path not in _ignored_paths(tuple(prewarm_options()['IGNORE_URLS']))
+
+
+class BackendPrewarmer:
+    """Mantém o backend acordado enquanto o site recebe tráfego
+
+    Uma thread por processo pinga o health check das recomendações e uma página
+    de um membro da lista. O intervalo cai para MIN_INTERVAL quando o ping é
+    lento (o backend estava dormindo) ou falha, e dobra a cada resposta rápida.
+    Sem tráfego por IDLE_AFTER a thread termina; a próxima requisição a recria.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.last_traffic = 0.0
+        self.interval: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_ok: Optional[bool] = None
+        self.pings = 0
+        self.cold_starts = 0
+
+    def note_traffic(self) -> None:
+        """Registrar uma requisição e iniciar a thread se não estiver rodando"""
+        self.last_traffic = time.monotonic()
+        if self.running:
+            return
+        options = prewarm_options()
+        if not options['ENABLED']:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self.interval = options['MIN_INTERVAL']
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._run, name='ampeli-prewarm', daemon=True)
+            # Workers criados com fork não herdam a thread: o pid a identifica
+            self._pid = os.getpid()
+            self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            thread.join(5)
+
+    def _run(self) -> None:
+        logger.info("Backend prewarmer started")
+        while not self._wake.is_set():
+            options = prewarm_options()
+            if time.monotonic() - self.last_traffic > options['IDLE_AFTER']:
+                logger.info("Backend prewarmer stopped: no front-end traffic")
+                break
+            self.ping(options)
+            self._wake.wait(self.interval)
+
+    def ping(self, options: Optional[Dict] = None, service=None) -> float:
+        """Pingar o backend uma vez, ajustar o intervalo e retornar a latência (s)"""
+        from .pagination import backend_pagination_enabled, mark_backend_pagination_unsupported, parse_members_page
+        from .services import AmpeliAPIService
+
+        options = options or prewarm_options()
+        service = service or AmpeliAPIService()
+        started = time.monotonic()
+        ok = True
+        health = service.check_recommendations_health()
+        if isinstance(health, dict) and health.get('status') == 'error':
+            ok = False
+        # Página de um membro: sem paginação no backend ela seria a lista inteira,
+        # então o ping fica só no health check
+        if backend_pagination_enabled():
+            try:
+                payload = service._make_request('GET', service._members_page_endpoint(None, None, 1, 1))
+                if parse_members_page(payload, None, None, 1) is None:
+                    mark_backend_pagination_unsupported()
+            except Exception as e:
+                logger.debug(f"Backend prewarm ping failed: {str(e)}")
+                ok = False
+        latency = time.monotonic() - started
+
+        cold = latency >= options['COLD_THRESHOLD']
+        with self._lock:
+            self.last_latency, self.last_checked, self.last_ok = latency, time.time(), ok
+            self.pings += 1
+            self.cold_starts += 1 if cold else 0
+            if cold or not ok:
+                self.interval = options['MIN_INTERVAL']
+            else:
+                self.interval = min((self.interval or options['MIN_INTERVAL']) * 2, options['MAX_INTERVAL'])
+        if cold or not ok:
+            logger.info(f"Backend prewarm ping took {latency:.2f}s (ok={ok}); next ping in {self.interval}s")
+        return latency
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'running': self.running,
+                'interval': self.interval,
+                'last_latency': self.last_latency,
+                'last_checked': self.last_checked,
+                'last_ok': self.last_ok,
+                'pings': self.pings,
+                'cold_starts': self.cold_starts,
+            }
+
+
+prewarmer = BackendPrewarmer()
+
+
+def prewarm_status() -> Dict:
+    """Última latência observada do backend e estado do aquecimento neste processo"""
+    return prewarmer.status()
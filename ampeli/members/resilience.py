@@ -0,0 +1,304 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from django.conf import settings
+
+from .http_client import AmpeliAPIError, DeadlineExceeded, current_budget, remaining_time
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+# ==================== SINGLE-FLIGHT ====================
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa chamadas idênticas simultâneas numa única chamada ao backend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Executar fn, ou aguardar o resultado da execução já em andamento para key"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.issued += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return self._wait(key, call)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _wait(self, key: Hashable, call: _Call) -> Any:
+        # Quem aguarda continua limitado pelo próprio deadline da requisição
+        budget = current_budget()
+        timeout = max(budget.remaining(), 0) if budget is not None else None
+        if not call.done.wait(timeout):
+            budget.exhausted = True
+            raise DeadlineExceeded(f"Tempo limite da requisição esgotado aguardando {key}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'issued': self.issued,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
+
+
+# GETs em andamento no worker, compartilhados por todas as instâncias do serviço
+backend_flights = SingleFlight()
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+DEFAULT_BREAKER_OPTIONS = {
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+}
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem acessar a rede porque o circuito está aberto"""
+
+
+class CircuitBreaker:
+    """Circuit breaker (fechado, aberto, meio-aberto) para um grupo de endpoints"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.short_circuited = 0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Liberar a chamada ou levantar CircuitOpenError imediatamente"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Fim do resfriamento: esta chamada é a sonda do estado meio-aberto
+                self._transition(self.HALF_OPEN)
+                self._probe_in_flight = True
+                return
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.short_circuited += 1
+        raise CircuitOpenError(f"Circuito aberto para o grupo '{self.name}' do backend")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._transition(self.OPEN)
+
+    def abandon(self) -> None:
+        """Chamada interrompida sem resultado (cancelada): libera a sonda sem contar falha"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'short_circuited': self.short_circuited,
+                'times_opened': self.times_opened,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(group: str) -> CircuitBreaker:
+    """Circuit breaker do worker para a classe de endpoint"""
+    breaker = _breakers.get(group)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(group)
+            if breaker is None:
+                config = getattr(settings, 'AMPELI_API_CIRCUIT_BREAKER', {})
+                options = {
+                    **DEFAULT_BREAKER_OPTIONS,
+                    **{k: v for k, v in config.items() if k != 'GROUPS'},
+                    **config.get('GROUPS', {}).get(group, {}),
+                }
+                breaker = _breakers[group] = CircuitBreaker(group, **options)
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado de todos os circuit breakers do worker"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# ==================== RETRY ====================
+
+DEFAULT_RETRY_OPTIONS = {
+    'max_attempts': 3,
+    'base_delay': 0.25,
+    'max_delay': 4.0,
+    # Retry-After maior que isto (segundos) desiste em vez de esperar
+    'max_retry_after': 10.0,
+    # Cada requisição original deposita budget_ratio de retry no orçamento do
+    # worker; além disso o orçamento recebe min_per_second por segundo
+    'budget_ratio': 0.2,
+    'budget_min_per_second': 1.0,
+    'budget_max_tokens': 20,
+}
+
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+# Métodos que podem ser repetidos com segurança; POSTs nunca são repetidos
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+
+def retry_options() -> Dict[str, Any]:
+    return {**DEFAULT_RETRY_OPTIONS, **getattr(settings, 'AMPELI_API_RETRY', {})}
+
+
+def backoff_delay(attempt: int, options: Dict[str, Any]) -> float:
+    """Backoff exponencial com jitter completo para a tentativa (1, 2, ...)"""
+    ceiling = min(options['max_delay'], options['base_delay'] * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """Limita retries a uma fração das requisições do worker, evitando tempestades"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._updated_at = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self, options: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if self._tokens is None:
+            self._tokens = float(options['budget_max_tokens'])
+        self._tokens = min(
+            options['budget_max_tokens'],
+            self._tokens + (now - self._updated_at) * options['budget_min_per_second'],
+        )
+        self._updated_at = now
+
+    def deposit(self) -> None:
+        """Registrar uma requisição original"""
+        options = retry_options()
+        with self._lock:
+            self._refill(options)
+            self._tokens = min(options['budget_max_tokens'], self._tokens + options['budget_ratio'])
+
+    def try_withdraw(self) -> bool:
+        """Consumir um retry do orçamento; False se esgotado"""
+        options = retry_options()
+        with self._lock:
+            self._refill(options)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tokens': self._tokens if self._tokens is not None else retry_options()['budget_max_tokens'],
+                'retries': self.retries,
+                'exhausted': self.exhausted,
+            }
+
+
+# Orçamento de retries do worker, compartilhado por todas as chamadas
+retry_budget = RetryBudget()
+
+
+def retry_delay(method: str, url: str, error: AmpeliAPIError, attempt: int,
+                options: Dict[str, Any]) -> Optional[float]:
+    """Espera (s) antes de repetir a tentativa que falhou, ou None para desistir
+
+    Usado pelos serviços síncrono e assíncrono, que só diferem na forma de
+    esperar (time.sleep ou asyncio.sleep). Um retry concedido consome o orçamento.
+    """
+    if not (method in IDEMPOTENT_METHODS and error.retryable) or attempt >= options['max_attempts']:
+        return None
+
+    delay = backoff_delay(attempt, options)
+    if error.retry_after is not None:
+        if error.retry_after > options['max_retry_after']:
+            return None
+        delay = max(delay, error.retry_after)
+    # Não esperar além do deadline da requisição
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        return None
+    if not retry_budget.try_withdraw():
+        logger.warning(f"Retry budget exhausted, not retrying {method} {url}")
+        return None
+
+    logger.info(f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt + 1}): {str(error)}")
+    return delay
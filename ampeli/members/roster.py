@@ -0,0 +1,385 @@
+import itertools
+import json
+import threading
+import zlib
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .search import MemberSearchIndex, NamePrefixIndex
+
+
+# Versões únicas no processo; mudam a cada nova lista ou alteração de membro
+_versions = itertools.count(1)
+
+class _Missing:
+    """Tipo da sentinela MISSING; continua a mesma instância após pickle"""
+
+    def __reduce__(self):
+        return 'MISSING'
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+
+# Sentinela para campos ausentes no JSON do membro (diferente de null)
+MISSING = _Missing()
+
+# Campos de escolha guardados como códigos inteiros pequenos
+CHOICE_FIELDS = ('memberStatus', 'faithStage', 'gender', 'maritalStatus')
+
+# Textos livres longos: comprimidos e decodificados só quando acessados
+HEAVY_TEXT_FIELDS = ('faithDifficulties', 'previousChurches')
+
+# Outros campos com poucos valores distintos (até 1 a cada CHOICE_RATIO linhas)
+# também são internados: a maioria vem de selects do formulário de onboarding
+CHOICE_RATIO = 8
+CHOICE_MIN_DISTINCT = 16
+
+# Textos longos a partir deste tamanho (bytes) são comprimidos com zlib
+COMPRESS_MIN_BYTES = 64
+
+# Estado de cada linha nas colunas de texto
+_PRESENT, _NULL, _ABSENT, _COMPRESSED = 0, 1, 2, 3
+
+
+class StringColumn:
+    """Textos de uma coluna concatenados num único bloco UTF-8 com offsets"""
+
+    def __init__(self, values: List[Any], compress: bool = False):
+        chunks, offsets, states = [], [0], bytearray(len(values))
+        size = 0
+        for i, value in enumerate(values):
+            if value is MISSING:
+                states[i] = _ABSENT
+            elif value is None:
+                states[i] = _NULL
+            else:
+                data = value.encode('utf-8')
+                if compress and len(data) >= COMPRESS_MIN_BYTES:
+                    data = zlib.compress(data)
+                    states[i] = _COMPRESSED
+                chunks.append(data)
+                size += len(data)
+            offsets.append(size)
+        self._data = b''.join(chunks)
+        self._offsets = array('I' if size < 2 ** 32 else 'Q', offsets)
+        # Sem nulos, ausentes ou comprimidos não é preciso guardar o estado por linha
+        self._states = states if any(states) else None
+
+    def __getitem__(self, index: int) -> Any:
+        state = self._states[index] if self._states is not None else _PRESENT
+        if state == _ABSENT:
+            return MISSING
+        if state == _NULL:
+            return None
+        data = self._data[self._offsets[index]:self._offsets[index + 1]]
+        if state == _COMPRESSED:
+            data = zlib.decompress(data)
+        return data.decode('utf-8')
+
+
+class ChoiceColumn:
+    """Valores repetidos (status, estágio da fé...) internados como códigos pequenos"""
+
+    def __init__(self, values: List[Any]):
+        self.choices: List[Any] = []
+        codes_by_value: Dict[Any, int] = {}
+        codes = []
+        for value in values:
+            # O tipo entra na chave para True/1 e False/0 não se confundirem
+            key = (type(value), value)
+            code = codes_by_value.get(key)
+            if code is None:
+                code = codes_by_value[key] = len(self.choices)
+                self.choices.append(value)
+            codes.append(code)
+        distinct = len(self.choices)
+        self.codes = array('B' if distinct <= 256 else 'H' if distinct <= 65536 else 'L', codes)
+
+    def __getitem__(self, index: int) -> Any:
+        return self.choices[self.codes[index]]
+
+    def code_of(self, value: Any) -> Optional[int]:
+        return next((code for code, choice in enumerate(self.choices)
+                     if type(choice) is type(value) and choice == value), None)
+
+
+class IntColumn:
+    """Inteiros (ids) num array de 8 bytes por linha"""
+
+    def __init__(self, values: List[int]):
+        self._values = array('q', values)
+
+    def __getitem__(self, index: int) -> int:
+        return self._values[index]
+
+
+class JSONColumn:
+    """Objetos aninhados e listas (ex.: user) guardados como JSON compacto"""
+
+    def __init__(self, values: List[Any]):
+        self._column = StringColumn([
+            v if v is MISSING else json.dumps(v, separators=(',', ':'), ensure_ascii=False)
+            for v in values
+        ])
+
+    def __getitem__(self, index: int) -> Any:
+        value = self._column[index]
+        return value if value is MISSING else json.loads(value)
+
+
+def _is_low_cardinality(values: List[Any]) -> bool:
+    try:
+        distinct = len({(type(v), v) for v in values})
+    except TypeError:
+        return False
+    return distinct <= min(65536, max(CHOICE_MIN_DISTINCT, len(values) // CHOICE_RATIO))
+
+
+def _build_column(field: str, values: List[Any]):
+    if field in CHOICE_FIELDS:
+        return ChoiceColumn(values)
+    if values and all(type(v) is int and -2 ** 63 <= v < 2 ** 63 for v in values):
+        return IntColumn(values)
+    if field not in HEAVY_TEXT_FIELDS and _is_low_cardinality(values):
+        return ChoiceColumn(values)
+    present = [v for v in values if v is not MISSING and v is not None]
+    if all(isinstance(v, str) for v in present):
+        return StringColumn(values, compress=field in HEAVY_TEXT_FIELDS)
+    return JSONColumn(values)
+
+
+class MemberRow(Mapping):
+    """Visão somente leitura de um membro do Roster, com a interface de um dict"""
+
+    __slots__ = ('_roster', '_index')
+
+    def __init__(self, roster: 'Roster', index: int):
+        self._roster = roster
+        self._index = index
+
+    def __getitem__(self, field: str) -> Any:
+        value = self._roster._value(self._index, field)
+        if value is MISSING:
+            raise KeyError(field)
+        return value
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = self._roster._value(self._index, field)
+        return default if value is MISSING else value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._roster._fields_of(self._index))
+
+    def __len__(self) -> int:
+        return len(self._roster._fields_of(self._index))
+
+    @property
+    def index(self) -> int:
+        """Posição física da linha nas colunas do Roster"""
+        return self._index
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: self[field] for field in self}
+
+    def __repr__(self) -> str:
+        return f'MemberRow({self.to_dict()!r})'
+
+
+class Roster(Sequence):
+    """Lista completa de membros em cache, em colunas, com versão e índices de busca
+
+    Cada campo vira uma coluna compacta (textos num bloco UTF-8, escolhas como
+    códigos, textos longos comprimidos) e os membros são lidos por visões
+    MemberRow. Alterações de um membro ficam sobrepostas às colunas; os índices
+    de busca são construídos no primeiro uso e acompanham upsert/remove_member.
+    """
+
+    def __init__(self, members: Iterable[Dict] = ()):
+        members = list(members)
+        fields: Dict[str, None] = {}
+        for member in members:
+            fields.update(dict.fromkeys(member))
+        self._fields = list(fields)
+        self._columns = {
+            field: _build_column(field, [m.get(field, MISSING) for m in members])
+            for field in self._fields
+        }
+        # Campos ausentes em algum membro: as linhas listam só os presentes
+        self._sparse = any(len(m) != len(self._fields) for m in members)
+        self._size = len(members)
+        self._next_index = self._size
+        self._order = array('Q', range(self._size))
+        self._overrides: Dict[int, Dict] = {}
+        self.version = next(_versions)
+        # Momento da coleta quando a lista vem de um snapshot em disco (dados antigos)
+        self.as_of = None
+        self._lock = threading.RLock()
+        self._search_index: Optional[MemberSearchIndex] = None
+        self._prefix_index: Optional[NamePrefixIndex] = None
+
+    # Acesso às linhas
+
+    def _value(self, index: int, field: str) -> Any:
+        override = self._overrides.get(index)
+        if override is not None:
+            return override.get(field, MISSING)
+        column = self._columns.get(field)
+        return column[index] if column is not None else MISSING
+
+    def _fields_of(self, index: int) -> List[str]:
+        override = self._overrides.get(index)
+        if override is not None:
+            return list(override)
+        if not self._sparse:
+            return self._fields
+        return [f for f in self._fields if self._columns[f][index] is not MISSING]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def indices(self) -> array:
+        """Posições físicas das linhas, em ordem crescente"""
+        return self._order
+
+    def row(self, index: int) -> MemberRow:
+        return MemberRow(self, index)
+
+    def values(self, field: str) -> Iterator[Tuple[int, Any]]:
+        """(posição física, valor) do campo para cada membro; MISSING se ausente"""
+        column = self._columns.get(field)
+        overrides = self._overrides
+        for index in self._order:
+            if index in overrides:
+                yield index, overrides[index].get(field, MISSING)
+            else:
+                yield index, column[index] if column is not None else MISSING
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [MemberRow(self, index) for index in self._order[position]]
+        return MemberRow(self, self._order[position])
+
+    def __iter__(self) -> Iterator[MemberRow]:
+        for index in self._order:
+            yield MemberRow(self, index)
+
+    def matcher(self, field: str, value: Any) -> Callable[[int], bool]:
+        """Teste, por posição física, do campo igual ao valor; campos de escolha comparam só os códigos"""
+        column = self._columns.get(field)
+        if not isinstance(column, ChoiceColumn):
+            return lambda index: MemberRow(self, index).get(field) == value
+
+        code = column.code_of(value)
+        codes, overrides = column.codes, self._overrides
+        return lambda index: overrides[index].get(field) == value if index in overrides else codes[index] == code
+
+    def where(self, field: str, value: Any) -> List[MemberRow]:
+        """Membros com o campo igual ao valor"""
+        matches = self.matcher(field, value)
+        return [MemberRow(self, index) for index in self._order if matches(index)]
+
+    def to_list(self) -> List[Dict]:
+        """Membros como dicts, no formato devolvido pela API"""
+        return [row.to_dict() for row in self]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Colunas compactas vão como estão (arrays e blocos de bytes): carregar
+        # em outro processo não reconstrói as colunas; os índices são refeitos sob demanda
+        state = self.__dict__.copy()
+        for attribute in ('_lock', '_search_index', '_prefix_index', 'version'):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.version = next(_versions)
+        self._lock = threading.RLock()
+        self._search_index = None
+        self._prefix_index = None
+
+    # Índices de busca
+
+    @property
+    def search_index(self) -> MemberSearchIndex:
+        if self._search_index is None:
+            with self._lock:
+                if self._search_index is None:
+                    self._search_index = MemberSearchIndex(self)
+        return self._search_index
+
+    @property
+    def prefix_index(self) -> NamePrefixIndex:
+        if self._prefix_index is None:
+            with self._lock:
+                if self._prefix_index is None:
+                    self._prefix_index = NamePrefixIndex(self)
+        return self._prefix_index
+
+    def complete(self, query: str, limit: int = 10) -> List[MemberRow]:
+        """Autocompletar: membros cujas palavras do nome começam com a consulta"""
+        return self.prefix_index.complete(query, limit)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[MemberRow]:
+        """Membros que casam com a consulta, do mais ao menos relevante"""
+        return self.search_index.search(query, limit)
+
+    # Alterações de um único membro
+
+    def _position(self, member_id: Hashable) -> Optional[int]:
+        # IDs vindos da URL podem chegar como texto
+        member_id = str(member_id)
+        return next(
+            (p for p, index in enumerate(self._order) if str(self._value(index, 'id')) == member_id), None
+        )
+
+    def upsert(self, member: Dict) -> None:
+        """Incluir ou substituir um membro (pelo id) mantendo os índices em dia"""
+        with self._lock:
+            position = self._position(member.get('id'))
+            if position is None:
+                index = self._next_index
+                self._next_index += 1
+                self._order.append(index)
+            else:
+                index = self._order[position]
+            self._overrides[index] = dict(member)
+            row = MemberRow(self, index)
+            if self._search_index is not None:
+                self._search_index.upsert(row)
+            if self._prefix_index is not None:
+                self._prefix_index.upsert(row)
+            self.version = next(_versions)
+
+    def remove_member(self, member_id: Hashable) -> None:
+        with self._lock:
+            position = self._position(member_id)
+            if position is None:
+                return
+            removed_id = self._value(self._order[position], 'id')
+            del self._order[position]
+            if self._search_index is not None:
+                self._search_index.remove(removed_id)
+            if self._prefix_index is not None:
+                self._prefix_index.remove(removed_id)
+            self.version = next(_versions)
+
+
+def project_member(member, fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Só os campos pedidos do membro (todos se fields for None); do Roster lê só essas colunas"""
+    if fields is None:
+        return dict(member)
+    projected = {}
+    for field in fields:
+        value = member.get(field, MISSING)
+        if value is not MISSING:
+            projected[field] = value
+    return projected
+
+
+def as_roster(members):
+    """Converter a lista de membros da API num Roster (outros valores passam intactos)"""
+    if isinstance(members, list):
+        return Roster(members)
+    return members
@@ -0,0 +1,249 @@
+import bisect
+import heapq
+import threading
+import unicodedata
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+def normalize(text: Optional[str]) -> str:
+    """Chave de busca sem acentos e sem diferença de caixa ("Conceição" -> "conceicao")"""
+    if not text:
+        return ''
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def digits(text: Optional[str]) -> str:
+    """Apenas os dígitos, para comparar telefones em qualquer formatação"""
+    return ''.join(c for c in str(text or '') if c.isdigit())
+
+
+def trigrams(key: str) -> Set[str]:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def member_keys(member: Dict) -> Tuple[str, str, str]:
+    """Chaves pré-calculadas de nome, email e telefone do membro"""
+    return normalize(member.get('fullName')), normalize(member.get('email')), digits(member.get('phone'))
+
+
+def match_rank(keys: Tuple[str, str, str], query: str, query_digits: str) -> Optional[int]:
+    """Posição do membro no ranking da busca (menor é melhor), ou None se não casa"""
+    name, email, phone = keys
+    if query:
+        if name.startswith(query):
+            return 0
+        if f' {query}' in name:
+            return 1
+        if query in name:
+            return 2
+        if email.startswith(query):
+            return 3
+        if query in email:
+            return 4
+    if len(query_digits) >= 3 and query_digits in phone:
+        return 5
+    return None
+
+
+class MemberSearchIndex:
+    """Índice invertido de trigramas sobre nome, email e telefone dos membros
+
+    Construído uma vez por versão da lista; consultas com 3+ caracteres só
+    verificam os membros que têm todos os trigramas da consulta, e alterações
+    de um único membro atualizam apenas as entradas dele.
+    """
+
+    def __init__(self, members: Iterable[Dict] = ()):
+        self._lock = threading.RLock()
+        self._members: Dict[Hashable, Dict] = {}
+        self._keys: Dict[Hashable, Tuple[str, str, str]] = {}
+        self._postings: Dict[str, Set[Hashable]] = {}
+        for position, member in enumerate(members):
+            self.upsert(member, position)
+
+    def _member_id(self, member: Dict, position: Optional[int]) -> Hashable:
+        member_id = member.get('id')
+        return member_id if member_id is not None else ('position', position)
+
+    def upsert(self, member: Dict, position: Optional[int] = None) -> None:
+        """Incluir ou substituir um membro no índice"""
+        member_id = self._member_id(member, position)
+        keys = member_keys(member)
+        with self._lock:
+            self.remove(member_id)
+            self._members[member_id] = member
+            self._keys[member_id] = keys
+            for gram in self._grams(keys):
+                self._postings.setdefault(gram, set()).add(member_id)
+
+    def remove(self, member_id: Hashable) -> None:
+        with self._lock:
+            keys = self._keys.pop(member_id, None)
+            self._members.pop(member_id, None)
+            if keys is None:
+                return
+            for gram in self._grams(keys):
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(member_id)
+                    if not ids:
+                        del self._postings[gram]
+
+    def _grams(self, keys: Tuple[str, str, str]) -> Set[str]:
+        name, email, phone = keys
+        return trigrams(name) | trigrams(email) | trigrams(phone)
+
+    def _candidates(self, grams: Set[str]) -> Set[Hashable]:
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return set()
+        return set(postings[0]).intersection(*postings[1:])
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Membros cujo nome, email ou telefone contém a consulta, ordenados por relevância"""
+        query = normalize(query).strip()
+        query_digits = digits(query)
+        if not query:
+            return []
+
+        with self._lock:
+            if len(query) >= 3:
+                candidates = self._candidates(trigrams(query))
+                if len(query_digits) >= 3:
+                    candidates |= self._candidates(trigrams(query_digits))
+            else:
+                # Consultas curtas não têm trigramas: comparar as chaves prontas
+                candidates = self._keys.keys()
+
+            ranked = []
+            for member_id in candidates:
+                keys = self._keys[member_id]
+                rank = match_rank(keys, query, query_digits)
+                if rank is not None:
+                    ranked.append((rank, keys[0], self._members[member_id]))
+
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        members = [member for _, _, member in ranked]
+        return members[:limit] if limit is not None else members
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+def name_tokens(name: Optional[str]) -> List[str]:
+    """Palavras normalizadas do nome ("Maria da Conceição" -> maria, da, conceicao)"""
+    return normalize(name).split()
+
+
+class NamePrefixIndex:
+    """Array ordenado de (palavra do nome, nome, id) para autocompletar por prefixo
+
+    Cada consulta faz uma busca binária pela palavra mais longa digitada e
+    percorre só os itens com esse prefixo até juntar os k primeiros membros.
+    """
+
+    def __init__(self, members: Iterable[Dict] = ()):
+        self._lock = threading.RLock()
+        self._members: Dict[str, Dict] = {}
+        self._tokens: Dict[str, Tuple[str, List[str]]] = {}
+        entries = []
+        for member in members:
+            key = self._key(member)
+            if key is None:
+                continue
+            name, tokens = self._register(key, member)
+            entries.extend((token, name, key) for token in set(tokens))
+        entries.sort()
+        self._entries: List[Tuple[str, str, str]] = entries
+
+    def _key(self, member: Dict) -> Optional[str]:
+        member_id = member.get('id')
+        return str(member_id) if member_id is not None else None
+
+    def _register(self, key: str, member: Dict) -> Tuple[str, List[str]]:
+        name = normalize(member.get('fullName'))
+        tokens = name.split()
+        self._members[key] = member
+        self._tokens[key] = (name, tokens)
+        return name, tokens
+
+    def upsert(self, member: Dict) -> None:
+        """Incluir ou substituir um membro sem reordenar o array inteiro"""
+        key = self._key(member)
+        if key is None:
+            return
+        with self._lock:
+            self.remove(key)
+            name, tokens = self._register(key, member)
+            for token in set(tokens):
+                bisect.insort(self._entries, (token, name, key))
+
+    def remove(self, member_id) -> None:
+        key = str(member_id)
+        with self._lock:
+            registered = self._tokens.pop(key, None)
+            self._members.pop(key, None)
+            if registered is None:
+                return
+            name, tokens = registered
+            for token in set(tokens):
+                entry = (token, name, key)
+                position = bisect.bisect_left(self._entries, entry)
+                if position < len(self._entries) and self._entries[position] == entry:
+                    del self._entries[position]
+
+    def complete(self, query: str, limit: int = 10) -> List[Dict]:
+        """Até limit membros cujo nome tem palavras começando com cada termo da consulta"""
+        terms = name_tokens(query)
+        if not terms or limit <= 0:
+            return []
+        # A palavra mais longa é a mais seletiva para a busca binária
+        anchor = max(terms, key=len)
+        others = [term for term in terms if term is not anchor]
+
+        results, seen = [], set()
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (anchor,))
+            while position < len(self._entries) and len(results) < limit:
+                token, _, key = self._entries[position]
+                if not token.startswith(anchor):
+                    break
+                position += 1
+                if key in seen:
+                    continue
+                seen.add(key)
+                tokens = self._tokens[key][1]
+                if all(any(t.startswith(term) for t in tokens) for term in others):
+                    results.append(self._members[key])
+        return results
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+def complete_members(members: Iterable[Dict], query: str, limit: int = 10) -> List[Dict]:
+    """Mesmo resultado de NamePrefixIndex.complete numa única passada, sem índice
+
+    Para listas usadas numa só consulta, em que ordenar o índice custaria mais
+    que percorrer os membros.
+    """
+    terms = name_tokens(query)
+    if not terms or limit <= 0:
+        return []
+    anchor = max(terms, key=len)
+
+    matches = []
+    for member in members:
+        if member.get('id') is None:
+            continue
+        name = normalize(member.get('fullName'))
+        tokens = name.split()
+        if all(any(t.startswith(term) for t in tokens) for term in terms):
+            # Ordem do índice: (palavra que casa com o termo mais longo, nome, id)
+            token = min(t for t in tokens if t.startswith(anchor))
+            matches.append((token, name, str(member['id']), member))
+    return [match[3] for match in heapq.nsmallest(limit, matches, key=lambda match: match[:3])]
@@ -0,0 +1,261 @@
+import re
+import threading
+import weakref
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import Member
+from .roster import Roster
+from .search import normalize
+
+
+# Campos de escolha do Member que podem ser usados em segmentos: nome no
+# modelo -> chave no JSON da API. Chaves que a lista não traz só geram bitsets
+# vazios (o segmento fica vazio, sem erro)
+SEGMENT_FIELDS = {
+    'member_status': 'memberStatus',
+    'gender': 'gender',
+    'marital_status': 'maritalStatus',
+    'faith_stage': 'faithStage',
+    'contact_preference': 'contactPreference',
+    'event_preference': 'eventPreference',
+    'church_discovery': 'howFoundChurch',
+}
+
+# Campos booleanos: o nome sozinho no segmento significa "verdadeiro"
+SEGMENT_FLAGS = {
+    'volunteer_interest': 'volunteerInterest',
+    'open_to_new_groups': 'openToNewGroups',
+    'pastoral_care_interest': 'pastoralSupportInterest',
+    'onboarding_completed': 'onboardingCompleted',
+}
+
+TRUE_WORDS = ('true', 'sim', '1', 'yes')
+FALSE_WORDS = ('false', 'nao', '0', 'no')
+
+_FIELD_ALIASES = {
+    normalize(alias): field
+    for field, key in {**SEGMENT_FIELDS, **SEGMENT_FLAGS}.items()
+    for alias in (field, key)
+}
+
+_KEYWORDS = {'and': '&', 'e': '&', 'or': '|', 'ou': '|', 'not': '!'}
+
+_TOKEN_RE = re.compile(r'\s*(?:([(),&|!=:])|([^\s(),&|!=:]+))')
+
+
+class SegmentError(ValueError):
+    """Expressão de segmento inválida"""
+
+
+def _describe(token) -> str:
+    return token[1] if isinstance(token, tuple) else token
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if match is None:
+            raise SegmentError(f'Caractere inválido no segmento: {expression[position]!r}')
+        symbol, word = match.groups()
+        if word is not None:
+            word = normalize(word)
+            tokens.append(_KEYWORDS[word] if word in _KEYWORDS else ('word', word))
+        else:
+            tokens.append(':' if symbol == '=' else symbol)
+        position = match.end()
+    return tokens
+
+
+@lru_cache(maxsize=256)
+def parse_segment(expression: str) -> Tuple:
+    """Converter a expressão em árvore de tuplas ('or'|'and'|'not'|'term', ...)
+
+    Sintaxe: termos campo=valor (ou campo:valor), valores sozinhos (active,
+    whatsapp) ou nomes de campos booleanos (volunteer_interest), combinados com
+    vírgula, & ou AND; | ou OR; ! ou NOT; e parênteses.
+    """
+    tokens = _tokenize(expression)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        token = peek()
+        position += 1
+        return token
+
+    def parse_or():
+        node = parse_and()
+        while peek() == '|':
+            take()
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() in (',', '&'):
+            take()
+            node = ('and', node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == '!':
+            take()
+            return ('not', parse_not())
+        return parse_primary()
+
+    def parse_primary():
+        token = take()
+        if token == '(':
+            node = parse_or()
+            if take() != ')':
+                raise SegmentError('Parêntese não fechado no segmento')
+            return node
+        if not isinstance(token, tuple):
+            raise SegmentError(f'Termo esperado no segmento, encontrado {_describe(token) or "fim da expressão"!r}')
+        if peek() == ':':
+            take()
+            value = take()
+            if not isinstance(value, tuple):
+                raise SegmentError(f'Valor esperado após {token[1]}=')
+            field = _FIELD_ALIASES.get(token[1])
+            if field is None:
+                raise SegmentError(f'Campo desconhecido no segmento: {token[1]}')
+            return ('term', field, value[1])
+        return ('term', None, token[1])
+
+    if not tokens:
+        raise SegmentError('Segmento vazio')
+    tree = parse_or()
+    if peek() is not None:
+        raise SegmentError(f'Termo inesperado no segmento: {_describe(peek())!r}')
+    return tree
+
+
+def _bitset(indices: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Posições dos bits ligados, em ordem crescente"""
+    binary = bin(bits)[:1:-1]
+    index = binary.find('1')
+    while index != -1:
+        yield index
+        index = binary.find('1', index + 1)
+
+
+def bit_membership(bits: int) -> Callable[[int], bool]:
+    """Teste de pertinência de uma posição ao bitset
+
+    Deslocar o inteiro a cada teste custaria O(N); os bytes são extraídos uma
+    vez e cada teste lê um só byte.
+    """
+    mask = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    size = len(mask)
+    return lambda index: (index >> 3) < size and bool(mask[index >> 3] >> (index & 7) & 1)
+
+
+@lru_cache(maxsize=None)
+def _field_choices(field: str) -> Tuple[str, ...]:
+    return tuple(normalize(code) for code, _ in Member._meta.get_field(field).choices or ())
+
+
+class SegmentIndex:
+    """Um bitset por valor de cada campo de escolha, sobre as posições do Roster
+
+    AND/OR/NOT viram operações bit a bit em inteiros do Python; o custo de uma
+    consulta depende do número de termos, não de percorrer os membros.
+    """
+
+    def __init__(self, roster: Roster):
+        self.version = roster.version
+        size = max(roster.indices()[-1] + 1, 0) if len(roster) else 0
+        self.universe = _bitset(roster.indices(), size)
+        self.bits: Dict[str, Dict[object, int]] = {}
+
+        for field, key in SEGMENT_FIELDS.items():
+            positions: Dict[str, List[int]] = {}
+            for index, value in roster.values(key):
+                if isinstance(value, str) and value:
+                    positions.setdefault(normalize(value), []).append(index)
+            self.bits[field] = {value: _bitset(indices, size) for value, indices in positions.items()}
+
+        for field, key in SEGMENT_FLAGS.items():
+            indices = [index for index, value in roster.values(key) if _is_true(value)]
+            self.bits[field] = {True: _bitset(indices, size)}
+
+    def term(self, field: Optional[str], value: str) -> int:
+        if field is None:
+            field, value = self._resolve(value)
+        if field in SEGMENT_FLAGS:
+            if value is True or value in TRUE_WORDS:
+                return self.bits[field][True]
+            if value in FALSE_WORDS:
+                return self.universe & ~self.bits[field][True]
+            raise SegmentError(f'Valor inválido para {field}: {value} (use true ou false)')
+        return self.bits[field].get(normalize(value), 0)
+
+    def _resolve(self, word: str) -> Tuple[str, object]:
+        """Campo de um termo sem campo: flag pelo nome, ou o primeiro campo com esse valor"""
+        if _FIELD_ALIASES.get(word) in SEGMENT_FLAGS:
+            return _FIELD_ALIASES[word], True
+        for field in SEGMENT_FIELDS:
+            if word in self.bits[field] or word in _field_choices(field):
+                return field, word
+        raise SegmentError(f'Termo desconhecido no segmento: {word}')
+
+    def evaluate(self, node: Tuple) -> int:
+        kind = node[0]
+        if kind == 'term':
+            return self.term(node[1], node[2])
+        if kind == 'not':
+            return self.universe & ~self.evaluate(node[1])
+        left, right = self.evaluate(node[1]), self.evaluate(node[2])
+        return left & right if kind == 'and' else left | right
+
+
+def _is_true(value) -> bool:
+    return value is True or (isinstance(value, str) and normalize(value) in TRUE_WORDS)
+
+
+_indexes: "weakref.WeakKeyDictionary[Roster, SegmentIndex]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def segment_index(roster: Roster) -> SegmentIndex:
+    """Índice de segmentos do Roster, reconstruído quando a versão muda"""
+    index = _indexes.get(roster)
+    if index is None or index.version != roster.version:
+        with _indexes_lock:
+            index = _indexes.get(roster)
+            if index is None or index.version != roster.version:
+                index = _indexes[roster] = SegmentIndex(roster)
+    return index
+
+
+def segment_bits(roster: Roster, expression: str, status: Optional[str] = None) -> int:
+    index = segment_index(roster)
+    bits = index.evaluate(parse_segment(expression))
+    if status:
+        bits &= index.term('member_status', status)
+    return bits
+
+
+def select_segment(roster: Roster, expression: str, status: Optional[str] = None) -> List:
+    """Membros do Roster que pertencem ao segmento, na ordem da lista"""
+    return [roster.row(index) for index in iter_bits(segment_bits(roster, expression, status))]
+
+
+def filter_segment(roster: Roster, expression: str, rows: Iterable) -> List:
+    """Manter, na ordem recebida (ex.: relevância da busca), só as linhas do segmento"""
+    selected = bit_membership(segment_bits(roster, expression))
+    return [row for row in rows if selected(row.index)]
@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+DEFAULT_SERVER_TIMING = {
+    'ENABLED': True,
+    # E-mails (session['user_email']) de administradores, que sempre recebem o cabeçalho
+    'ADMIN_EMAILS': [],
+    # Enviar também para sessões de não administradores (e anônimas)
+    'NON_ADMIN': False,
+    # Limite de entradas por resposta, para o cabeçalho não crescer sem controle
+    'MAX_ENTRIES': 30,
+}
+
+
+def server_timing_options() -> Dict:
+    return {**DEFAULT_SERVER_TIMING, **getattr(settings, 'AMPELI_SERVER_TIMING', {})}
+
+
+# Medições da requisição atual: (nome, duração em ms, descrição). Tarefas
+# asyncio herdam o contexto e compartilham a mesma lista; threads de
+# atualização em segundo plano não herdam e não são medidas.
+_timings: ContextVar[Optional[List[Tuple[str, float, str]]]] = ContextVar('ampeli_server_timing', default=None)
+
+
+def begin_timings():
+    return _timings.set([])
+
+
+def end_timings(token) -> List[Tuple[str, float, str]]:
+    timings = _timings.get() or []
+    _timings.reset(token)
+    return timings
+
+
+def record_timing(name: str, seconds: float, description: str = '') -> None:
+    """Registrar uma medição na requisição atual (ignorado fora de uma requisição)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds * 1000, description))
+
+
+@contextmanager
+def server_timing(name: str, description: str = ''):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started, description)
+
+
+def _quote(description: str) -> str:
+    return '"' + description.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def format_server_timing(timings: List[Tuple[str, float, str]], max_entries: int) -> str:
+    """Valor do cabeçalho Server-Timing; chamadas ao backend além do limite viram um total"""
+    entries, skipped, skipped_ms = [], 0, 0.0
+    for name, duration, description in timings:
+        if len(entries) >= max_entries:
+            skipped, skipped_ms = skipped + 1, skipped_ms + duration
+            continue
+        entry = f'{name};dur={duration:.1f}'
+        if description:
+            entry += f';desc={_quote(description)}'
+        entries.append(entry)
+    if skipped:
+        entries.append(f'other;dur={skipped_ms:.1f};desc="{skipped} omitidas"')
+    return ', '.join(entries)
+
+
+def server_timing_allowed(session_email: Optional[str], options: Dict) -> bool:
+    if not options['ENABLED']:
+        return False
+    return options['NON_ADMIN'] or (bool(session_email) and session_email in options['ADMIN_EMAILS'])
+
+
+class TimedTemplate(Template):
+    """Template do Django que registra o tempo de renderização no Server-Timing"""
+
+    def render(self, context=None, request=None):
+        with server_timing('render', self.origin.template_name or ''):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates cujos templates medem a própria renderização
+
+    Includes e extends são renderizados dentro do template principal, então
+    cada página gera uma única entrada 'render'.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
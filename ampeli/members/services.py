@@ -1,10 +1,30 @@
 import json
+import threading
+import time
 import requests
+from urllib.parse import urlencode
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.utils import timezone
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
+from .cache import EXPIRED, MISSING, STALE, cache_enabled, cache_options, entry_state, get_cache, is_fresh
+from .filters import filter_members, matching_indices
+from .http_client import (
+    AmpeliAPIError, check_deadline_after_timeout, endpoint_group, get_session,
+    parse_retry_after, remaining_time, request_timeout,
+)
+from .metrics import BackendCall
+from .pagination import (
+    backend_cursor, backend_pagination_enabled, decode_cursor, default_page_size, keyset_page, last_page,
+    local_cursor, local_members_page, mark_backend_pagination_unsupported, parse_cursor_page, parse_members_page, sorted_keys,
+)
+from .resilience import (
+    RETRYABLE_STATUS_CODES, backend_flights, get_breaker, retry_budget, retry_delay, retry_options,
+)
+from .roster import Roster, as_roster
+from .segments import segment_index
+from .snapshot import cold_start_snapshot, forget_member, load_snapshot, remember_member, remember_roster
 import logging
 from logging import getLogger
 
@@ -12,12 +32,37 @@ logger = getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+# Intervalo (s) entre consultas ao cache compartilhado enquanto outro worker busca a mesma chave
+SHARED_FETCH_POLL = 0.05
+
+
+def build_roster_indexes(value: Any) -> None:
+    """Construir os índices derivados de um Roster recém-buscado (busca, autocompletar, cursor, segmentos)
+
+    Os índices são por versão do Roster e cada busca gera uma versão nova; a
+    atualização em segundo plano os constrói antes de publicar a lista, para
+    que a primeira requisição depois dela não pague segundos de construção.
+    """
+    if not isinstance(value, Roster):
+        return
+    value.search_index
+    value.prefix_index
+    sorted_keys(value)
+    segment_index(value)
+
+
+def shared_fetch_deadline(cache) -> float:
+    """Até quando (time.monotonic) esperar a busca de outro worker: lock_timeout, limitado pelo deadline"""
+    return time.monotonic() + min(cache.lock_timeout, remaining_time() or cache.lock_timeout)
+
 
 class AmpeliAPIService:
     """Serviço para integração com a API do Ampeli"""
     
     def __init__(self):
         self.base_url = 'https://ampeli-backend.onrender.com/api'
+        # Momento da coleta quando algum dado desta requisição veio do snapshot em disco
+        self.data_as_of = None
         self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json'
@@ -27,50 +72,393 @@ class AmpeliAPIService:
         """Método auxiliar para fazer requisições HTTP"""
         url = f"{self.base_url}{endpoint}"
         
-        try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=self.headers, json=data)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=self.headers)
-            else:
-                raise ValueError(f"Método HTTP não suportado: {method}")
-            
-            response.raise_for_status()
-            return response.json() if response.content else {}
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise ValueError(f"Método HTTP não suportado: {method}")
+        
+        headers = self.headers
+        
+        if method == 'GET':
+            # GETs idênticos simultâneos no worker compartilham uma só chamada
+            return backend_flights.do(
+                (method, url), lambda: self._send_with_retries(method, endpoint, url, data, headers)
+            )
+        return self._send_with_retries(method, endpoint, url, data, headers)
+    
+    def _send_with_retries(self, method: str, endpoint: str, url: str, data: Dict, headers: Dict) -> Dict:
+        """Repetir falhas transitórias de chamadas idempotentes com backoff e jitter"""
+        options = retry_options()
+        retry_budget.deposit()
+        
+        attempt = 1
+        while True:
+            try:
+                return self._send(method, endpoint, url, data, headers)
+            except AmpeliAPIError as e:
+                delay = retry_delay(method, url, e, attempt, options)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+    
+    def _send(self, method: str, endpoint: str, url: str, data: Dict = None, headers: Dict = None) -> Dict:
+        """Executar a requisição HTTP no pool de conexões do worker"""
+        with BackendCall(method, endpoint) as call:
+            group = endpoint_group(endpoint)
+            # Timeouts por classe de endpoint, limitados pelo deadline da requisição
+            timeout = request_timeout(group, url)
+
+            # Com o circuito aberto a chamada falha na hora, sem esperar a rede
+            breaker = get_breaker(group)
+            breaker.before_call()
+
+            try:
+                # Sessão compartilhada com pool de conexões keep-alive do worker
+                response = get_session().request(
+                    method,
+                    url,
+                    headers=headers or self.headers,
+                    json=data if method in ('POST', 'PUT') else None,
+                    timeout=timeout,
+                )
+            except requests.exceptions.Timeout as e:
+                breaker.record_failure()
+                check_deadline_after_timeout()
+                raise AmpeliAPIError(f"Tempo esgotado na requisição para {url}: {str(e)}", retryable=True)
+            except requests.exceptions.ConnectionError as e:
+                breaker.record_failure()
+                raise AmpeliAPIError(f"Erro na requisição para {url}: {str(e)}", retryable=True)
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure()
+                raise AmpeliAPIError(f"Erro na requisição para {url}: {str(e)}")
+            except BaseException:
+                breaker.abandon()
+                raise
+
+            call.received(response.status_code, len(response.content))
             
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Erro na requisição para {url}: {str(e)}")
+            # Erros 4xx indicam um backend saudável; apenas 5xx contam como falha
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            try:
+                response.raise_for_status()
+                return response.json() if response.content else {}
+            except requests.exceptions.RequestException as e:
+                status_code = response.status_code if response.status_code >= 400 else None
+                raise AmpeliAPIError(
+                    f"Erro na requisição para {url}: {str(e)}",
+                    status_code=status_code,
+                    retryable=status_code in RETRYABLE_STATUS_CODES,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                )
+
+    def _cached_get(self, namespace: str, endpoint: str, transform=None) -> Any:
+        """GET com leitura através do cache do namespace (TTL + LRU)"""
+        transform = transform or (lambda value: value)
+        if not cache_enabled():
+            return transform(self._make_request('GET', endpoint))
+        
+        cache = get_cache(namespace)
+        options = cache_options(namespace)
+        entry = cache.get_entry(endpoint)
+        state = entry_state(entry, options)
+        cache.record(hit=state != EXPIRED)
+        if state == STALE:
+            # Servir a versão antiga agora e atualizar em segundo plano
+            self._refresh_in_background(cache, endpoint, transform)
+        if state != EXPIRED:
+            return entry[0]
+        # Nada em cache ou além do limite de idade: bloquear e buscar
+        
+        # Cache compartilhado entre workers: só um processo busca cada chave
+        shared = getattr(cache, 'shared', False)
+        owns_refresh = shared and cache.try_begin_refresh(endpoint)
+        if shared and not owns_refresh:
+            value, owns_refresh = self._wait_for_shared_fetch(cache, endpoint, options['ttl'])
+            if value is not MISSING:
+                return value
+        try:
+            # Com a reserva em mãos, conferir de novo: outro worker pode ter gravado antes dela
+            entry = cache.get_entry(endpoint) if owns_refresh else None
+            if is_fresh(entry, options['ttl']):
+                return entry[0]
+            # Uma escrita durante a busca (write-through ou invalidação) prevalece
+            generation = cache.generation
+            value = transform(self._make_request('GET', endpoint))
+            cache.set(endpoint, value, generation=generation)
+            return value
+        finally:
+            if owns_refresh:
+                cache.end_refresh(endpoint)
+    
+    def _wait_for_shared_fetch(self, cache, endpoint: str, ttl: float) -> Tuple[Any, bool]:
+        """Aguardar a busca de outro worker: (valor, False), ou (MISSING, reservou)
+
+        Se o outro worker terminar sem gravar, a reserva da chave passa para este,
+        que busca segurando-a; com o tempo esgotado, (MISSING, False).
+        """
+        deadline = shared_fetch_deadline(cache)
+        while time.monotonic() < deadline:
+            time.sleep(SHARED_FETCH_POLL)
+            entry = cache.get_entry(endpoint)
+            if is_fresh(entry, ttl):
+                return entry[0], False
+            if cache.try_begin_refresh(endpoint):
+                # O outro worker terminou (sem gravar, ou gravou após a última leitura):
+                # a reserva fica com este worker, que confere a entrada antes de buscar
+                return MISSING, True
+        return MISSING, False
+    
+    def _refresh_in_background(self, cache, endpoint: str, transform) -> None:
+        """Atualizar a entrada numa thread, com no máximo uma atualização por chave"""
+        if not cache.try_begin_refresh(endpoint):
+            return
+        
+        generation = cache.generation
+        
+        def refresh():
+            try:
+                value = transform(self._make_request('GET', endpoint))
+                build_roster_indexes(value)
+                cache.set(endpoint, value, generation=generation)
+                logger.debug(f"Background refresh of {endpoint} completed")
+            except Exception as e:
+                logger.warning(f"Background refresh of {endpoint} failed: {str(e)}")
+            finally:
+                cache.end_refresh(endpoint)
+        
+        try:
+            threading.Thread(target=refresh, name=f'ampeli-refresh{endpoint}', daemon=True).start()
+        except Exception:
+            cache.end_refresh(endpoint)
+            raise
+    
+    def _invalidate_member_caches(self, member_id: int = None, updated_member: Dict = None, deleted: bool = False) -> None:
+        """Invalidar as leituras de membros afetadas por uma escrita"""
+        if member_id is not None:
+            self._write_through_member(member_id, updated_member, deleted)
+        # A escrita pode mudar email, estágio da fé, interesses e a lista completa
+        namespaces = ['members_page', 'member_email', 'faith_stage', 'interest', 'volunteer_area']
+        if not self._patch_cached_roster(member_id, updated_member, deleted):
+            namespaces.append('members')
+        for namespace in namespaces:
+            get_cache(namespace).clear()
+    
+    def _write_through_member(self, member_id: int, updated_member: Optional[Dict], deleted: bool) -> None:
+        """Gravar no cache por ID o membro devolvido pela alteração; despejar nos demais casos"""
+        cache = get_cache('member')
+        endpoint = f'/members/{member_id}'
+        # delete avança a geração: buscas iniciadas antes da escrita não gravam o valor antigo
+        cache.delete(endpoint)
+        if not deleted and isinstance(updated_member, dict) and str(updated_member.get('id')) == str(member_id):
+            cache.set(endpoint, updated_member)
+            remember_member(updated_member)
+        else:
+            forget_member(member_id)
+    
+    def _seed_from_snapshot(self) -> None:
+        """Partida a frio: pôr no cache a lista do snapshot já vencida
+
+        Com stale-while-revalidate ela é servida na hora e atualizada em segundo
+        plano, sem esperar o backend acordar.
+        """
+        if not cache_enabled():
+            return
+        snapshot = cold_start_snapshot()
+        cache = get_cache('members')
+        if snapshot is None or cache.get_entry('/members') is not None:
+            return
+        cache.set('/members', snapshot.roster, generation=cache.generation, age=cache_options('members')['ttl'] + 1)
+    
+    def _note_data_as_of(self, as_of) -> None:
+        if as_of is not None and (self.data_as_of is None or as_of < self.data_as_of):
+            self.data_as_of = as_of
+    
+    def _snapshot_member(self, member_id: int, error: Exception) -> Optional[Dict]:
+        """Membro do snapshot em disco quando o backend falha (não para 404)"""
+        if isinstance(error, AmpeliAPIError) and error.status_code == 404:
+            return None
+        snapshot = load_snapshot()
+        member = snapshot.member(member_id) if snapshot is not None else None
+        if member is not None:
+            self._note_data_as_of(snapshot.saved_at)
+        return member
+    
+    def _patch_cached_roster(self, member_id: Optional[int], updated_member: Optional[Dict], deleted: bool) -> bool:
+        """Aplicar a escrita de um único membro à lista em cache, sem descartá-la"""
+        if member_id is None:
+            return False
+        if deleted:
+            patch = lambda roster: roster.remove_member(member_id)
+        elif isinstance(updated_member, dict) and str(updated_member.get('id')) == str(member_id):
+            patch = lambda roster: roster.upsert(updated_member)
+        else:
+            return False
+        
+        def apply(roster):
+            patch(roster)
+            return roster
+        
+        try:
+            return get_cache('members').update('/members', apply)
+        except Exception as e:
+            logger.warning(f"Could not patch cached roster for member {member_id}: {str(e)}")
+            return False
+    
+    def _cold_start_roster(self, endpoint: str) -> Optional[Roster]:
+        """Lista do snapshot quando nem a página pedida nem uma lista do backend estão no cache
+
+        Logo após um deploy o backend pode estar dormindo: a página é montada a
+        partir do snapshot em vez de esperar pela paginação do backend.
+        """
+        if not cache_enabled():
+            return None
+        self._seed_from_snapshot()
+        if get_cache('members_page').get_entry(endpoint) is not None:
+            return None
+        entry = get_cache('members').get_entry('/members')
+        roster = entry[0] if entry is not None else None
+        # Lista já atualizada pelo backend (sem as_of): ele respondeu, paginar por ele
+        return roster if getattr(roster, 'as_of', None) is not None else None
+    
+    def _refresh_cold_start(self, roster: Roster, endpoint: str) -> None:
+        """Buscar em segundo plano a página pedida e a lista completa que substitui o snapshot"""
+        logger.info(f"Serving {endpoint} from members snapshot of {roster.as_of.isoformat()} while the backend wakes up")
+        self._refresh_in_background(get_cache('members_page'), endpoint, lambda payload: payload)
+        self._refresh_in_background(get_cache('members'), '/members', as_roster)
+        self._note_data_as_of(roster.as_of)
+    
+    def _roster_cached(self) -> bool:
+        """Se a lista completa de membros já está no cache do processo"""
+        return cache_enabled() and get_cache('members').get_entry('/members') is not None
     
     # ==================== AUTENTICAÇÃO ====================
     
+    def _validate_registration(self, name: str, email: str, password: str) -> Optional[Dict]:
+        """Validações locais do registro; retorna o erro ou None"""
+        if not name or not email or not password:
+            return {
+                'success': False,
+                'error': 'VALIDATION_ERROR',
+                'message': 'Nome, email e senha são obrigatórios'
+            }
+        
+        if '@' not in email or '.' not in email:
+            return {
+                'success': False,
+                'error': 'INVALID_EMAIL',
+                'message': 'Formato de email inválido'
+            }
+        
+        if len(password) < 6:
+            return {
+                'success': False,
+                'error': 'WEAK_PASSWORD',
+                'message': 'Senha deve ter pelo menos 6 caracteres'
+            }
+        return None
+    
+    def _registration_error(self, error_msg: str) -> Dict:
+        """Traduzir a falha da API de registro em erro para o usuário"""
+        # Tratamento específico por tipo de erro
+        if '409' in error_msg or 'conflict' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'USER_EXISTS',
+                'message': 'Este email já está cadastrado'
+            }
+        elif '400' in error_msg or 'bad request' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'INVALID_DATA',
+                'message': 'Dados inválidos fornecidos'
+            }
+        elif '503' in error_msg or 'service unavailable' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'SERVICE_UNAVAILABLE',
+                'message': 'Serviço temporariamente indisponível. Tente novamente em alguns minutos.'
+            }
+        elif '500' in error_msg or 'internal server error' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'SERVER_ERROR',
+                'message': 'Erro interno do servidor. Tente novamente mais tarde.'
+            }
+        else:
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro de conexão. Verifique sua internet e tente novamente.'
+            }
+    
+    def _validate_login(self, email: str, password: str) -> Optional[Dict]:
+        """Validações locais do login; retorna o erro ou None"""
+        if not email or not password:
+            return {
+                'success': False,
+                'error': 'VALIDATION_ERROR',
+                'message': 'Email e senha são obrigatórios'
+            }
+        
+        if '@' not in email or '.' not in email:
+            return {
+                'success': False,
+                'error': 'INVALID_EMAIL',
+                'message': 'Formato de email inválido'
+            }
+        return None
+    
+    def _login_error(self, error_msg: str) -> Dict:
+        """Traduzir a falha da API de login em erro para o usuário"""
+        # Tratamento específico por tipo de erro
+        if '401' in error_msg or 'unauthorized' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'INVALID_CREDENTIALS',
+                'message': 'Email ou senha incorretos'
+            }
+        elif '404' in error_msg or 'not found' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'USER_NOT_FOUND',
+                'message': 'Usuário não encontrado'
+            }
+        elif '429' in error_msg or 'too many requests' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'RATE_LIMITED',
+                'message': 'Muitas tentativas de login. Tente novamente em alguns minutos.'
+            }
+        elif '503' in error_msg or 'service unavailable' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'SERVICE_UNAVAILABLE',
+                'message': 'Serviço temporariamente indisponível. Tente novamente em alguns minutos.'
+            }
+        elif '500' in error_msg or 'internal server error' in error_msg.lower():
+            return {
+                'success': False,
+                'error': 'SERVER_ERROR',
+                'message': 'Erro interno do servidor. Tente novamente mais tarde.'
+            }
+        else:
+            return {
+                'success': False,
+                'error': 'CONNECTION_ERROR',
+                'message': 'Erro de conexão. Verifique sua internet e tente novamente.'
+            }
+    
     def register_user(self, name: str, email: str, password: str, phone: str = None) -> Dict:
         """Registrar novo usuário com tratamento de erros"""
         try:
             # Validações básicas
-            if not name or not email or not password:
-                return {
-                    'success': False,
-                    'error': 'VALIDATION_ERROR',
-                    'message': 'Nome, email e senha são obrigatórios'
-                }
-            
-            if '@' not in email or '.' not in email:
-                return {
-                    'success': False,
-                    'error': 'INVALID_EMAIL',
-                    'message': 'Formato de email inválido'
-                }
-            
-            if len(password) < 6:
-                return {
-                    'success': False,
-                    'error': 'WEAK_PASSWORD',
-                    'message': 'Senha deve ter pelo menos 6 caracteres'
-                }
+            error = self._validate_registration(name, email, password)
+            if error:
+                return error
             
             data = {
                 "name": name,
@@ -91,57 +479,15 @@ class AmpeliAPIService:
             }
             
         except Exception as e:
-            error_msg = str(e)
-            
-            # Tratamento específico por tipo de erro
-            if '409' in error_msg or 'conflict' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'USER_EXISTS',
-                    'message': 'Este email já está cadastrado'
-                }
-            elif '400' in error_msg or 'bad request' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'INVALID_DATA',
-                    'message': 'Dados inválidos fornecidos'
-                }
-            elif '503' in error_msg or 'service unavailable' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'SERVICE_UNAVAILABLE',
-                    'message': 'Serviço temporariamente indisponível. Tente novamente em alguns minutos.'
-                }
-            elif '500' in error_msg or 'internal server error' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'SERVER_ERROR',
-                    'message': 'Erro interno do servidor. Tente novamente mais tarde.'
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'CONNECTION_ERROR',
-                    'message': 'Erro de conexão. Verifique sua internet e tente novamente.'
-                }
+            return self._registration_error(str(e))
     
     def login_user(self, email: str, password: str) -> Dict:
         """Login de usuário com tratamento de erros"""
         try:
             # Validações básicas
-            if not email or not password:
-                return {
-                    'success': False,
-                    'error': 'VALIDATION_ERROR',
-                    'message': 'Email e senha são obrigatórios'
-                }
-            
-            if '@' not in email or '.' not in email:
-                return {
-                    'success': False,
-                    'error': 'INVALID_EMAIL',
-                    'message': 'Formato de email inválido'
-                }
+            error = self._validate_login(email, password)
+            if error:
+                return error
             
             data = {
                 "email": email,
@@ -157,45 +503,7 @@ class AmpeliAPIService:
             }
             
         except Exception as e:
-            error_msg = str(e)
-            
-            # Tratamento específico por tipo de erro
-            if '401' in error_msg or 'unauthorized' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'INVALID_CREDENTIALS',
-                    'message': 'Email ou senha incorretos'
-                }
-            elif '404' in error_msg or 'not found' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'USER_NOT_FOUND',
-                    'message': 'Usuário não encontrado'
-                }
-            elif '429' in error_msg or 'too many requests' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'RATE_LIMITED',
-                    'message': 'Muitas tentativas de login. Tente novamente em alguns minutos.'
-                }
-            elif '503' in error_msg or 'service unavailable' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'SERVICE_UNAVAILABLE',
-                    'message': 'Serviço temporariamente indisponível. Tente novamente em alguns minutos.'
-                }
-            elif '500' in error_msg or 'internal server error' in error_msg.lower():
-                return {
-                    'success': False,
-                    'error': 'SERVER_ERROR',
-                    'message': 'Erro interno do servidor. Tente novamente mais tarde.'
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'CONNECTION_ERROR',
-                    'message': 'Erro de conexão. Verifique sua internet e tente novamente.'
-                }
+            return self._login_error(str(e))
     
     def check_user_status(self, user_id: int) -> Dict:
         """Verificar status do usuário"""
@@ -350,22 +658,175 @@ class AmpeliAPIService:
     
     # ==================== MEMBROS ====================
     
-    def get_all_members(self) -> List[Dict]:
-        """Listar todos os membros"""
+    def get_all_members(self) -> Roster:
+        """Listar todos os membros
+
+        Retorna o Roster em cache, compartilhado entre as requisições: uma
+        sequência somente leitura de MemberRow (lidos como dicts, mas sem
+        alteração nem json.dumps). Use to_list() para obter dicts comuns.
+        """
+        self._seed_from_snapshot()
         try:
-            return self._make_request('GET', '/members')
-        except Exception:
-            # Se a API não estiver disponível, retornar lista vazia
-            return []
+            members = self._cached_get('members', '/members', transform=as_roster)
+        except Exception as e:
+            # API indisponível: última lista salva em disco, ou lista vazia
+            snapshot = load_snapshot()
+            if snapshot is None:
+                return Roster()
+            logger.warning(f"Serving members snapshot from {snapshot.saved_at.isoformat()}: {str(e)}")
+            members = snapshot.roster
+        
+        self._note_data_as_of(getattr(members, 'as_of', None))
+        remember_roster(members)
+        return members
+    
+    def get_members_page(self, status: str = None, search: str = None, page: int = 1, page_size: int = None,
+                         segment: str = None) -> Dict:
+        """Buscar uma página da lista de membros, filtrada e paginada pelo backend"""
+        page_size = page_size or default_page_size()
+        page = max(page, 1)
+        if segment or (search and self._roster_cached()):
+            # Segmentos só existem localmente; buscas usam o índice da lista em
+            # memória sem ir ao backend
+            members = filter_members(self.get_all_members(), status, search, segment)
+            return local_members_page(members, page, page_size)
+        if backend_pagination_enabled():
+            endpoint = self._members_page_endpoint(status, search, page, page_size)
+            roster = self._cold_start_roster(endpoint)
+            if roster is not None:
+                self._refresh_cold_start(roster, endpoint)
+                return local_members_page(filter_members(roster, status, search), page, page_size)
+            try:
+                members_page = self._fetch_members_page(status, search, page, page_size)
+                if members_page is not None:
+                    return members_page
+            except Exception as e:
+                logger.error(f"Error fetching members page {page}: {str(e)}")
+        
+        # Backend sem suporte aos parâmetros ou indisponível: filtrar localmente
+        members = filter_members(self.get_all_members(), status, search)
+        return local_members_page(members, page, page_size)
+    
+    def _fetch_members_page(self, status: Optional[str], search: Optional[str], page: int, page_size: int) -> Optional[Dict]:
+        endpoint = self._members_page_endpoint(status, search, page, page_size)
+        payload = self._cached_get('members_page', endpoint)
+        members_page, last = self._members_page(endpoint, payload, status, search, page, page_size)
+        if last is not None:
+            # Página além do fim: mostrar a última, como o Paginator.get_page
+            return self._fetch_members_page(status, search, last, page_size)
+        return members_page
+    
+    def _members_page_endpoint(self, status: Optional[str], search: Optional[str], page: int, page_size: int) -> str:
+        """Endpoint da lista com filtros e paginação (page começa em 0 no backend)"""
+        params = {'page': page - 1, 'size': page_size}
+        if status:
+            params['status'] = status
+        if search:
+            params['search'] = search
+        return f'/members?{urlencode(params)}'
+    
+    def _members_page(self, endpoint: str, payload: Any, status: Optional[str], search: Optional[str], page: int,
+                      page_size: int) -> Tuple[Optional[Dict], Optional[int]]:
+        """Página a partir da resposta do backend: (página, None), ou (None, última página) se page passou do fim
+
+        (None, None) quando o backend ignorou os parâmetros de paginação.
+        """
+        parsed = parse_members_page(payload, status, search, page_size)
+        if parsed is None:
+            self._backend_ignored_pagination(endpoint, payload, status, search)
+            return None, None
+        
+        results, count = parsed
+        if not results and page > last_page(count, page_size):
+            return None, last_page(count, page_size)
+        return {
+            'results': results,
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'backend_paginated': True,
+        }, None
+    
+    def get_members_cursor_page(self, status: str = None, search: str = None, cursor: str = None,
+                                page_size: int = None, segment: str = None) -> Dict:
+        """Página da lista ordenada por (nome, id) a partir de um cursor opaco, sem total"""
+        page_size = page_size or default_page_size()
+        position = decode_cursor(cursor)
+        local_only = segment or (search and self._roster_cached())
+        roster = None
+        remote_cursor = None if local_only else backend_cursor(position)
+        if remote_cursor is not None:
+            endpoint = self._members_cursor_endpoint(status, search, remote_cursor, page_size)
+            roster = self._cold_start_roster(endpoint)
+            if roster is not None:
+                self._refresh_cold_start(roster, endpoint)
+            else:
+                try:
+                    members_page = self._fetch_members_cursor_page(status, search, remote_cursor, page_size)
+                    if members_page is not None:
+                        return members_page
+                except Exception as e:
+                    logger.error(f"Error fetching members cursor page: {str(e)}")
+        
+        # Keyset sobre a lista em cache; cursores do backend recomeçam do início
+        position = local_cursor(position)
+        if roster is None:
+            roster = as_roster(self.get_all_members())
+        return keyset_page(roster, position, page_size, matching_indices(roster, status, search, segment))
+    
+    def _fetch_members_cursor_page(self, status: Optional[str], search: Optional[str], cursor: Optional[str],
+                                   page_size: int) -> Optional[Dict]:
+        endpoint = self._members_cursor_endpoint(status, search, cursor, page_size)
+        payload = self._cached_get('members_page', endpoint)
+        return self._members_cursor_page(endpoint, payload, status, search, page_size)
+    
+    def _members_cursor_endpoint(self, status: Optional[str], search: Optional[str], cursor: Optional[str],
+                                 page_size: int) -> str:
+        """Endpoint da lista com filtros e cursor do backend (vazio na primeira página)"""
+        params = {'size': page_size, 'sort': 'fullName,id', 'cursor': cursor or ''}
+        if status:
+            params['status'] = status
+        if search:
+            params['search'] = search
+        return f'/members?{urlencode(params)}'
+    
+    def _members_cursor_page(self, endpoint: str, payload: Any, status: Optional[str], search: Optional[str],
+                             page_size: int) -> Optional[Dict]:
+        parsed = parse_cursor_page(payload, status, search, page_size)
+        if parsed is None:
+            self._backend_ignored_pagination(endpoint, payload, status, search, mode='cursor')
+            return None
+        
+        results, next_cursor, prev_cursor = parsed
+        return {
+            'results': results,
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'backend_paginated': True,
+        }
+    
+    def _backend_ignored_pagination(self, endpoint: str, payload: Any, status: Optional[str], search: Optional[str],
+                                    mode: str = 'page') -> None:
+        """Registrar que o backend ignorou os parâmetros da lista de membros"""
+        mark_backend_pagination_unsupported(mode)
+        if not cache_enabled():
+            return
+        get_cache('members_page').delete(endpoint)
+        # Sem filtros, a resposta ignorada é a lista completa: aproveitá-la
+        if isinstance(payload, list) and not status and not search:
+            get_cache('members').set('/members', as_roster(payload))
     
     def get_member_by_id(self, member_id: int) -> Dict:
         """Buscar membro por ID"""
         try:
             logger.info(f"Fetching member by ID: {member_id}")
-            return self._make_request('GET', f'/members/{member_id}')
+            member = self._cached_get('member', f'/members/{member_id}')
         except Exception as e:
             logger.error(f"Error fetching member by ID {member_id}: {str(e)}")
-            return None
+            return self._snapshot_member(member_id, e)
+        remember_member(member)
+        return member
     
     def get_member_by_user_id(self, user_id: int) -> Dict:
         """Buscar membro por ID do usuário"""
@@ -379,7 +840,7 @@ class AmpeliAPIService:
     def get_member_by_email(self, email: str) -> Dict:
         """Buscar membro por email"""
         try:
-            return self._make_request('GET', f'/members/email/{email}')
+            return self._cached_get('member_email', f'/members/email/{email}')
         except Exception:
             # Se a API não estiver disponível ou membro não encontrado, retornar None
             return None
@@ -388,7 +849,7 @@ class AmpeliAPIService:
         """Buscar membros por estágio da fé"""
         try:
             logger.info(f"Fetching members by faith stage: {faith_stage}")
-            return self._make_request('GET', f'/members/faith-stage/{faith_stage}')
+            return self._cached_get('faith_stage', f'/members/faith-stage/{faith_stage}')
         except Exception as e:
             logger.error(f"Error fetching members by faith stage {faith_stage}: {str(e)}")
             return []
@@ -397,7 +858,7 @@ class AmpeliAPIService:
         """Buscar membros por área de interesse"""
         try:
             logger.info(f"Fetching members by interest: {interest}")
-            return self._make_request('GET', f'/members/interest/{interest}')
+            return self._cached_get('interest', f'/members/interest/{interest}')
         except Exception as e:
             logger.error(f"Error fetching members by interest {interest}: {str(e)}")
             return []
@@ -406,7 +867,7 @@ class AmpeliAPIService:
         """Buscar membros por área de voluntariado"""
         try:
             logger.info(f"Fetching members by volunteer area: {area}")
-            return self._make_request('GET', f'/members/volunteer-area/{area}')
+            return self._cached_get('volunteer_area', f'/members/volunteer-area/{area}')
         except Exception as e:
             logger.error(f"Error fetching members by volunteer area {area}: {str(e)}")
             return []
@@ -424,13 +885,17 @@ class AmpeliAPIService:
                 'error': 'CONNECTION_ERROR',
                 'message': 'Erro ao criar membro'
             }
+        finally:
+            self._invalidate_member_caches()
     
     def update_member(self, member_id: int, member_data: Dict) -> Dict:
         """Atualizar membro existente"""
+        updated_member = None
         try:
             logger.info(f"Updating member ID: {member_id}")
             logger.debug(f"Member data: {member_data}")
-            return self._make_request('PUT', f'/members/{member_id}', member_data)
+            updated_member = self._make_request('PUT', f'/members/{member_id}', member_data)
+            return updated_member
         except Exception as e:
             logger.error(f"Error updating member {member_id}: {str(e)}")
             return {
@@ -438,12 +903,17 @@ class AmpeliAPIService:
                 'error': 'CONNECTION_ERROR',
                 'message': 'Erro ao atualizar membro'
             }
+        finally:
+            self._invalidate_member_caches(member_id, updated_member=updated_member)
     
     def delete_member(self, member_id: int) -> Dict:
         """Remover membro"""
+        deleted = False
         try:
             logger.info(f"Deleting member ID: {member_id}")
-            return self._make_request('DELETE', f'/members/{member_id}')
+            result = self._make_request('DELETE', f'/members/{member_id}')
+            deleted = True
+            return result
         except Exception as e:
             logger.error(f"Error deleting member {member_id}: {str(e)}")
             return {
@@ -451,6 +921,8 @@ class AmpeliAPIService:
                 'error': 'CONNECTION_ERROR',
                 'message': 'Erro ao remover membro'
             }
+        finally:
+            self._invalidate_member_caches(member_id, deleted=deleted)
     
     # ==================== RECOMENDAÇÕES ====================
     
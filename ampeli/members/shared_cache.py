@@ -0,0 +1,362 @@
+import os
+import pickle
+import secrets
+import sqlite3
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import MISSING, _cache_settings
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: a preparação do banco não é serializada entre processos
+    fcntl = None
+
+
+# Diretório privado (0700) no projeto: os valores são lidos com pickle, então o
+# arquivo não pode ficar num diretório em que outros usuários escrevem
+DEFAULT_SHARED_DIR = '.cache'
+DEFAULT_SHARED_NAME = 'ampeli-api-cache.sqlite3'
+
+# Tempo máximo (s) que um worker espera outro terminar a mesma busca
+DEFAULT_LOCK_TIMEOUT = 10
+
+# Validade (s) da reserva de atualização de uma chave; se o processo que a
+# segura morrer, outro pode buscar a chave depois desse tempo
+DEFAULT_REFRESH_LEASE = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0,
+    writes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS refreshes (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+def default_shared_path() -> str:
+    directory = os.path.join(settings.BASE_DIR, DEFAULT_SHARED_DIR)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, DEFAULT_SHARED_NAME)
+
+
+def _check_owned(path: str, st: os.stat_result) -> None:
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise ImproperlyConfigured(f"Shared cache path {path} is owned by another user")
+
+
+def _open_private(path: str) -> int:
+    """Abrir (criando com 0600) um arquivo do cache, recusando links e arquivos de outros usuários"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        _check_owned(path, os.fstat(fd))
+        # Arquivo de uma versão anterior criado com a umask: restringir
+        os.fchmod(fd, 0o600)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _prepare_private_file(path: str) -> None:
+    """Garantir que o diretório e o banco do cache só são acessíveis por este usuário
+
+    O diretório não pode ser de outro usuário nem gravável por outros (como o
+    /tmp), senão alguém poderia trocar o arquivo por um com pickle malicioso.
+    O banco é criado com 0600; o SQLite cria -wal e -shm com as mesmas permissões.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    st = os.stat(directory)
+    _check_owned(directory, st)
+    if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ImproperlyConfigured(
+            f"Shared cache directory {directory} is writable by other users; set AMPELI_API_CACHE['SHARED_PATH'] "
+            f"to a private directory"
+        )
+    os.close(_open_private(path))
+
+
+class SharedFileCache:
+    """Cache compartilhado entre os workers (gunicorn) num arquivo SQLite local
+
+    Mesma interface do TTLLRUCache. Os valores são gravados com pickle e um
+    número de versão; cada processo guarda a última cópia decodificada e só lê
+    o blob de novo quando a versão no arquivo muda, então a lista de membros é
+    baixada por um worker e decodificada uma vez por versão nos demais. A
+    reserva de atualização (try_begin_refresh) é uma linha com prazo no próprio
+    banco, válida entre processos e apagada ao fim da atualização: o número de
+    arquivos não cresce com as chaves. Dispensa servidor de cache externo.
+
+    Ativado com AMPELI_API_CACHE['BACKEND'] = 'members.shared_cache.SharedFileCache'.
+    """
+
+    shared = True
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = _cache_settings().get('SHARED_PATH') or default_shared_path()
+        _prepare_private_file(self.path)
+        self.lock_timeout = _cache_settings().get('SHARED_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+        self.refresh_lease = _cache_settings().get('SHARED_REFRESH_LEASE', DEFAULT_REFRESH_LEASE)
+        self._local = threading.local()
+        self._decoded: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.RLock()
+        self._refreshing: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Conexão por thread (e por processo: workers criados com fork reabrem)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # A troca para WAL e a criação das tabelas não esperam o busy timeout:
+            # workers abrindo o arquivo ao mesmo tempo recebiam "database is locked"
+            with self._init_lock():
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                connection.executescript(_SCHEMA)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    @contextmanager
+    def _init_lock(self):
+        """flock exclusivo entre processos durante a preparação da conexão"""
+        if fcntl is None:
+            yield
+            return
+        with os.fdopen(_open_private(f'{self.path}.init.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        return connection
+
+    def _bump(self, connection: sqlite3.Connection, generation: bool) -> int:
+        """Avançar o contador de escritas (e a geração); retorna a nova versão"""
+        connection.execute('INSERT OR IGNORE INTO counters (namespace) VALUES (?)', (self.namespace,))
+        connection.execute(
+            'UPDATE counters SET writes = writes + 1, generation = generation + ? WHERE namespace = ?',
+            (1 if generation else 0, self.namespace),
+        )
+        return connection.execute('SELECT writes FROM counters WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+
+    @property
+    def generation(self) -> int:
+        row = self._connection().execute(
+            'SELECT generation FROM counters WHERE namespace = ?', (self.namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    # Leitura
+
+    def get(self, key: str) -> Any:
+        """Valor ainda dentro do TTL, ou MISSING"""
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > self.ttl:
+            self.record(hit=False)
+            return MISSING
+        self.record(hit=True)
+        return entry[0]
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(valor, idade em segundos) mesmo se expirado, ou None"""
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT version, stored_at FROM entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._decoded.pop(key, None)
+            return None
+        version, stored_at = row
+        age = max(time.time() - stored_at, 0.0)
+
+        decoded = self._decoded.get(key)
+        if decoded is not None and decoded[0] == version:
+            return decoded[1], age
+
+        row = connection.execute(
+            'SELECT value, version, stored_at FROM entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        blob, version, stored_at = row
+        try:
+            value = pickle.loads(blob)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable shared cache entry {self.namespace}:{key}: {str(e)}")
+            self.delete(key)
+            return None
+        with self._lock:
+            self._decoded[key] = (version, value)
+        return value, max(time.time() - stored_at, 0.0)
+
+    # Escrita
+
+    def _store(self, connection: sqlite3.Connection, key: str, value: Any, stored_at: float, version: int) -> None:
+        connection.execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, stored_at, version) VALUES (?, ?, ?, ?, ?)',
+            (self.namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), stored_at, version),
+        )
+        with self._lock:
+            self._decoded[key] = (version, value)
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None, age: float = 0.0) -> None:
+        connection = self._transaction()
+        try:
+            if generation is not None and generation != self.generation:
+                connection.execute('ROLLBACK')
+                return
+            self._store(connection, key, value, time.time() - age, self._bump(connection, generation=False))
+            self._evict(connection)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        # Sem registrar cada leitura no arquivo: despeja as entradas gravadas há mais tempo
+        excess = connection.execute(
+            'SELECT COUNT(*) FROM entries WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries WHERE namespace = ? '
+                'ORDER BY stored_at LIMIT ?)', (self.namespace, excess),
+            )
+            self.evictions += excess
+
+    def update(self, key: str, fn) -> bool:
+        """Aplicar fn ao valor em cache mantendo sua idade; False se ausente"""
+        connection = self._transaction()
+        try:
+            version = self._bump(connection, generation=True)
+            row = connection.execute(
+                'SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return False
+            self._store(connection, key, fn(pickle.loads(row[0])), row[1], version)
+            connection.execute('COMMIT')
+            return True
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def delete(self, key: str) -> None:
+        connection = self._transaction()
+        connection.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (self.namespace, key))
+        self._bump(connection, generation=True)
+        connection.execute('COMMIT')
+        with self._lock:
+            self._decoded.pop(key, None)
+
+    def clear(self) -> None:
+        connection = self._transaction()
+        connection.execute('DELETE FROM entries WHERE namespace = ?', (self.namespace,))
+        self._bump(connection, generation=True)
+        connection.execute('COMMIT')
+        with self._lock:
+            self._decoded.clear()
+
+    # Uma atualização por chave entre todos os processos
+
+    def _take_lease(self, key: str, owner: str) -> bool:
+        connection = self._transaction()
+        try:
+            now = time.time()
+            # Reservas vencidas (processo que morreu no meio da busca) são descartadas
+            connection.execute('DELETE FROM refreshes WHERE expires_at < ?', (now,))
+            taken = connection.execute(
+                'INSERT OR IGNORE INTO refreshes (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)',
+                (self.namespace, key, owner, now + self.refresh_lease),
+            ).rowcount == 1
+            connection.execute('COMMIT')
+            return taken
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def try_begin_refresh(self, key: str) -> bool:
+        """Reservar a atualização da chave; False se outro processo ou thread já reservou"""
+        owner = f'{os.getpid()}:{secrets.token_hex(8)}'
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing[key] = owner
+        taken = False
+        try:
+            taken = self._take_lease(key, owner)
+            return taken
+        finally:
+            if not taken:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            owner = self._refreshing.pop(key, None)
+        if owner is not None:
+            self._connection().execute(
+                'DELETE FROM refreshes WHERE namespace = ? AND key = ? AND owner = ?', (self.namespace, key, owner)
+            )
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM entries WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        return {
+            'entries': len(self),
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,215 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .roster import Roster
+from .shared_cache import DEFAULT_SHARED_DIR
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+# Versão do formato do arquivo; snapshots de outro formato são ignorados
+SNAPSHOT_FORMAT = 1
+
+DEFAULT_SNAPSHOT_NAME = 'ampeli-members-snapshot.json.gz'
+
+DEFAULT_SNAPSHOT = {
+    'ENABLED': True,
+    # Vazio: .cache/ do projeto, o diretório privado do cache compartilhado. Fora
+    # do /tmp (outro usuário poderia plantar uma lista) e num disco que sobreviva
+    # a deploys, senão não há snapshot na partida
+    'PATH': '',
+    # Intervalo mínimo (s) entre gravações do arquivo
+    'MIN_INTERVAL': 60,
+    # Detalhes de membros (get_member_by_id) guardados junto com a lista
+    'MAX_MEMBERS': 2000,
+}
+
+
+def snapshot_options() -> Dict:
+    options = {**DEFAULT_SNAPSHOT, **getattr(settings, 'AMPELI_API_SNAPSHOT', {})}
+    options['PATH'] = options['PATH'] or os.path.join(settings.BASE_DIR, DEFAULT_SHARED_DIR, DEFAULT_SNAPSHOT_NAME)
+    return options
+
+
+class Snapshot:
+    """Última lista de membros (e detalhes) obtida com sucesso, com o momento da coleta"""
+
+    def __init__(self, saved_at: datetime, members, details: Dict[str, Dict]):
+        self.saved_at = saved_at
+        self.roster = Roster(members)
+        # Dados servidos a partir do snapshot levam o marcador "dados de"
+        self.roster.as_of = saved_at
+        self.details = details
+
+    def member(self, member_id) -> Optional[Dict]:
+        member = self.details.get(str(member_id))
+        if member is None:
+            member = next((row.to_dict() for row in self.roster if str(row.get('id')) == str(member_id)), None)
+        return member
+
+
+_lock = threading.Lock()
+_loaded = False
+_snapshot: Optional[Snapshot] = None
+_cold_start_claimed = False
+
+# Estado da próxima gravação
+_saved_version: Optional[int] = None
+_last_save = 0.0
+_saving = False
+_details: "OrderedDict[str, Dict]" = OrderedDict()
+_details_dirty = False
+
+
+def load_snapshot() -> Optional[Snapshot]:
+    """Snapshot do disco, lido uma vez por processo (None se ausente ou inválido)"""
+    global _loaded, _snapshot
+    if _loaded:
+        return _snapshot
+    with _lock:
+        if _loaded:
+            return _snapshot
+        options = snapshot_options()
+        if options['ENABLED']:
+            _snapshot = _read(options['PATH'])
+        _loaded = True
+        if _snapshot is not None:
+            for member_id, member in list(_snapshot.details.items())[-options['MAX_MEMBERS']:]:
+                _details.setdefault(member_id, member)
+    return _snapshot
+
+
+def snapshot_loaded() -> bool:
+    """Se o snapshot já foi lido do disco neste processo (as leituras seguintes não fazem E/S)"""
+    return _loaded
+
+
+def cold_start_snapshot() -> Optional[Snapshot]:
+    """O snapshot na primeira chamada do processo e None nas seguintes
+
+    Usado só para aquecer o cache na partida; depois de uma invalidação a lista
+    antiga não deve voltar ao cache.
+    """
+    global _cold_start_claimed
+    with _lock:
+        if _cold_start_claimed:
+            return None
+        _cold_start_claimed = True
+    return load_snapshot()
+
+
+def _read(path: str) -> Optional[Snapshot]:
+    try:
+        with open(os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0)), 'rb') as raw:
+            # Arquivo de outro usuário não é servido como a lista de membros
+            if hasattr(os, 'getuid') and os.fstat(raw.fileno()).st_uid != os.getuid():
+                logger.warning(f"Ignoring members snapshot {path} owned by another user")
+                return None
+            with gzip.GzipFile(fileobj=raw) as snapshot_file:
+                data = json.loads(snapshot_file.read().decode('utf-8'))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable members snapshot {path}: {str(e)}")
+        return None
+    if not isinstance(data, dict) or data.get('format') != SNAPSHOT_FORMAT or not isinstance(data.get('members'), list):
+        logger.warning(f"Ignoring members snapshot {path} with unknown format")
+        return None
+    saved_at = datetime.fromtimestamp(data.get('saved_at', 0), tz=dt_timezone.utc)
+    logger.info(f"Loaded members snapshot from {saved_at.isoformat()} ({len(data['members'])} members)")
+    return Snapshot(saved_at, data['members'], data.get('details') or {})
+
+
+def remember_roster(roster) -> None:
+    """Gravar a lista em segundo plano se ela mudou desde o último snapshot
+
+    Listas vindas do próprio snapshot (com as_of) não são regravadas, e as
+    gravações respeitam MIN_INTERVAL.
+    """
+    global _saving
+    options = snapshot_options()
+    if not options['ENABLED'] or not isinstance(roster, Roster) or roster.as_of is not None:
+        return
+    with _lock:
+        if _saving or (roster.version == _saved_version and not _details_dirty):
+            return
+        if time.monotonic() - _last_save < options['MIN_INTERVAL'] and _last_save:
+            return
+        _saving = True
+    try:
+        threading.Thread(target=_save, args=(roster, options), name='ampeli-snapshot', daemon=True).start()
+    except Exception:
+        with _lock:
+            _saving = False
+        raise
+
+
+def remember_member(member) -> None:
+    """Guardar o detalhe de um membro buscado com sucesso para o próximo snapshot"""
+    global _details_dirty
+    if not isinstance(member, dict) or member.get('id') is None:
+        return
+    with _lock:
+        _details[str(member['id'])] = member
+        _details.move_to_end(str(member['id']))
+        while len(_details) > snapshot_options()['MAX_MEMBERS']:
+            _details.popitem(last=False)
+        _details_dirty = True
+
+
+def forget_member(member_id) -> None:
+    global _details_dirty
+    with _lock:
+        if _details.pop(str(member_id), None) is not None:
+            _details_dirty = True
+
+
+def _save(roster: Roster, options: Dict) -> None:
+    global _saving, _saved_version, _last_save, _details_dirty
+    try:
+        with roster._lock:
+            version, members = roster.version, roster.to_list()
+        with _lock:
+            details, _details_dirty = dict(_details), False
+        data = {'format': SNAPSHOT_FORMAT, 'saved_at': time.time(), 'members': members, 'details': details}
+
+        # Arquivo temporário + rename: leitores nunca veem um snapshot pela metade
+        directory = os.path.dirname(options['PATH']) or '.'
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.ampeli-snapshot-')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as gz:
+                gz.write(json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+            os.replace(temporary, options['PATH'])
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        with _lock:
+            _saved_version = version
+        logger.debug(f"Members snapshot saved ({len(members)} members, {len(details)} details)")
+    except Exception as e:
+        logger.warning(f"Could not save members snapshot: {str(e)}")
+    finally:
+        with _lock:
+            _last_save = time.monotonic()
+            _saving = False
+
+
+def reset_snapshot() -> None:
+    """Esquecer o snapshot carregado e o estado de gravação (testes)"""
+    global _loaded, _snapshot, _cold_start_claimed, _saved_version, _last_save, _saving, _details_dirty
+    with _lock:
+        _loaded, _snapshot, _cold_start_claimed = False, None, False
+        _saved_version, _last_save, _saving, _details_dirty = None, 0.0, False, False
+        _details.clear()
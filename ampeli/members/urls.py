@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .api_auth_views import APILoginView, APIRegisterView, api_logout_view, register_user_api, login_user_api
 
+# Em ASGI as views de membros e autenticação podem rodar de forma assíncrona
+if getattr(settings, 'AMPELI_ASYNC_VIEWS', False):
+    from . import async_views as member_views
+    from .async_views import AsyncAPILoginView as APILoginView, AsyncAPIRegisterView as APIRegisterView
+else:
+    member_views = views
+
 app_name = 'members'
 
 urlpatterns = [
     # Membros
-    path('', views.member_list, name='member_list'),
-    path('membros/', views.member_list, name='member_list_alt'),
-    path('membros/<int:member_id>/', views.member_detail, name='member_detail'),
-    path('membros/<int:member_id>/perfil/', views.member_profile, name='member_profile'),
+    path('', member_views.member_list, name='member_list'),
+    path('membros/', member_views.member_list, name='member_list_alt'),
+    path('membros/<int:member_id>/', member_views.member_detail, name='member_detail'),
+    path('membros/<int:member_id>/perfil/', member_views.member_profile, name='member_profile'),
     
     # Onboarding
-    path('onboarding/', views.member_onboarding, name='member_onboarding'),
+    path('onboarding/', member_views.member_onboarding, name='member_onboarding'),
     
     # Authentication URLs (API-based)
     path('login/', APILoginView.as_view(), name='login'),
@@ -26,5 +34,10 @@ urlpatterns = [
     # API
     path('api/register/', register_user_api, name='register_user_api'),
     path('api/login/', login_user_api, name='login_user_api'),
-    path('api/check-onboarding/', views.check_onboarding_status, name='check_onboarding_status'),
+    path('api/check-onboarding/', member_views.check_onboarding_status, name='check_onboarding_status'),
+    path('api/typeahead/', member_views.member_typeahead, name='member_typeahead'),
+    path('api/members/', member_views.members_api, name='members_api'),
+    path('api/members/export/', member_views.members_export, name='members_export'),
+    path('api/members/<int:member_id>/', member_views.member_api_detail, name='member_api_detail'),
+    path('api/backend-status/', views.backend_status, name='backend_status'),
 ]
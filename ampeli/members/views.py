@@ -1,62 +1,308 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
 from .models import Member
 from .forms import MemberOnboardingForm
 from .services import AmpeliAPIService
-from .api_auth_views import login_required_api
+from .exports import EXPORT_FORMATS, export_chunks
+from .filters import iter_filtered_members
+from .conditional import member_last_modified, member_list_etag, member_page_etag, not_modified, with_validators
+from .page_cache import cached_member_list_page, member_list_cache_key, store_member_list_page
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from .prewarm import prewarm_status
+from .pagination import CursorPage, cursor_pagination_default, paginate_members_page
+from .roster import Roster, project_member
+from .search import complete_members
+from .cache import cache_enabled
+from .segments import SegmentError
+from .api_auth_views import login_required_api, login_required_json
+import hmac
 import json
+from logging import getLogger
 
+logger = getLogger(__name__)
 
 
+MEMBER_STATUS_CHOICES = [('active', 'Ativo'), ('inactive', 'Inativo'), ('visitor', 'Visitante')]
+
+
+def _member_list_query(request):
+    """Filtros e página da lista de membros a partir da querystring"""
+    status_filter = request.GET.get('status') or None
+    search_query = (request.GET.get('search') or '').strip() or None
+    # Segmento: expressão sobre os campos de escolha, ex. "active, married, volunteer_interest"
+    segment_query = (request.GET.get('segment') or '').strip() or None
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page_number = 1
+    return status_filter, search_query, segment_query, page_number
+
+
+def _member_list_cursor(request):
+    """Cursor da paginação keyset, ou None quando a lista usa números de página"""
+    if 'cursor' in request.GET or ('page' not in request.GET and cursor_pagination_default()):
+        return request.GET.get('cursor', '')
+    return None
+
+
+def _member_list_context(request, members_page):
+    """Montar o contexto do template a partir da página de membros do serviço"""
+    status_filter, search_query, segment_query, _ = _member_list_query(request)
+    
+    # Páginas por cursor não têm total nem números de página
+    cursor_page = CursorPage(members_page) if 'next_cursor' in members_page else None
+    
+    return {
+        'page_obj': paginate_members_page(members_page) if cursor_page is None else cursor_page,
+        'cursor_page': cursor_page,
+        'status_filter': status_filter,
+        'search_query': search_query,
+        'segment_query': segment_query,
+        'member_status_choices': MEMBER_STATUS_CHOICES,
+    }
+
+
+# Campos devolvidos pelo autocompletar de membros
+TYPEAHEAD_FIELDS = ('id', 'fullName', 'email', 'memberStatus')
+TYPEAHEAD_MAX_LIMIT = 50
+
+
+def _typeahead_query(request):
+    """Consulta e número de resultados do autocompletar"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), TYPEAHEAD_MAX_LIMIT)
+    except (TypeError, ValueError):
+        limit = 10
+    return query, limit
+
+
+def _typeahead_matches(members_data, query, limit):
+    """Membros do autocompletar sem construir um índice a cada tecla"""
+    if not query or not members_data:
+        return []
+    if isinstance(members_data, Roster) and cache_enabled():
+        # Lista em cache: o índice de prefixos é construído uma vez por versão e reaproveitado
+        return members_data.complete(query, limit)
+    # Lista buscada só para esta requisição: uma passada basta
+    return complete_members(members_data, query, limit)
+
+
+def _typeahead_response(members_data, query, limit):
+    members = _typeahead_matches(members_data, query, limit)
+    return JsonResponse({
+        'query': query,
+        'results': [{field: member.get(field) for field in TYPEAHEAD_FIELDS} for member in members],
+    })
+
+
+# API JSON somente leitura de membros: ?fields=id,fullName,memberStatus
+# serializa só os campos pedidos
+MEMBERS_API_MAX_PAGE_SIZE = 200
+
+
+def _members_api_fields(request):
+    """Campos pedidos em ?fields= (None: membro completo)"""
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    return tuple(dict.fromkeys(fields)) or None
+
+
+def _members_api_page_size(request):
+    try:
+        return min(max(int(request.GET.get('page_size')), 1), MEMBERS_API_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return None
+
+
+def _members_api_response(members_page, fields):
+    data = {'results': [project_member(member, fields) for member in members_page['results']]}
+    if 'next_cursor' in members_page:
+        data.update(nextCursor=members_page['next_cursor'], prevCursor=members_page['prev_cursor'])
+    else:
+        data.update(count=members_page['count'], page=members_page['page'])
+    data['pageSize'] = members_page['page_size']
+    return JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+
+
+def _members_api_error(error, status):
+    if isinstance(error, SegmentError):
+        return JsonResponse({'success': False, 'error': 'INVALID_SEGMENT', 'message': str(error)}, status=400)
+    # O detalhe (URLs e mensagens do backend) fica no log, não na resposta
+    logger.error(f"Members API request failed: {str(error)}")
+    return JsonResponse({
+        'success': False,
+        'error': 'UNEXPECTED_ERROR',
+        'message': 'Não foi possível carregar os membros. Tente novamente em instantes.'
+    }, status=status)
+
+
+def _member_api_response(member_data, fields):
+    if not member_data:
+        return JsonResponse({'success': False, 'error': 'NOT_FOUND', 'message': 'Membro não encontrado'}, status=404)
+    return JsonResponse(project_member(member_data, fields), json_dumps_params={'separators': (',', ':')})
+
+
+def _members_export_format(request):
+    export_format = request.GET.get('format', 'csv').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+
+def _members_export_response(chunks, export_format):
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="membros.{extension}"'
+    return response
+
+
+def _members_export_format_error():
+    return JsonResponse({
+        'success': False,
+        'error': 'INVALID_FORMAT',
+        'message': f'Formato de exportação inválido (use {", ".join(EXPORT_FORMATS)})'
+    }, status=400)
+
+
+def _member_list_error_context(request, error):
+    if isinstance(error, SegmentError):
+        # Expressão inválida: manter os filtros no formulário para o usuário corrigi-la
+        messages.error(request, str(error))
+        status_filter, search_query, segment_query, _ = _member_list_query(request)
+        return {
+            'page_obj': None,
+            'cursor_page': None,
+            'status_filter': status_filter,
+            'search_query': search_query,
+            'segment_query': segment_query,
+            'member_status_choices': MEMBER_STATUS_CHOICES,
+        }
+    messages.error(request, f'Erro ao carregar membros: {str(error)}')
+    return {
+        'page_obj': None,
+        'status_filter': None,
+        'search_query': None,
+        'segment_query': request.GET.get('segment'),
+        'member_status_choices': [],
+    }
+
+
+def _member_detail_context(member_data):
+    return {
+        'member': member_data,
+        'current_participations': member_data.get('currentParticipations', []),
+        'past_participations': member_data.get('pastParticipations', []),
+        'recent_attendances': member_data.get('recentAttendances', []),
+        'interests': member_data.get('interests', []),
+    }
+
+
+def _member_profile_context(member_data):
+    return {
+        'member': member_data,
+        'attendance_rate': member_data.get('attendanceRate', 0),
+        'total_attendances': member_data.get('totalAttendances', 0),
+        'total_events': member_data.get('totalEvents', 0),
+        'participations_by_type': member_data.get('participationsByType', []),
+    }
+
 
 @login_required_api
 def member_list(request):
     """Lista de membros com filtros e busca via API"""
+    cache_key = member_list_cache_key(request, request.session.get('api_user_id'))
     api_service = AmpeliAPIService()
+    etag = None
     
     try:
-        # Buscar todos os membros via API
-        members_data = api_service.get_all_members()
-        
-        # Aplicar filtros localmente (idealmente seria na API)
-        status_filter = request.GET.get('status')
-        search_query = request.GET.get('search')
-        
-        if status_filter:
-            members_data = [m for m in members_data if m.get('memberStatus') == status_filter]
-        
-        if search_query:
-            members_data = [
-                m for m in members_data 
-                if search_query.lower() in m.get('fullName', '').lower() or
-                   search_query.lower() in m.get('email', '').lower() or
-                   search_query.lower() in m.get('phone', '').lower()
-            ]
-        
-        # Simular paginação
-        from django.core.paginator import Paginator
-        paginator = Paginator(members_data, 20)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        
-        context = {
-            'page_obj': page_obj,
-            'status_filter': status_filter,
-            'search_query': search_query,
-            'member_status_choices': [('active', 'Ativo'), ('inactive', 'Inativo'), ('visitor', 'Visitante')],
-        }
+        # Filtros e paginação são aplicados pelo backend; só a página atual é baixada
+        status_filter, search_query, segment_query, page_number = _member_list_query(request)
+        cursor = _member_list_cursor(request)
+        if cursor is not None:
+            # Keyset: o custo de qualquer página é o mesmo da primeira
+            members_page = api_service.get_members_cursor_page(status_filter, search_query, cursor,
+                                                               segment=segment_query)
+        else:
+            members_page = api_service.get_members_page(status_filter, search_query, page_number,
+                                                        segment=segment_query)
+        # Mesmos dados da última visita: 304 sem renderizar
+        etag = member_list_etag(cache_key, members_page, api_service.data_as_of)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        # Mesmos filtros e dados vistos por outra aba/navegação: devolver o HTML já renderizado
+        cached = cached_member_list_page(cache_key, etag)
+        if cached is not None:
+            return with_validators(cached, etag)
+        context = _member_list_context(request, members_page)
     except Exception as e:
-        messages.error(request, f'Erro ao carregar membros: {str(e)}')
-        context = {
-            'page_obj': None,
-            'status_filter': None,
-            'search_query': None,
-            'member_status_choices': [],
-        }
+        context = _member_list_error_context(request, e)
+        cache_key = etag = None
+    # Backend fora do ar: a página indica a data dos dados salvos em disco
+    context['data_as_of'] = api_service.data_as_of
     
-    return render(request, 'members/member_list.html', context)
+    response = render(request, 'members/member_list.html', context)
+    store_member_list_page(cache_key, etag, response)
+    return with_validators(response, etag)
+
+
+@login_required_json
+def member_typeahead(request):
+    """API de autocompletar nomes de membros a partir da lista em cache"""
+    query, limit = _typeahead_query(request)
+    members_data = AmpeliAPIService().get_all_members() if query else []
+    return _typeahead_response(members_data, query, limit)
+
+
+@gzip_page
+@require_GET
+@login_required_json
+def members_api(request):
+    """API JSON da lista de membros, com filtros, paginação e projeção de campos"""
+    api_service = AmpeliAPIService()
+    status_filter, search_query, segment_query, page_number = _member_list_query(request)
+    page_size, fields = _members_api_page_size(request), _members_api_fields(request)
+    
+    try:
+        cursor = _member_list_cursor(request)
+        if cursor is not None:
+            members_page = api_service.get_members_cursor_page(status_filter, search_query, cursor, page_size,
+                                                               segment=segment_query)
+        else:
+            members_page = api_service.get_members_page(status_filter, search_query, page_number, page_size,
+                                                        segment=segment_query)
+    except Exception as e:
+        return _members_api_error(e, status=502)
+    return _members_api_response(members_page, fields)
+
+
+@gzip_page
+@require_GET
+@login_required_json
+def members_export(request):
+    """Exportar a lista de membros (com os filtros da lista) em CSV ou NDJSON, via streaming"""
+    export_format = _members_export_format(request)
+    if export_format is None:
+        return _members_export_format_error()
+    status_filter, search_query, segment_query, _ = _member_list_query(request)
+    
+    try:
+        members = iter_filtered_members(AmpeliAPIService().get_all_members(), status_filter, search_query,
+                                        segment_query)
+    except Exception as e:
+        return _members_api_error(e, status=502)
+    return _members_export_response(export_chunks(members, export_format, _members_api_fields(request)), export_format)
+
+
+@gzip_page
+@require_GET
+@login_required_json
+def member_api_detail(request, member_id):
+    """API JSON de um membro, com projeção de campos"""
+    return _member_api_response(AmpeliAPIService().get_member_by_id(member_id), _members_api_fields(request))
 
 
 @login_required_api
@@ -72,18 +318,17 @@ def member_detail(request, member_id):
             messages.error(request, 'Membro não encontrado.')
             return redirect('members:member_list')
         
-        context = {
-            'member': member_data,
-            'current_participations': member_data.get('currentParticipations', []),
-            'past_participations': member_data.get('pastParticipations', []),
-            'recent_attendances': member_data.get('recentAttendances', []),
-            'interests': member_data.get('interests', []),
-        }
+        etag = member_page_etag(request, request.session.get('api_user_id'), 'member_detail', member_data)
+        last_modified = member_last_modified(member_data)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        context = {**_member_detail_context(member_data), 'data_as_of': api_service.data_as_of}
     except Exception as e:
         messages.error(request, f'Erro ao carregar detalhes do membro: {str(e)}')
         return redirect('members:member_list')
     
-    return render(request, 'members/member_detail.html', context)
+    return with_validators(render(request, 'members/member_detail.html', context), etag, last_modified)
 
 
 @login_required_api
@@ -99,18 +344,42 @@ def member_profile(request, member_id):
             messages.error(request, 'Membro não encontrado.')
             return redirect('members:member_list')
         
-        context = {
-            'member': member_data,
-            'attendance_rate': member_data.get('attendanceRate', 0),
-            'total_attendances': member_data.get('totalAttendances', 0),
-            'total_events': member_data.get('totalEvents', 0),
-            'participations_by_type': member_data.get('participationsByType', []),
-        }
+        etag = member_page_etag(request, request.session.get('api_user_id'), 'member_profile', member_data)
+        last_modified = member_last_modified(member_data)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        context = {**_member_profile_context(member_data), 'data_as_of': api_service.data_as_of}
     except Exception as e:
         messages.error(request, f'Erro ao carregar perfil do membro: {str(e)}')
         return redirect('members:member_list')
     
-    return render(request, 'members/member_profile.html', context)
+    return with_validators(render(request, 'members/member_profile.html', context), etag, last_modified)
+
+
+@require_GET
+@login_required_json
+def backend_status(request):
+    """Latência do último ping ao backend e estado do aquecimento neste worker"""
+    return JsonResponse(prewarm_status())
+
+
+def _metrics_authorized(request) -> bool:
+    token = getattr(settings, 'AMPELI_METRICS', {}).get('TOKEN')
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and authorization.startswith('Bearer '):
+        return hmac.compare_digest(authorization[len('Bearer '):].encode(), token.encode())
+    return bool(request.session.get('api_user_id'))
+
+
+@require_GET
+def metrics(request):
+    """Métricas do worker no formato de texto do Prometheus"""
+    if not _metrics_authorized(request):
+        response = HttpResponse('Não autorizado.', status=401, content_type='text/plain; charset=utf-8')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
 
 @login_required_api
@@ -298,7 +567,7 @@ def member_onboarding(request):
     })
 
 
-@login_required_api
+@login_required_json
 def check_onboarding_status(request):
     """API endpoint para verificar se usuário completou onboarding"""
     try:
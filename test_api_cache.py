@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Teste do cache de leitura do AmpeliAPIService
+"""
+
+import os
+import sys
+import threading
+import time
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.test.utils import override_settings
+
+from members.cache import EXPIRED, FRESH, MISSING, STALE, TTLLRUCache, clear_caches, entry_state, get_cache
+from members.roster import Roster
+from members.services import AmpeliAPIService
+
+
+class CountingService(AmpeliAPIService):
+    """Serviço que responde localmente e conta as chamadas ao backend"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append((method, endpoint))
+        if endpoint == '/members':
+            return [{'id': 1, 'fullName': 'João'}, {'id': 2, 'fullName': 'Maria'}]
+        if endpoint.startswith('/members/'):
+            return {'id': int(endpoint.rsplit('/', 1)[-1]), 'fullName': 'João'}
+        return {}
+
+
+def test_ttl_expiration():
+    """Entradas expiram após o TTL"""
+    cache = TTLLRUCache('test', ttl=0.05, max_entries=10)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is MISSING
+    value, age = cache.get_entry('a')
+    assert value == 1 and age > 0.05
+
+
+def test_lru_eviction():
+    """Entrada menos usada é descartada ao atingir o limite"""
+    cache = TTLLRUCache('test', ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is MISSING
+    assert cache.get('c') == 3
+
+
+def test_read_through_and_invalidation():
+    """Leituras repetidas usam o cache; escritas invalidam"""
+    clear_caches()
+    service = CountingService()
+
+    service.get_all_members()
+    service.get_all_members()
+    service.get_member_by_id(1)
+    service.get_member_by_id(1)
+    assert service.calls == [('GET', '/members'), ('GET', '/members/1')]
+
+    # Write-through: o membro devolvido pelo PUT já atende a próxima leitura
+    service.update_member(1, {'fullName': 'João Silva'})
+    assert service.get_member_by_id(1) == {'id': 1, 'fullName': 'João'}
+    assert service.calls[-1] == ('PUT', '/members/1')
+
+    # A lista completa não é baixada de novo: o membro alterado é aplicado nela
+    members = service.get_all_members()
+    assert len(service.calls) == 3
+    assert members.search('joao') == [{'id': 1, 'fullName': 'João'}]
+
+    service.create_member({'fullName': 'Ana'})
+    service.get_all_members()
+    assert service.calls[-1] == ('GET', '/members')
+
+
+def test_member_cache_delete_and_stats():
+    """Exclusão despeja o membro e os contadores medem a taxa de acerto"""
+    clear_caches()
+    service = CountingService()
+    cache = get_cache('member')
+    hits, misses = cache.hits, cache.misses
+
+    service.get_member_by_id(2)
+    service.get_member_by_id(2)
+    service.get_member_by_id(2)
+    service.delete_member(2)
+    service.get_member_by_id(2)
+    assert service.calls == [('GET', '/members/2'), ('DELETE', '/members/2'), ('GET', '/members/2')]
+    assert (cache.hits - hits, cache.misses - misses) == (2, 2)
+
+    lru = TTLLRUCache('test', ttl=60, max_entries=1)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('b')
+    lru.get('a')
+    assert lru.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5}
+
+
+def test_entry_state():
+    """Servir, servir e atualizar em segundo plano, ou buscar, conforme a idade e as opções"""
+    options = {'ttl': 60, 'stale_while_revalidate': True, 'max_stale': 900}
+    assert entry_state(None, options) == EXPIRED
+    assert entry_state(('lista', 10), options) == FRESH
+    assert entry_state(('lista', 300), options) == STALE
+    assert entry_state(('lista', 1000), options) == EXPIRED
+    assert entry_state(('lista', 300), {**options, 'stale_while_revalidate': False}) == EXPIRED
+
+
+def test_stale_while_revalidate():
+    """Lista expirada é servida na hora e atualizada em segundo plano"""
+    clear_caches()
+    release = threading.Event()
+
+    class SlowService(CountingService):
+        def _make_request(self, method, endpoint, data=None):
+            if self.calls:
+                release.wait(2)
+            return super()._make_request(method, endpoint, data)
+
+    service = SlowService()
+    with override_settings(AMPELI_API_CACHE={'NAMESPACES': {'members': {
+            'ttl': 0.01, 'max_entries': 4, 'stale_while_revalidate': True, 'max_stale': 60}}}):
+        first = service.get_all_members()
+        time.sleep(0.02)
+        # Backend "lento": as duas leituras retornam a lista antiga sem esperar
+        assert service.get_all_members() is first
+        assert service.get_all_members() is first
+        release.set()
+        for _ in range(100):
+            if len(service.calls) == 2 and get_cache('members').get('/members') is not MISSING:
+                break
+            time.sleep(0.01)
+        # Apenas uma atualização em segundo plano foi disparada
+        assert service.calls == [('GET', '/members'), ('GET', '/members')]
+    clear_caches()
+
+
+def test_background_refresh_builds_roster_indexes():
+    """A lista atualizada em segundo plano é publicada com os índices prontos"""
+    from members import pagination, segments
+
+    clear_caches()
+    service = CountingService()
+    with override_settings(AMPELI_API_CACHE={'NAMESPACES': {'members': {
+            'ttl': 0.01, 'max_entries': 4, 'stale_while_revalidate': True, 'max_stale': 60}}}):
+        first = service.get_all_members()
+        time.sleep(0.02)
+        assert service.get_all_members() is first
+        for _ in range(100):
+            refreshed = get_cache('members').get_entry('/members')[0]
+            if refreshed is not first:
+                break
+            time.sleep(0.01)
+        assert refreshed is not first
+        assert refreshed._search_index is not None
+        # O autocompletar não reconstrói o índice de prefixos a cada atualização
+        assert refreshed._prefix_index is not None
+        assert pagination._sorted_keys[refreshed][0] == refreshed.version
+        assert segments._indexes[refreshed].version == refreshed.version
+    clear_caches()
+
+
+def test_get_all_members_returns_roster():
+    """A lista completa é um Roster (também vazio com o backend fora do ar); to_list() dá dicts"""
+    clear_caches()
+    members = CountingService().get_all_members()
+    assert isinstance(members, Roster)
+    assert members.to_list() == [{'id': 1, 'fullName': 'João'}, {'id': 2, 'fullName': 'Maria'}]
+
+    class OfflineService(CountingService):
+        def _make_request(self, method, endpoint, data=None):
+            raise RuntimeError('Backend fora do ar')
+
+    clear_caches()
+    with override_settings(AMPELI_API_SNAPSHOT={'ENABLED': False}):
+        from members.snapshot import reset_snapshot
+        reset_snapshot()
+        offline = OfflineService().get_all_members()
+        reset_snapshot()
+    assert isinstance(offline, Roster) and len(offline) == 0 and offline.to_list() == []
+    clear_caches()
+
+
+if __name__ == "__main__":
+    test_ttl_expiration()
+    test_lru_eviction()
+    test_read_through_and_invalidation()
+    test_member_cache_delete_and_stats()
+    test_entry_state()
+    test_stale_while_revalidate()
+    test_background_refresh_builds_roster_indexes()
+    test_get_all_members_returns_roster()
+    print("OK - Testes de cache passaram!")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+Teste do AsyncAmpeliAPIService contra um servidor HTTP local
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import django
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from members.async_services import AsyncAmpeliAPIService, AsyncSingleFlight, close_async_client, get_async_client
+from members.cache import clear_caches, get_cache
+from members.http_client import DeadlineExceeded, current_budget, deadline
+
+
+MEMBERS = [
+    {'id': 1, 'fullName': 'João da Silva', 'email': 'joao@teste.com', 'memberStatus': 'active'},
+    {'id': 2, 'fullName': 'Maria Conceição', 'email': 'maria@teste.com', 'memberStatus': 'visitor'},
+]
+
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    """Backend falso com as rotas usadas pelo serviço"""
+
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+    delay = 0
+
+    def _reply(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests_seen.append(('GET', self.path))
+        time.sleep(self.delay)
+        if self.path == '/api/members':
+            return self._reply(200, MEMBERS)
+        if self.path.startswith('/api/members/'):
+            member_id = int(self.path.rsplit('/', 1)[-1])
+            member = next((m for m in MEMBERS if m['id'] == member_id), None)
+            return self._reply(200 if member else 404, member or {'message': 'not found'})
+        if self.path == '/api/recommendations/health':
+            return self._reply(200, {'status': 'ok'})
+        return self._reply(404, {'message': 'not found'})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        self.requests_seen.append(('POST', self.path))
+        if self.path == '/api/auth/login':
+            if body.get('password') == 'senha123':
+                return self._reply(200, {'user': {'id': 7, 'email': body['email']}, 'token': 'abc'})
+            return self._reply(401, {'message': 'unauthorized'})
+        if self.path == '/api/auth/register':
+            return self._reply(409, {'message': 'conflict'})
+        return self._reply(404, {'message': 'not found'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBackendHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_service(server):
+    service = AsyncAmpeliAPIService()
+    service.base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+    return service
+
+
+def test_async_members_and_auth():
+    """Métodos assíncronos retornam os mesmos formatos do serviço síncrono"""
+    server = start_stub_server()
+    clear_caches()
+
+    async def run():
+        service = make_service(server)
+        members = await service.get_all_members()
+        member = await service.get_member_by_id(2)
+        missing = await service.get_member_by_id(99)
+        login_ok = await service.login_user('joao@teste.com', 'senha123')
+        login_bad = await service.login_user('joao@teste.com', 'errada')
+        register = await service.register_user('João', 'joao@teste.com', 'senha123')
+        health = await service.check_recommendations_health()
+        await close_async_client()
+        return members, member, missing, login_ok, login_bad, register, health
+
+    try:
+        members, member, missing, login_ok, login_bad, register, health = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert [m['id'] for m in members] == [1, 2]
+    assert member['fullName'] == 'Maria Conceição'
+    assert missing is None
+    assert login_ok['success'] and login_ok['token'] == 'abc'
+    assert login_bad['error'] == 'INVALID_CREDENTIALS'
+    assert register['error'] == 'USER_EXISTS'
+    assert health == {'status': 'ok'}
+    clear_caches()
+
+
+def test_async_concurrent_gets_share_one_call():
+    """GETs idênticos simultâneos usam uma única chamada e um único cliente"""
+    server = start_stub_server()
+    StubBackendHandler.requests_seen = []
+    StubBackendHandler.delay = 0.1
+
+    async def run():
+        service = make_service(server)
+        client = get_async_client()
+        results = await asyncio.gather(*[service.get_member_by_user_id(1) for _ in range(20)])
+        assert get_async_client() is client
+        await close_async_client()
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        StubBackendHandler.delay = 0
+        server.shutdown()
+
+    assert len(results) == 20
+    assert StubBackendHandler.requests_seen == [('GET', '/api/members/user/1')]
+
+
+def test_shared_tasks_do_not_inherit_request_deadline():
+    """A chamada coalescida e a atualização em segundo plano não usam o orçamento de quem as criou"""
+    budgets = []
+
+    async def fetch():
+        budgets.append(current_budget())
+        await asyncio.sleep(0.2)
+        return MEMBERS
+
+    async def with_deadline(seconds, coro_fn):
+        with deadline(seconds) as budget:
+            try:
+                return await coro_fn()
+            except DeadlineExceeded as e:
+                return e, budget
+
+    async def coalesced():
+        flights = AsyncSingleFlight()
+        return await asyncio.gather(
+            with_deadline(0.05, lambda: flights.do('/members', fetch)),
+            with_deadline(5, lambda: flights.do('/members', fetch)),
+        )
+
+    (error, leader_budget), follower = asyncio.run(coalesced())
+    # O primeiro desiste no próprio deadline; o segundo recebe a resposta
+    assert isinstance(error, DeadlineExceeded) and leader_budget.exhausted
+    assert follower == MEMBERS and budgets == [None]
+
+    class SlowRefreshService(AsyncAmpeliAPIService):
+        async def _make_request(self, method, endpoint, data=None):
+            return await fetch()
+
+    async def refresh():
+        service = SlowRefreshService()
+        cache = get_cache('members')
+        cache.set('/members', [], age=120)
+        with deadline(0.05) as budget:
+            service._refresh_in_background(cache, '/members', lambda value: value)
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if cache.get_entry('/members')[0]:
+                break
+        return budget, cache.get_entry('/members')[0]
+
+    clear_caches()
+    budgets.clear()
+    budget, refreshed = asyncio.run(refresh())
+    assert refreshed == MEMBERS and budgets == [None] and not budget.exhausted
+    clear_caches()
+
+
+def test_snapshot_read_off_the_event_loop():
+    """Com o backend fora do ar a leitura do snapshot (arquivo + gzip) roda numa thread"""
+    threads = []
+
+    def load_snapshot():
+        threads.append(threading.get_ident())
+        return None
+
+    class OfflineService(AsyncAmpeliAPIService):
+        async def _make_request(self, method, endpoint, data=None):
+            raise RuntimeError('Backend fora do ar')
+
+    async def run():
+        service = OfflineService()
+        members = await service.get_all_members()
+        member = await service.get_member_by_id(1)
+        return threading.get_ident(), members, member
+
+    clear_caches()
+    with mock.patch('members.async_services.load_snapshot', load_snapshot), \
+            mock.patch('members.services.load_snapshot', load_snapshot):
+        loop_thread, members, member = asyncio.run(run())
+    assert len(members) == 0 and member is None
+    assert len(threads) == 2 and loop_thread not in threads
+    clear_caches()
+
+
+if __name__ == "__main__":
+    test_async_members_and_auth()
+    test_async_concurrent_gets_share_one_call()
+    test_shared_tasks_do_not_inherit_request_deadline()
+    test_snapshot_read_off_the_event_loop()
+    print("OK - Testes do serviço assíncrono passaram!")
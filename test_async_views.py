@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Teste das views assíncronas, do login_required_api assíncrono e do 504 do
+BackendDeadlineMiddleware em ASGI
+"""
+
+import asyncio
+import json
+import os
+import sys
+import django
+from unittest import mock
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from asgiref.sync import async_to_sync
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, override_settings
+
+from members import async_views
+from members.async_services import AsyncAmpeliAPIService, close_async_client
+from members.cache import clear_caches
+from members.http_client import DeadlineExceeded, current_budget, request_timeout
+from members.middleware import BackendDeadlineMiddleware
+from test_async_services import StubBackendHandler, start_stub_server
+
+
+def _request(path, user_id=7, **extra):
+    request = AsyncRequestFactory().get(path, **extra)
+    # Sem cookie CSRF a lista não é cacheada nem recebe ETag
+    request.META['CSRF_COOKIE'] = 'csrf-teste'
+    request.session = SessionStore()
+    if user_id is not None:
+        request.session['api_user_id'] = user_id
+    request._messages = CookieStorage(request)
+    return request
+
+
+def _stubbed_service(server):
+    """Serviço assíncrono das views apontando para o backend falso"""
+    class StubbedAsyncService(AsyncAmpeliAPIService):
+        def __init__(self):
+            super().__init__()
+            self.base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+    return StubbedAsyncService
+
+
+def _call(view, request, *args):
+    """Chamar a view assíncrona e fechar o cliente httpx no mesmo event loop"""
+    async def run():
+        try:
+            return await view(request, *args)
+        finally:
+            await close_async_client()
+    return async_to_sync(run)()
+
+
+def _fake_render(request, template_name, context):
+    # base.html referencia uma URL inexistente; a view é testada sem renderizar o template
+    response = HttpResponse(template_name)
+    response.context = context
+    return response
+
+
+def test_async_login_required_redirects_anonymous():
+    """Sem api_user_id na sessão a view assíncrona não roda e redireciona para o login"""
+    with mock.patch.object(async_views, 'AsyncAmpeliAPIService') as service:
+        for view, args in ((async_views.member_list, ()), (async_views.member_detail, (1,))):
+            response = _call(view, _request('/members/', user_id=None), *args)
+            assert response.status_code == 302 and response['Location'] == '/members/login/', response
+        # As views JSON respondem 401 em JSON em vez do redirecionamento HTML
+        for view in (async_views.members_api, async_views.member_typeahead):
+            response = _call(view, _request('/members/api/members/?q=mar', user_id=None))
+            assert response.status_code == 401
+            assert json.loads(response.content)['error'] == 'NOT_AUTHENTICATED'
+        service.assert_not_called()
+
+
+@override_settings(AMPELI_API_BACKEND_PAGINATION={'ENABLED': False})
+def test_async_member_list_and_json_views():
+    """member_list, members_api e member_typeahead assíncronos contra o backend falso"""
+    server = start_stub_server()
+    StubBackendHandler.requests_seen = []
+    clear_caches()
+    try:
+        with mock.patch.object(async_views, 'AsyncAmpeliAPIService', _stubbed_service(server)), \
+                mock.patch.object(async_views, 'render', _fake_render):
+            response = _call(async_views.member_list, _request('/members/?status=visitor'))
+            assert response.status_code == 200 and response.has_header('ETag')
+            assert [m['id'] for m in response.context['page_obj'].object_list] == [2]
+
+            # Mesmos dados: 304 sem renderizar
+            revalidated = _call(async_views.member_list,
+                                _request('/members/?status=visitor', headers={'If-None-Match': response['ETag']}))
+            assert revalidated.status_code == 304
+
+            response = _call(async_views.members_api, _request('/members/api/members/?fields=id,fullName'))
+            assert response.status_code == 200
+            data = json.loads(response.content)
+            assert data['results'] == [{'id': 1, 'fullName': 'João da Silva'},
+                                       {'id': 2, 'fullName': 'Maria Conceição'}]
+            assert data['count'] == 2
+
+            response = _call(async_views.member_typeahead, _request('/members/api/typeahead/?q=mar'))
+            assert [m['id'] for m in json.loads(response.content)['results']] == [2]
+
+        # A lista completa foi buscada uma vez e servida do cache nas chamadas seguintes
+        assert StubBackendHandler.requests_seen.count(('GET', '/api/members')) == 1
+    finally:
+        server.shutdown()
+        clear_caches()
+
+
+@override_settings(AMPELI_API_REQUEST_BUDGET=0.05)
+def test_async_deadline_middleware_returns_504():
+    """View assíncrona que degradou porque o orçamento acabou vira 504; as demais passam"""
+    async def degraded_view(request):
+        await asyncio.sleep(0.1)
+        try:
+            request_timeout('members')
+        except DeadlineExceeded:
+            # Como as views de membros: fallback vazio em vez de propagar o erro
+            return HttpResponse('[]')
+        return HttpResponse('ok')
+
+    async def fast_view(request):
+        assert current_budget() is not None
+        return HttpResponse('ok')
+
+    middleware = BackendDeadlineMiddleware(degraded_view)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(_request('/members/'))
+    assert response.status_code == 504
+    assert 'demorou demais' in response.content.decode()
+
+    response = async_to_sync(BackendDeadlineMiddleware(fast_view))(_request('/members/'))
+    assert response.status_code == 200 and response.content == b'ok'
+    # O orçamento é desfeito ao fim da requisição
+    assert current_budget() is None
+
+
+if __name__ == "__main__":
+    test_async_login_required_redirects_anonymous()
+    test_async_member_list_and_json_views()
+    test_async_deadline_middleware_returns_504()
+    print("OK - Testes das views assíncronas passaram!")
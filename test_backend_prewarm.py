@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Teste do aquecimento do backend (intervalo adaptativo, parada por inatividade)
+"""
+
+import os
+import sys
+import time
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from members import middleware
+from members.http_client import AmpeliAPIError
+from members.middleware import BackendPrewarmMiddleware
+from members.pagination import backend_pagination_enabled, reset_backend_pagination
+from members.prewarm import BackendPrewarmer
+from members.services import AmpeliAPIService
+
+
+OPTIONS = {'ENABLED': True, 'MIN_INTERVAL': 0.05, 'MAX_INTERVAL': 0.2, 'IDLE_AFTER': 0.3, 'COLD_THRESHOLD': 0.05}
+
+
+class SleepyBackend(AmpeliAPIService):
+    """Backend cuja primeira resposta é lenta (partida a frio)"""
+
+    delays = [0.1]
+    online = True
+    paginated = True
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append(endpoint)
+        if not self.online:
+            raise AmpeliAPIError('Backend fora do ar', status_code=503)
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        if 'health' in endpoint:
+            return {'status': 'ok'}
+        return {'content': [{'id': 1}], 'totalElements': 30} if self.paginated else [{'id': 1}, {'id': 2}]
+
+
+def test_adaptive_interval():
+    """Ping lento ou com erro volta ao intervalo mínimo; rápido dobra até o máximo"""
+    prewarmer = BackendPrewarmer()
+    backend = SleepyBackend()
+    assert prewarmer.ping(OPTIONS, backend) >= 0.1
+    assert prewarmer.interval == 0.05 and prewarmer.cold_starts == 1
+    prewarmer.ping(OPTIONS, backend)
+    prewarmer.ping(OPTIONS, backend)
+    prewarmer.ping(OPTIONS, backend)
+    assert prewarmer.interval == 0.2 and prewarmer.cold_starts == 1
+    backend.online = False
+    prewarmer.ping(OPTIONS, backend)
+    status = prewarmer.status()
+    assert status['interval'] == 0.05 and status['last_ok'] is False and status['pings'] == 5
+
+
+def test_stops_when_front_end_is_idle():
+    """Sem tráfego por IDLE_AFTER a thread termina; nova requisição a reinicia"""
+    prewarmer = BackendPrewarmer()
+    prewarmer.ping = lambda options: 0.0
+    with override_settings(AMPELI_API_PREWARM={'ENABLED': False}):
+        prewarmer.note_traffic()
+        assert not prewarmer.running
+    with override_settings(AMPELI_API_PREWARM=OPTIONS):
+        prewarmer.note_traffic()
+        assert prewarmer.running
+        deadline = time.monotonic() + 3
+        while prewarmer.running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not prewarmer.running
+        prewarmer.note_traffic()
+        assert prewarmer.running
+        prewarmer.stop()
+        assert not prewarmer.running
+
+
+def test_ping_skips_member_page_without_backend_pagination():
+    """Backend que ignora a paginação devolve a lista inteira: o ping passa a usar só o health check"""
+    reset_backend_pagination()
+    backend = SleepyBackend()
+    backend.delays, backend.paginated = [], False
+    prewarmer = BackendPrewarmer()
+    prewarmer.ping(OPTIONS, backend)
+    assert backend.calls == ['/recommendations/health', '/members?page=0&size=1']
+    assert not backend_pagination_enabled()
+
+    backend.calls = []
+    prewarmer.ping(OPTIONS, backend)
+    assert backend.calls == ['/recommendations/health'] and prewarmer.last_ok
+    reset_backend_pagination()
+
+
+def test_metrics_and_status_are_not_traffic():
+    """O scraper do /metrics e o status do backend não mantêm o aquecimento ativo"""
+    noted = []
+    view = BackendPrewarmMiddleware(lambda request: HttpResponse('ok'))
+    original = middleware.prewarmer.note_traffic
+    middleware.prewarmer.note_traffic = lambda: noted.append(True)
+    try:
+        for path in ('/metrics', '/members/api/backend-status/'):
+            view(RequestFactory().get(path))
+        assert noted == []
+        view(RequestFactory().get('/members/'))
+        assert noted == [True]
+    finally:
+        middleware.prewarmer.note_traffic = original
+
+
+if __name__ == "__main__":
+    test_adaptive_interval()
+    test_stops_when_front_end_is_idle()
+    test_ping_skips_member_page_without_backend_pagination()
+    test_metrics_and_status_are_not_traffic()
+    print("OK - Testes do aquecimento do backend passaram!")
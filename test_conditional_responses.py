@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Teste das respostas condicionais (ETag/Last-Modified/304) das páginas de membros
+"""
+
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from members.cache import clear_caches, get_cache
+from members.conditional import member_last_modified, member_list_etag, member_page_etag, with_validators
+from members.page_cache import member_list_cache_key, store_member_list_page
+from members.pagination import reset_backend_pagination
+from members.services import AmpeliAPIService
+from members.views import member_list, member_profile
+
+
+MEMBER = {'id': 7, 'fullName': 'Ana', 'updatedAt': '2025-03-01T12:00:00Z'}
+
+
+def request_for(**headers):
+    request = RequestFactory().get('/membros/7/perfil/', **headers)
+    request.META['CSRF_COOKIE'] = 'segredo'
+    request.session = {'api_user_id': 1}
+    return request
+
+
+def test_etag_and_last_modified():
+    """ETag muda com os dados, o usuário e o cookie CSRF; updatedAt vira Last-Modified"""
+    etag = member_page_etag(request_for(), 1, 'member_profile', MEMBER)
+    assert etag == member_page_etag(request_for(), 1, 'member_profile', dict(MEMBER))
+    assert etag != member_page_etag(request_for(), 2, 'member_profile', MEMBER)
+    assert etag != member_page_etag(request_for(), 1, 'member_profile', {**MEMBER, 'fullName': 'Ana Paula'})
+    assert member_page_etag(request_for(), None, 'member_profile', MEMBER) is None
+
+    assert member_last_modified(MEMBER) == 1740830400
+    assert member_last_modified({'updatedAt': 1740830400000}) == 1740830400
+    assert member_last_modified({'updatedAt': 'ontem'}) is None
+
+    response = with_validators(HttpResponse('ok'), etag, member_last_modified(MEMBER))
+    assert response['ETag'] == etag and response['Last-Modified'] == 'Sat, 01 Mar 2025 12:00:00 GMT'
+    assert 'private' in response['Cache-Control'] and 'no-cache' in response['Cache-Control']
+
+
+def test_not_modified_before_rendering():
+    """If-None-Match igual ao ETag atual responde 304 sem renderizar o template"""
+    clear_caches()
+    get_cache('member').set('/members/7', MEMBER)
+    etag = member_page_etag(request_for(), 1, 'member_profile', MEMBER)
+
+    response = member_profile(request_for(HTTP_IF_NONE_MATCH=etag), 7)
+    assert response.status_code == 304 and response['ETag'] == etag
+    clear_caches()
+
+
+def test_member_list_etag_follows_refetched_data():
+    """Página do backend que expira e volta diferente muda o ETag: nada de 304 com a lista antiga"""
+    clear_caches()
+    reset_backend_pagination()
+    endpoint = AmpeliAPIService()._members_page_endpoint(None, None, 1, 20)
+    page = {'content': [{'id': 1, 'fullName': 'Ana'}], 'totalElements': 1}
+    get_cache('members_page').set(endpoint, page)
+    key = member_list_cache_key(request_for(), 1)
+    old_etag = member_list_etag(key, AmpeliAPIService().get_members_page())
+
+    response = member_list(request_for(HTTP_IF_NONE_MATCH=old_etag))
+    assert response.status_code == 304
+
+    # Outro worker (ou cliente) alterou a lista; o cache local expirou e foi rebuscado
+    get_cache('members_page').set(endpoint, {'content': page['content'] + [{'id': 2, 'fullName': 'Bruno'}],
+                                             'totalElements': 2})
+    new_etag = member_list_etag(key, AmpeliAPIService().get_members_page())
+    assert new_etag != old_etag
+    store_member_list_page(key, new_etag, HttpResponse(b'<html>nova</html>'))
+    response = member_list(request_for(HTTP_IF_NONE_MATCH=old_etag))
+    assert response.status_code == 200 and response.content == b'<html>nova</html>'
+    assert response['ETag'] == new_etag
+    clear_caches()
+
+
+if __name__ == "__main__":
+    test_etag_and_last_modified()
+    test_not_modified_before_rendering()
+    test_member_list_etag_follows_refetched_data()
+    print("OK - Testes de respostas condicionais passaram!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Teste do pool de conexões HTTP do worker (sessões por thread sobre um adapter compartilhado)
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from members.http_client import KeepAliveHTTPAdapter, get_session, reset_pool
+
+
+def _session_in_thread():
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(get_session()))
+    thread.start()
+    thread.join(5)
+    return sessions[0]
+
+
+def test_session_reused_per_thread_over_shared_adapter():
+    """Cada thread reutiliza a própria sessão; todas usam o mesmo adapter (pool) do processo"""
+    reset_pool()
+    session = get_session()
+    assert get_session() is session
+
+    other = _session_in_thread()
+    assert other is not session
+
+    adapter = session.get_adapter('https://ampeli-backend.onrender.com/api/members')
+    assert isinstance(adapter, KeepAliveHTTPAdapter)
+    assert other.get_adapter('https://ampeli-backend.onrender.com/api/members') is adapter
+    assert session.get_adapter('http://localhost/') is adapter
+    reset_pool()
+
+
+def test_reset_pool_discards_sessions():
+    """Depois de reset_pool a thread recebe uma sessão nova sobre um adapter novo"""
+    reset_pool()
+    session = get_session()
+    adapter = session.get_adapter('https://ampeli-backend.onrender.com/api')
+    reset_pool()
+
+    fresh = get_session()
+    assert fresh is not session
+    assert fresh.get_adapter('https://ampeli-backend.onrender.com/api') is not adapter
+    assert get_session() is fresh
+    reset_pool()
+
+
+def _child(parent_session, parent_adapter, results):
+    session = get_session()
+    adapter = session.get_adapter('https://ampeli-backend.onrender.com/api')
+    results.put((session is parent_session, adapter is parent_adapter, get_session() is session))
+
+
+def test_fork_gets_a_fresh_pool():
+    """Um worker criado por fork (gunicorn --preload) não usa a sessão nem os sockets do pai"""
+    reset_pool()
+    session = get_session()
+    adapter = session.get_adapter('https://ampeli-backend.onrender.com/api')
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=_child, args=(session, adapter, results))
+    child.start()
+    child.join(10)
+
+    # Nova sessão e novo adapter no filho, reutilizados dentro dele
+    assert results.get(timeout=1) == (False, False, True)
+    assert child.exitcode == 0
+    # O processo pai segue com o pool que já tinha
+    assert get_session() is session
+    reset_pool()
+
+
+if __name__ == "__main__":
+    test_session_reused_per_thread_over_shared_adapter()
+    test_reset_pool_discards_sessions()
+    test_fork_gets_a_fresh_pool()
+    print("OK - Testes do pool HTTP passaram!")
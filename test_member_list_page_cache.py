@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Teste do cache do HTML renderizado da lista de membros
+"""
+
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from members.cache import clear_caches
+from members.conditional import member_list_etag
+from members.page_cache import cached_member_list_page, member_list_cache_key, store_member_list_page
+from members.roster import Roster
+
+
+def request_for(params, csrf='segredo'):
+    request = RequestFactory().get('/', params)
+    if csrf:
+        request.META['CSRF_COOKIE'] = csrf
+    return request
+
+
+def test_key_normalizes_params_and_varies_on_user():
+    """Ordem e parâmetros vazios não mudam a chave; usuário e cookie CSRF mudam"""
+    key = member_list_cache_key(request_for({'status': 'active', 'search': ' ana ', 'segment': ''}), 1)
+    assert key == member_list_cache_key(request_for({'search': 'ana', 'status': 'active'}), 1)
+    assert key != member_list_cache_key(request_for({'search': 'ana', 'status': 'active'}), 2)
+    assert key != member_list_cache_key(request_for({'search': 'ana', 'status': 'active'}, csrf='outro'), 1)
+    assert member_list_cache_key(request_for({}, csrf=None), 1) is None
+    assert member_list_cache_key(request_for({}), None) is None
+
+
+def test_page_invalidated_by_data_fingerprint():
+    """A página gravada só vale para os mesmos dados exibidos (mesmo ETag)"""
+    clear_caches()
+    key = member_list_cache_key(request_for({'page': '2'}), 1)
+    first = {'results': [Roster([{'id': 1, 'fullName': 'Ana'}]).row(0)], 'count': 1, 'page': 1}
+    etag = member_list_etag(key, first)
+
+    store_member_list_page(key, etag, HttpResponse(b'<html>lista</html>'))
+    assert cached_member_list_page(key, etag).content == b'<html>lista</html>'
+
+    # Página do backend que expirou e voltou com outro total (escrita de outro worker)
+    refetched = {**first, 'count': 2}
+    assert member_list_etag(key, refetched) != etag
+    assert cached_member_list_page(key, member_list_etag(key, refetched)) is None
+    clear_caches()
+
+
+if __name__ == "__main__":
+    test_key_normalizes_params_and_varies_on_user()
+    test_page_invalidated_by_data_fingerprint()
+    print("OK - Testes do cache da lista de membros passaram!")
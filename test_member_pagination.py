@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Teste da paginação e filtros da lista de membros enviados ao backend
+"""
+
+import os
+import sys
+import django
+from urllib.parse import parse_qs, urlsplit
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from members.cache import clear_caches
+from members.filters import matching_indices
+from members.pagination import (
+    backend_pagination_enabled, decode_cursor, encode_cursor, paginate_members_page, reset_backend_pagination,
+)
+from members.roster import Roster
+from members.services import AmpeliAPIService
+
+
+MEMBERS = [
+    {'id': i, 'fullName': f'Membro {i}', 'email': f'm{i}@teste.com', 'memberStatus': 'active' if i % 2 else 'visitor'}
+    for i in range(1, 46)
+]
+
+
+class PagingBackendService(AmpeliAPIService):
+    """Backend local que responde no formato de página do Spring"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append(endpoint)
+        params = {k: v[0] for k, v in parse_qs(urlsplit(endpoint).query).items()}
+        members = [m for m in MEMBERS if not params.get('status') or m['memberStatus'] == params['status']]
+        page, size = int(params.get('page', 0)), int(params.get('size', len(members)))
+        return {'content': members[page * size:(page + 1) * size], 'totalElements': len(members)}
+
+
+class ListOnlyBackendService(PagingBackendService):
+    """Backend que ignora os parâmetros e devolve sempre a lista completa"""
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append(endpoint)
+        return MEMBERS
+
+
+def test_backend_filters_and_paginates():
+    """Só a página pedida é buscada e o Paginator usa o total do backend"""
+    clear_caches()
+    reset_backend_pagination()
+    service = PagingBackendService()
+
+    members_page = service.get_members_page(status='active', page=2, page_size=10)
+    page_obj = paginate_members_page(members_page)
+
+    assert members_page['backend_paginated']
+    assert [m['id'] for m in page_obj] == list(range(21, 41, 2))
+    assert page_obj.paginator.count == 23 and page_obj.paginator.num_pages == 3
+    assert service.calls == ['/members?page=1&size=10&status=active']
+
+    # Página além do fim vira a última página
+    members_page = service.get_members_page(status='active', page=9, page_size=10)
+    assert members_page['page'] == 3 and len(members_page['results']) == 3
+    clear_caches()
+
+
+def test_falls_back_to_local_filtering():
+    """Backend que ignora os parâmetros é filtrado localmente e não é consultado de novo"""
+    clear_caches()
+    reset_backend_pagination()
+    service = ListOnlyBackendService()
+
+    members_page = service.get_members_page(search='membro 4', page=1, page_size=3)
+
+    assert not members_page['backend_paginated']
+    assert [m['id'] for m in members_page['results']] == [4, 40, 41]
+    assert members_page['count'] == 7
+    assert not backend_pagination_enabled()
+
+    service.calls = []
+    members_page = service.get_members_page(status='visitor', page=2, page_size=5)
+    assert [m['id'] for m in members_page['results']] == [12, 14, 16, 18, 20]
+    assert service.calls == []  # lista completa já em cache, sem nova consulta paginada
+    reset_backend_pagination()
+    clear_caches()
+
+
+class CursorBackendService(PagingBackendService):
+    """Backend com paginação por cursor (o cursor é o id do último membro)"""
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append(endpoint)
+        params = {k: v[0] for k, v in parse_qs(urlsplit(endpoint).query, keep_blank_values=True).items()}
+        after, size = int(params['cursor'] or 0), int(params['size'])
+        page = [m for m in MEMBERS if m['id'] > after][:size]
+        return {'content': page, 'nextCursor': str(page[-1]['id']) if page[-1]['id'] < len(MEMBERS) else None}
+
+
+def walk(service, direction='next_cursor', cursor=None, **filters):
+    pages = []
+    while True:
+        members_page = service.get_members_cursor_page(cursor=cursor, page_size=10, **filters)
+        pages.append([m['id'] for m in members_page['results']])
+        cursor = members_page[direction]
+        if cursor is None:
+            return pages, members_page
+
+
+def test_cursor_pagination_over_roster():
+    """Cursores locais percorrem (nome, id) nos dois sentidos, com filtros e sem total"""
+    clear_caches()
+    reset_backend_pagination()
+    service = ListOnlyBackendService()
+
+    pages, last = walk(service)
+    by_name = [m['id'] for m in sorted(MEMBERS, key=lambda m: (m['fullName'].lower(), m['id']))]
+    assert sum(pages, []) == by_name and len(pages) == 5
+    assert 'count' not in last and not last['backend_paginated']
+    assert not backend_pagination_enabled('cursor') and backend_pagination_enabled('page')
+
+    back, first = walk(service, 'prev_cursor', last['prev_cursor'])
+    assert back == pages[-2::-1] and first['prev_cursor'] is None
+
+    pages, _ = walk(service, status='visitor', segment='visitor')
+    assert sum(pages, []) == [m for m in by_name if m % 2 == 0] and len(pages[-1]) == 2
+
+    # Cursor adulterado recomeça do início
+    assert decode_cursor('nao-e-cursor') is None
+    assert decode_cursor(encode_cursor({'k': 'a', 'n': 'membro 1', 'i': 1}))['i'] == 1
+    reset_backend_pagination()
+    clear_caches()
+
+
+def test_matching_indices_tests_positions():
+    """Filtros viram testes por posição, combinados com a busca e sem conjuntos do tamanho da lista"""
+    roster = Roster(MEMBERS)
+    assert matching_indices(roster) is None
+    for filters in ({'status': 'visitor'}, {'segment': 'active'}, {'status': 'active', 'segment': 'active'},
+                    {'search': 'membro 1'}, {'status': 'visitor', 'search': 'membro 1'},
+                    {'segment': 'visitor', 'search': 'm2'}):
+        allowed = matching_indices(roster, **filters)
+        assert callable(allowed) and not isinstance(allowed, (set, frozenset)), filters
+        expected = {
+            row.index for row in roster
+            if row['memberStatus'] == filters.get('status', row['memberStatus'])
+            and row['memberStatus'] == filters.get('segment', row['memberStatus'])
+            and (not filters.get('search') or row in roster.search(filters['search']))
+        }
+        assert {index for index in roster.indices() if allowed(index)} == expected, filters
+
+    clear_caches()
+    reset_backend_pagination()
+    pages, _ = walk(ListOnlyBackendService(), status='visitor', search='membro 1')
+    assert sorted(sum(pages, [])) == [m['id'] for m in MEMBERS
+                                      if m['memberStatus'] == 'visitor' and m['fullName'].startswith('Membro 1')]
+    reset_backend_pagination()
+    clear_caches()
+
+
+def test_cursor_pagination_on_backend():
+    """Backend com nextCursor recebe o cursor e só a página atual é baixada"""
+    clear_caches()
+    reset_backend_pagination()
+    service = CursorBackendService()
+
+    pages, last = walk(service)
+    assert sum(pages, []) == list(range(1, 46)) and last['backend_paginated']
+    assert service.calls[1] == '/members?size=10&sort=fullName%2Cid&cursor=10'
+    assert backend_pagination_enabled('cursor')
+    clear_caches()
+
+
+if __name__ == "__main__":
+    test_backend_filters_and_paginates()
+    test_falls_back_to_local_filtering()
+    test_cursor_pagination_over_roster()
+    test_matching_indices_tests_positions()
+    test_cursor_pagination_on_backend()
+    print("OK - Testes da paginação de membros passaram!")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Teste do índice de busca de membros (trigramas, acentos e telefone)
+"""
+
+import json
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from unittest import mock
+
+from django.test import RequestFactory, override_settings
+
+from members.cache import clear_caches, get_cache
+from members.filters import filter_members
+from members.roster import Roster
+from members.search import complete_members
+from members.services import AmpeliAPIService
+from members.views import member_typeahead
+
+
+MEMBERS = [
+    {'id': 1, 'fullName': 'Maria da Conceição', 'email': 'maria@teste.com', 'phone': '(11) 98765-4321', 'memberStatus': 'active'},
+    {'id': 2, 'fullName': 'João Conceição', 'email': 'joao@teste.com', 'phone': '11 91234 5678', 'memberStatus': 'visitor'},
+    {'id': 3, 'fullName': 'Conceição Alves', 'email': 'ca@teste.com', 'phone': None, 'memberStatus': 'active'},
+    {'id': 4, 'fullName': 'Pedro Souza', 'email': 'pedro.conceicao@teste.com', 'phone': '', 'memberStatus': 'active'},
+]
+
+
+def ids(members):
+    return [m['id'] for m in members]
+
+
+def test_accent_insensitive_ranked_search():
+    """Busca ignora acentos e caixa e ordena início do nome > palavra > email"""
+    roster = Roster(MEMBERS)
+    assert ids(roster.search('CONCEICAO')) == [3, 2, 1, 4]
+    assert ids(roster.search('joão')) == [2]
+    assert ids(roster.search('jo')) == [2]
+    assert ids(filter_members(roster, status='active', search='conceição')) == [3, 1, 4]
+
+
+def test_phone_search_uses_digits_only():
+    """Telefone casa com a consulta em qualquer formatação"""
+    roster = Roster(MEMBERS)
+    assert ids(roster.search('98765-4321')) == [1]
+    assert ids(roster.search('912345678')) == [2]
+
+
+def test_incremental_updates():
+    """Alterar ou remover um membro atualiza o índice e a versão da lista"""
+    roster = Roster(MEMBERS)
+    roster.search('conceicao')
+    version = roster.version
+
+    roster.upsert({'id': 2, 'fullName': 'João Batista', 'email': 'joao@teste.com'})
+    roster.upsert({'id': 5, 'fullName': 'Ana Conceição', 'email': 'ana@teste.com'})
+    roster.remove_member('3')
+
+    assert roster.version != version
+    assert ids(roster.search('conceicao')) == [5, 1, 4]
+    assert ids(roster.search('batista')) == [2]
+    assert len(roster) == 4
+
+
+def test_prefix_typeahead():
+    """Autocompletar casa prefixos de palavras do nome, um termo por palavra"""
+    roster = Roster(MEMBERS)
+    assert ids(roster.complete('conc')) == [3, 2, 1]
+    assert ids(roster.complete('conc', limit=1)) == [3]
+    assert ids(roster.complete('ma conc')) == [1]
+    assert roster.complete('ceicao') == []
+
+    roster.upsert({'id': 4, 'fullName': 'Pedro Concórdia'})
+    assert ids(roster.complete('concor')) == [4]
+
+
+def test_typeahead_endpoint():
+    """Endpoint JSON responde a partir da lista em cache"""
+    clear_caches()
+    get_cache('members').set('/members', Roster(MEMBERS))
+    request = RequestFactory().get('/api/typeahead/', {'q': 'joa', 'limit': 5})
+    request.session = {'api_user_id': 1}
+
+    response = member_typeahead(request)
+    data = json.loads(response.content)
+    assert data['results'] == [{'id': 2, 'fullName': 'João Conceição', 'email': 'joao@teste.com', 'memberStatus': 'visitor'}]
+    clear_caches()
+
+
+def test_typeahead_without_cache_skips_index():
+    """Sem cache, a lista de cada requisição é percorrida uma vez, sem construir o índice"""
+    members = MEMBERS + [{'id': 5, 'fullName': 'Ana Conceição Maria'}, {'fullName': 'Sem Id Conceição'}]
+    roster = Roster(members)
+    for query, limit in (('conc', 10), ('conc', 2), ('ma conc', 10), ('ceicao', 10), ('', 10), ('jo', 0)):
+        assert ids(complete_members(members, query, limit)) == ids(roster.complete(query, limit)), query
+
+    fresh = Roster(MEMBERS)
+    request = RequestFactory().get('/api/typeahead/', {'q': 'conc'})
+    request.session = {'api_user_id': 1}
+    with override_settings(AMPELI_API_CACHE={'ENABLED': False}), \
+            mock.patch.object(AmpeliAPIService, 'get_all_members', return_value=fresh):
+        data = json.loads(member_typeahead(request).content)
+    assert ids(data['results']) == [3, 2, 1]
+    assert fresh._prefix_index is None
+
+
+if __name__ == "__main__":
+    test_accent_insensitive_ranked_search()
+    test_phone_search_uses_digits_only()
+    test_incremental_updates()
+    test_prefix_typeahead()
+    test_typeahead_endpoint()
+    test_typeahead_without_cache_skips_index()
+    print("OK - Testes do índice de busca passaram!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Teste do motor de segmentos (bitsets) sobre os campos de escolha dos membros
+"""
+
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory
+
+from members.filters import filter_members, iter_filtered_members
+from members.roster import Roster
+from members.segments import SegmentError, parse_segment, select_segment
+from members.views import _member_list_error_context
+
+
+MEMBERS = [
+    {'id': 1, 'fullName': 'Ana', 'memberStatus': 'active', 'maritalStatus': 'married', 'faithStage': 'beginner',
+     'volunteerInterest': True, 'contactPreference': 'whatsapp', 'openToNewGroups': True, 'eventPreference': 'online'},
+    {'id': 2, 'fullName': 'Bruno', 'memberStatus': 'active', 'maritalStatus': 'single', 'faithStage': 'beginner',
+     'volunteerInterest': True, 'contactPreference': 'email', 'openToNewGroups': True, 'eventPreference': 'presential'},
+    {'id': 3, 'fullName': 'Carla', 'memberStatus': 'visitor', 'maritalStatus': 'married', 'faithStage': 'growing',
+     'pastoralSupportInterest': True},
+    {'id': 4, 'fullName': 'Davi', 'memberStatus': 'new', 'maritalStatus': 'married', 'howFoundChurch': 'social_media'},
+]
+
+
+def ids(members):
+    return [m['id'] for m in members]
+
+
+def test_segment_expressions():
+    """Vírgula/&/AND, |/OR, !/NOT e parênteses sobre os bitsets"""
+    roster = Roster(MEMBERS)
+    assert ids(select_segment(roster, 'active, married, faith_stage=beginner, volunteer_interest, contact_preference=WhatsApp')) == [1]
+    assert ids(select_segment(roster, 'open_to_new_groups, event_preference=Online')) == [1]
+    assert ids(select_segment(roster, 'married & (visitor | new)')) == [3, 4]
+    assert ids(select_segment(roster, 'NOT active AND !pastoral_care_interest')) == [4]
+    assert ids(select_segment(roster, 'church_discovery=social_media OR volunteer_interest=false')) == [3, 4]
+    assert ids(select_segment(roster, 'married', status='active')) == [1]
+
+
+def test_segment_follows_roster_changes():
+    """O índice é refeito quando a versão do Roster muda"""
+    roster = Roster(MEMBERS)
+    assert ids(select_segment(roster, 'married')) == [1, 3, 4]
+    roster.upsert({'id': 2, 'fullName': 'Bruno', 'memberStatus': 'active', 'maritalStatus': 'married'})
+    roster.remove_member(3)
+    assert ids(select_segment(roster, 'married')) == [1, 2, 4]
+
+
+def test_segment_with_search_and_errors():
+    """Segmento combina com a busca e expressões inválidas geram SegmentError"""
+    roster = Roster(MEMBERS)
+    assert ids(filter_members(roster, search='a', segment='married')) == [1, 3, 4]
+    assert ids(filter_members(MEMBERS, segment='beginner')) == [1, 2]
+
+    for expression in ('active,', 'cor=azul', '(active', 'desconhecido', 'volunteer_interest=talvez'):
+        try:
+            select_segment(roster, expression)
+        except SegmentError:
+            pass
+        else:
+            raise AssertionError(f'{expression!r} deveria ser inválido')
+    assert parse_segment('active') == ('term', None, 'active')
+
+
+def test_lazy_export_filters_match_filter_members():
+    """iter_filtered_members devolve um iterador com os mesmos membros, na mesma ordem"""
+    roster = Roster(MEMBERS)
+    roster.upsert({'id': 5, 'fullName': 'Eva', 'memberStatus': 'active', 'maritalStatus': 'married'})
+    for status, search, segment in ((None, None, None), ('active', None, None), (None, 'a', None),
+                                    ('active', 'a', None), (None, None, 'married'), ('active', None, 'married'),
+                                    (None, 'a', 'married'), ('visitor', 'a', 'married')):
+        for members in (roster, MEMBERS):
+            lazy = iter_filtered_members(members, status, search, segment)
+            assert iter(lazy) is lazy and not isinstance(lazy, list)
+            expected = ids(filter_members(members, status, search, segment))
+            assert ids(lazy) == expected, (status, search, segment, expected)
+
+    # Segmento inválido falha na chamada, antes de a resposta começar a ser enviada
+    try:
+        iter_filtered_members(roster, segment='cor=azul')
+    except SegmentError:
+        pass
+    else:
+        raise AssertionError('segmento inválido deveria falhar na chamada')
+
+
+def test_segment_fields_missing_from_member_data():
+    """Campos que a lista não traz (ex.: onboardingCompleted) dão segmentos vazios, sem erro"""
+    roster = Roster([{k: v for k, v in m.items() if k not in ('contactPreference', 'volunteerInterest')}
+                     for m in MEMBERS])
+    assert ids(select_segment(roster, 'contact_preference=whatsapp')) == []
+    assert ids(select_segment(roster, 'onboarding_completed')) == []
+    assert ids(select_segment(roster, '!volunteer_interest, active')) == [1, 2]
+
+
+def test_invalid_segment_keeps_filters_in_list_page():
+    """Segmento inválido na lista HTML mostra a mensagem do parser e mantém os filtros"""
+    request = RequestFactory().get('/members/', {'status': 'active', 'search': 'ana', 'segment': 'cor=azul'})
+    request.session = {}
+    request._messages = FallbackStorage(request)
+    try:
+        select_segment(Roster(MEMBERS), 'cor=azul')
+    except SegmentError as e:
+        error = e
+    context = _member_list_error_context(request, error)
+    assert context['status_filter'] == 'active' and context['search_query'] == 'ana'
+    assert context['segment_query'] == 'cor=azul' and context['member_status_choices']
+    assert [str(m) for m in get_messages(request)] == [str(error)]
+
+
+if __name__ == "__main__":
+    test_segment_expressions()
+    test_segment_follows_roster_changes()
+    test_segment_with_search_and_errors()
+    test_lazy_export_filters_match_filter_members()
+    test_segment_fields_missing_from_member_data()
+    test_invalid_segment_keeps_filters_in_list_page()
+    print("OK - Testes de segmentos passaram!")
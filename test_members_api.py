@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Teste da API JSON de membros com projeção de campos
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from unittest import mock
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.test import RequestFactory
+
+from members.cache import clear_caches, get_cache
+from members.http_client import AmpeliAPIError
+from members.pagination import reset_backend_pagination
+from members.roster import Roster
+from members.exports import csv_lines, export_chunks
+from members.services import AmpeliAPIService
+from members.views import member_typeahead, members_api, members_export
+
+
+MEMBERS = [
+    {'id': i, 'fullName': f'Membro {i:02d}', 'email': f'm{i}@teste.com', 'memberStatus': 'active' if i % 2 else 'visitor',
+     'faithDifficulties': 'Texto longo do perfil completo do membro, que o check-in não precisa.'}
+    for i in range(1, 31)
+]
+
+
+def get(params, view=members_api, **headers):
+    request = RequestFactory().get('/api/members/', params, **headers)
+    request.session = {'api_user_id': 1}
+    return view(request)
+
+
+def test_sparse_fieldset_from_cached_roster():
+    """Só os campos de ?fields= são serializados, com filtros e paginação"""
+    clear_caches()
+    reset_backend_pagination()
+    get_cache('members').set('/members', Roster(MEMBERS))
+
+    data = json.loads(get({'fields': 'id,fullName,semCampo', 'segment': 'visitor', 'page_size': 5, 'page': 2}).content)
+    assert data['results'] == [{'id': i, 'fullName': f'Membro {i:02d}'} for i in range(12, 21, 2)]
+    assert data['count'] == 15 and data['page'] == 2 and data['pageSize'] == 5
+
+    data = json.loads(get({'fields': 'id', 'cursor': '', 'segment': 'active', 'page_size': 10}).content)
+    assert [m['id'] for m in data['results']] == list(range(1, 20, 2)) and data['nextCursor']
+    assert 'count' not in data
+
+    response = get({'segment': 'cor=azul'})
+    assert response.status_code == 400 and json.loads(response.content)['error'] == 'INVALID_SEGMENT'
+    clear_caches()
+
+
+def test_gzip_when_accepted():
+    """Resposta comprimida quando o cliente aceita gzip"""
+    clear_caches()
+    get_cache('members').set('/members', Roster(MEMBERS))
+
+    response = get({'segment': 'active'}, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.content))['results']) == 15
+    clear_caches()
+
+
+def test_streaming_export():
+    """CSV e NDJSON gerados em blocos a partir do Roster, com filtros e gzip"""
+    clear_caches()
+    get_cache('members').set('/members', Roster(MEMBERS))
+
+    response = get({'format': 'csv', 'fields': 'id,fullName', 'status': 'visitor'}, view=members_export)
+    assert response.streaming and response['Content-Disposition'] == 'attachment; filename="membros.csv"'
+    rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert rows[0] == ['id', 'fullName'] and rows[1] == ['2', 'Membro 02'] and len(rows) == 16
+
+    response = get({'format': 'ndjson', 'segment': 'active'}, view=members_export, HTTP_ACCEPT_ENCODING='gzip')
+    lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+    assert [json.loads(line) for line in lines] == MEMBERS[::2]
+
+    assert get({'format': 'xlsx'}, view=members_export).status_code == 400
+    chunks = list(export_chunks(Roster(MEMBERS * 40), 'ndjson'))
+    assert len(chunks) > 1 and all(len(chunk) < 2 * 64 * 1024 for chunk in chunks)
+    clear_caches()
+
+
+def test_csv_export_neutralizes_formulas():
+    """Textos que a planilha executaria como fórmula saem prefixados com '"""
+    members = [
+        {'id': 1, 'fullName': '=HYPERLINK("http://evil","x")', 'phone': '+55 11 99999-0000'},
+        {'id': 2, 'fullName': '@SUM(A1)', 'phone': '-1', 'user': {'id': 3}},
+        {'id': 3, 'fullName': '\tTab', 'phone': '\rCR'},
+        {'id': 4, 'fullName': 'Maria = Silva', 'phone': None},
+    ]
+    rows = list(csv.reader(io.StringIO(''.join(csv_lines(members, ['id', 'fullName', 'phone', 'user', '=cmd'])))))
+    assert rows[0] == ['id', 'fullName', 'phone', 'user', "'=cmd"]
+    assert rows[1] == ['1', '\'=HYPERLINK("http://evil","x")', "'+55 11 99999-0000", '', '']
+    assert rows[2] == ['2', "'@SUM(A1)", "'-1", '{"id": 3}', '']
+    assert rows[3][1:3] == ["'\tTab", "'\rCR"]
+    assert rows[4] == ['4', 'Maria = Silva', '', '', '']
+
+
+def test_errors_are_json_without_backend_details():
+    """Sem login a API responde 401 em JSON; falhas do backend viram 502 com mensagem fixa"""
+    for view in (members_api, members_export, member_typeahead):
+        request = RequestFactory().get('/api/members/', {'q': 'membro'})
+        request.session = {}
+        response = view(request)
+        assert response.status_code == 401 and response['Content-Type'] == 'application/json'
+        assert json.loads(response.content)['error'] == 'NOT_AUTHENTICATED'
+
+    detail = 'Erro na requisição para https://ampeli-backend.onrender.com/api/members?page=0: 500 Server Error'
+    with mock.patch.object(AmpeliAPIService, 'get_members_page', side_effect=AmpeliAPIError(detail)):
+        response = get({})
+    assert response.status_code == 502
+    data = json.loads(response.content)
+    assert data['error'] == 'UNEXPECTED_ERROR' and 'onrender' not in data['message'] and 'Erro' not in data['message']
+
+
+if __name__ == "__main__":
+    test_sparse_fieldset_from_cached_roster()
+    test_gzip_when_accepted()
+    test_streaming_export()
+    test_csv_export_neutralizes_formulas()
+    test_errors_are_json_without_backend_details()
+    print("OK - Testes da API de membros passaram!")
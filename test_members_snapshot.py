@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""
+Teste do snapshot em disco da lista de membros (partida a frio e backend fora do ar)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from members.async_services import AsyncAmpeliAPIService
+from members.cache import clear_caches
+from members.http_client import AmpeliAPIError
+from members.pagination import reset_backend_pagination
+from members.services import AmpeliAPIService
+from members.snapshot import load_snapshot, reset_snapshot, snapshot_options
+
+
+MEMBERS = [{'id': i, 'fullName': f'Membro {i}', 'memberStatus': 'active'} for i in range(1, 11)]
+
+
+class BackendService(AmpeliAPIService):
+    """Backend local que pode ser desligado"""
+
+    online = True
+
+    def _make_request(self, method, endpoint, data=None):
+        if not self.online:
+            raise AmpeliAPIError('Backend fora do ar', status_code=503)
+        if endpoint == '/members':
+            return MEMBERS
+        return {**MEMBERS[int(endpoint.rsplit('/', 1)[-1]) - 1], 'phone': '11 99999-0000'}
+
+
+def snapshot_settings(path):
+    return override_settings(AMPELI_API_SNAPSHOT={'ENABLED': True, 'PATH': path, 'MIN_INTERVAL': 0, 'MAX_MEMBERS': 10})
+
+
+def wait_for_snapshot_thread():
+    for thread in threading.enumerate():
+        if thread.name == 'ampeli-snapshot':
+            thread.join(5)
+
+
+def test_snapshot_served_when_backend_fails_and_on_cold_start():
+    path = os.path.join(tempfile.mkdtemp(), 'snapshot.json.gz')
+    with snapshot_settings(path):
+        clear_caches()
+        reset_snapshot()
+        service = BackendService()
+        service.get_member_by_id(3)
+        assert len(service.get_all_members()) == 10 and service.data_as_of is None
+        wait_for_snapshot_thread()
+        assert os.path.getsize(path) > 0
+
+        # Novo processo com o backend fora do ar: lista e detalhes vêm do snapshot
+        clear_caches()
+        reset_snapshot()
+        offline = BackendService()
+        offline.online = False
+        members = offline.get_all_members()
+        assert members.to_list() == MEMBERS and offline.data_as_of == load_snapshot().saved_at
+        assert offline.get_member_by_id(3)['phone'] == '11 99999-0000'
+        assert offline.get_member_by_id(5) == MEMBERS[4]
+
+        # Partida a frio com o backend no ar: o snapshot é servido na hora e atualizado
+        clear_caches()
+        reset_snapshot()
+        cold = BackendService()
+        assert cold.get_all_members().as_of is not None
+        time.sleep(0.2)
+        assert BackendService().get_all_members().as_of is None
+        clear_caches()
+        reset_snapshot()
+
+
+class SleepingBackendService(BackendService):
+    """Backend paginado que demora a responder, como o Render acordando"""
+
+    delay = 0.5
+    calls = []
+
+    def _make_request(self, method, endpoint, data=None):
+        self.calls.append(endpoint)
+        time.sleep(self.delay)
+        return paginated_response(self, method, endpoint, data)
+
+
+def paginated_response(service, method, endpoint, data):
+    if endpoint.startswith('/members?'):
+        params = dict(param.split('=', 1) for param in endpoint.split('?', 1)[1].split('&'))
+        size = int(params['size'])
+        start = int(params.get('page', 0)) * size
+        return {'content': MEMBERS[start:start + size], 'totalElements': len(MEMBERS)}
+    return BackendService._make_request(service, method, endpoint, data)
+
+
+def wait_for_refresh_threads():
+    for thread in threading.enumerate():
+        if thread.name.startswith('ampeli-refresh'):
+            thread.join(5)
+
+
+def test_cold_members_page_served_from_snapshot():
+    """Com paginação do backend e cache vazio, a página vem do snapshot sem esperar o backend"""
+    path = os.path.join(tempfile.mkdtemp(), 'snapshot.json.gz')
+    pagination = {'ENABLED': True, 'PAGE_SIZE': 4, 'RECHECK': 300, 'MODE': 'page'}
+    with snapshot_settings(path), override_settings(AMPELI_API_BACKEND_PAGINATION=pagination):
+        clear_caches()
+        reset_snapshot()
+        reset_backend_pagination()
+        BackendService().get_all_members()
+        wait_for_snapshot_thread()
+
+        # Novo processo após o deploy
+        clear_caches()
+        reset_snapshot()
+        SleepingBackendService.calls = []
+        service = SleepingBackendService()
+        started = time.monotonic()
+        page = service.get_members_page(page=2)
+        assert time.monotonic() - started < SleepingBackendService.delay
+        assert page['results'] == MEMBERS[4:8] and page['count'] == 10
+        assert service.data_as_of == load_snapshot().saved_at
+
+        cursor_page = service.get_members_cursor_page()
+        assert len(cursor_page['results']) == 4 and cursor_page['next_cursor']
+        assert time.monotonic() - started < SleepingBackendService.delay
+
+        # A página e a lista completa são buscadas em segundo plano; depois o backend pagina
+        wait_for_refresh_threads()
+        assert '/members?page=1&size=4' in SleepingBackendService.calls
+        assert '/members' in SleepingBackendService.calls
+        SleepingBackendService.delay = 0
+        try:
+            fresh = SleepingBackendService()
+            page = fresh.get_members_page(page=2)
+            assert page['backend_paginated'] and page['results'] == MEMBERS[4:8]
+            assert fresh.data_as_of is None
+        finally:
+            SleepingBackendService.delay = 0.5
+        clear_caches()
+        reset_snapshot()
+
+
+class AsyncSleepingBackendService(AsyncAmpeliAPIService):
+    online = True
+
+    async def _make_request(self, method, endpoint, data=None):
+        SleepingBackendService.calls.append(endpoint)
+        await asyncio.sleep(SleepingBackendService.delay)
+        return paginated_response(self, method, endpoint, data)
+
+
+def test_async_cold_members_page_served_from_snapshot():
+    path = os.path.join(tempfile.mkdtemp(), 'snapshot.json.gz')
+    pagination = {'ENABLED': True, 'PAGE_SIZE': 4, 'RECHECK': 300, 'MODE': 'page'}
+    with snapshot_settings(path), override_settings(AMPELI_API_BACKEND_PAGINATION=pagination):
+        clear_caches()
+        reset_snapshot()
+        reset_backend_pagination()
+        BackendService().get_all_members()
+        wait_for_snapshot_thread()
+        clear_caches()
+        reset_snapshot()
+
+        async def run():
+            service = AsyncSleepingBackendService()
+            started = time.monotonic()
+            page = await service.get_members_page(page=3)
+            assert time.monotonic() - started < SleepingBackendService.delay
+            assert page['results'] == MEMBERS[8:] and service.data_as_of is not None
+            # Atualizações em segundo plano já agendadas no event loop
+            await asyncio.sleep(SleepingBackendService.delay + 0.1)
+            assert '/members?page=2&size=4' in SleepingBackendService.calls
+
+        SleepingBackendService.calls = []
+        asyncio.run(run())
+        clear_caches()
+        reset_snapshot()
+
+
+def test_snapshot_path_is_private():
+    """Padrão em .cache/ do projeto (não no /tmp); arquivo de outro usuário é ignorado"""
+    with override_settings(AMPELI_API_SNAPSHOT={'ENABLED': True, 'PATH': ''}):
+        assert snapshot_options()['PATH'] == os.path.join(settings.BASE_DIR, '.cache', 'ampeli-members-snapshot.json.gz')
+
+    path = os.path.join(tempfile.mkdtemp(), 'snapshot.json.gz')
+    with snapshot_settings(path):
+        clear_caches()
+        reset_snapshot()
+        BackendService().get_all_members()
+        wait_for_snapshot_thread()
+        reset_snapshot()
+        assert load_snapshot() is not None
+        reset_snapshot()
+        with mock.patch('members.snapshot.os.getuid', return_value=os.getuid() + 1):
+            assert load_snapshot() is None
+        clear_caches()
+        reset_snapshot()
+
+
+if __name__ == "__main__":
+    test_snapshot_served_when_backend_fails_and_on_cold_start()
+    test_cold_members_page_served_from_snapshot()
+    test_async_cold_members_page_served_from_snapshot()
+    test_snapshot_path_is_private()
+    print("OK - Testes do snapshot de membros passaram!")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Teste das métricas do Prometheus (histogramas do backend e das views, rota /metrics)
+"""
+
+import asyncio
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+import requests
+from django.test import Client
+from django.test.utils import override_settings
+
+from members.http_client import AmpeliAPIError
+from members.metrics import (
+    BACKEND_ERRORS, BACKEND_LATENCY, BACKEND_RESPONSE_BYTES, BackendCall, endpoint_template, render_metrics,
+    reset_metrics,
+)
+from members.async_services import AsyncSingleFlight
+from members.resilience import CircuitOpenError, backend_flights, get_breaker, retry_budget
+
+
+def test_backend_call_histograms():
+    """Séries por modelo de endpoint, com status, bytes e classe do erro de origem"""
+    reset_metrics()
+    assert endpoint_template('/members/42?fields=id') == '/members/{id}'
+    assert endpoint_template('/users/email/ana@example.com') == '/users/email/{email}'
+
+    with BackendCall('GET', '/members/42') as call:
+        call.received(200, 2048)
+    with BackendCall('GET', '/members/7') as call:
+        call.received(200, 100)
+    try:
+        with BackendCall('GET', '/members/7'):
+            try:
+                raise requests.exceptions.ReadTimeout('lento')
+            except requests.exceptions.Timeout as e:
+                raise AmpeliAPIError(f'Tempo esgotado: {e}', retryable=True)
+    except AmpeliAPIError:
+        pass
+
+    assert BACKEND_LATENCY.count(('GET', '/members/{id}', '200')) == 2
+    assert BACKEND_LATENCY.count(('GET', '/members/{id}', 'none')) == 1
+    assert BACKEND_RESPONSE_BYTES.count(('GET', '/members/{id}')) == 2
+    assert BACKEND_ERRORS.value(('GET', '/members/{id}', 'ReadTimeout')) == 1
+
+
+def test_metrics_route_requires_authentication():
+    """/metrics aceita o token do coletor e responde 401 sem ele"""
+    client = Client()
+    with override_settings(AMPELI_METRICS={'TOKEN': 'segredo'}):
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer errado').status_code == 401
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+    assert response.status_code == 200 and response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    assert '# TYPE ampeli_backend_request_duration_seconds histogram' in body
+    assert 'ampeli_http_request_duration_seconds_count{view="metrics",method="GET",status="401"' in body
+    assert 'le="+Inf"' in body
+
+
+def test_circuit_breaker_state_exported():
+    """Estado de cada circuit breaker e contadores de abertura e recusas em /metrics"""
+    breaker = get_breaker('metrics-test')
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        pass
+    body = render_metrics()
+    assert 'ampeli_backend_circuit_state{group="metrics-test",' in body
+    lines = {line.split('{', 1)[0] + ' ' + line.rsplit(' ', 1)[1]
+             for line in body.splitlines() if 'group="metrics-test"' in line}
+    assert lines == {'ampeli_backend_circuit_state 2', 'ampeli_backend_circuit_opened_total 1',
+                     'ampeli_backend_circuit_short_circuited_total 1'}
+
+
+def _sample(body, prefix):
+    return float(next(line for line in body.splitlines() if line.startswith(prefix)).rsplit(' ', 1)[1])
+
+
+def test_single_flight_and_retry_budget_exported():
+    """Contadores do single-flight (síncrono e assíncrono) e do orçamento de retries em /metrics"""
+    before = render_metrics()
+    backend_flights.do('metrics-test', lambda: 1)
+
+    async def coalesced():
+        async def fetch():
+            await asyncio.sleep(0.01)
+        flights = AsyncSingleFlight()
+        await asyncio.gather(flights.do('metrics-test', fetch), flights.do('metrics-test', fetch))
+
+    asyncio.run(coalesced())
+    retry_budget.try_withdraw()
+    after = render_metrics()
+
+    for prefix, delta in (
+        ('ampeli_backend_singleflight_issued_total{mode="sync"', 1),
+        ('ampeli_backend_singleflight_issued_total{mode="async"', 1),
+        ('ampeli_backend_singleflight_coalesced_total{mode="async"', 1),
+    ):
+        assert _sample(after, prefix) - _sample(before, prefix) == delta, prefix
+    assert _sample(after, 'ampeli_backend_singleflight_in_flight{mode="sync"') == 0
+    spent = (_sample(after, 'ampeli_backend_retries_total{') - _sample(before, 'ampeli_backend_retries_total{')
+             + _sample(after, 'ampeli_backend_retry_budget_exhausted_total{')
+             - _sample(before, 'ampeli_backend_retry_budget_exhausted_total{'))
+    assert spent == 1
+    assert '# TYPE ampeli_backend_retry_budget_tokens gauge' in after
+
+
+if __name__ == "__main__":
+    test_backend_call_histograms()
+    test_metrics_route_requires_authentication()
+    test_circuit_breaker_state_exported()
+    test_single_flight_and_retry_budget_exported()
+    print("OK - Testes das métricas passaram!")
@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+"""
+Teste das peças de resiliência das chamadas ao backend
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest import mock
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.test import override_settings
+
+from members.async_services import AsyncAmpeliAPIService, AsyncSingleFlight
+from members.http_client import DEFAULT_TIMEOUTS, AmpeliAPIError, get_timeouts, reset_deadline, set_deadline
+from members.resilience import (
+    RETRYABLE_STATUS_CODES, CircuitBreaker, CircuitOpenError, RetryBudget, SingleFlight,
+    backoff_delay, retry_delay, retry_options,
+)
+from members.services import AmpeliAPIService
+
+
+def test_single_flight_shares_result_and_errors():
+    """Chamadas simultâneas com a mesma chave fazem uma só chamada e recebem o mesmo resultado ou erro"""
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'id': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('/members/1', fetch))) for _ in range(5)]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert len(calls) == 1 and len(results) == 5
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {'issued': 1, 'coalesced': 4, 'in_flight': 0}
+
+    def fail():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        raise ValueError('backend fora do ar')
+
+    started.clear()
+    errors = []
+
+    def call_failing():
+        try:
+            flights.do('/members/2', fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call_failing) for _ in range(3)]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert len(calls) == 2 and len(errors) == 3 and all(error is errors[0] for error in errors)
+
+    # Terminada a chamada, a próxima com a mesma chave vai ao backend de novo
+    flights.do('/members/1', fetch)
+    assert len(calls) == 3 and flights.stats()['issued'] == 3
+
+
+def test_async_single_flight_shares_result_and_errors():
+    """Versão asyncio: uma tarefa por chave, resultado e exceção compartilhados"""
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'id': 1}
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError('backend fora do ar')
+
+    async def run():
+        results = await asyncio.gather(*(flights.do('/members/1', fetch) for _ in range(5)))
+        errors = await asyncio.gather(*(flights.do('/members/2', fail) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results)
+    assert all(isinstance(error, ValueError) and error is errors[0] for error in errors)
+    assert flights.stats() == {'issued': 2, 'coalesced': 6, 'in_flight': 0}
+
+
+def _short_circuited(breaker):
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        return True
+    return False
+
+
+def test_circuit_breaker_opens_at_threshold_and_fails_fast():
+    """Fechado até failure_threshold falhas seguidas; aberto, recusa na hora sem sonda"""
+    breaker = CircuitBreaker('teste', failure_threshold=3, reset_timeout=0.1)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # Um sucesso zera a sequência de falhas
+    breaker.before_call()
+    breaker.record_success()
+    for _ in range(3):
+        assert not _short_circuited(breaker)
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert _short_circuited(breaker) and _short_circuited(breaker)
+    assert breaker.snapshot() == {'state': 'open', 'failures': 3, 'short_circuited': 2, 'times_opened': 1}
+
+
+def test_circuit_breaker_half_open_single_probe():
+    """Após reset_timeout só uma sonda passa; sucesso fecha, falha reabre"""
+    breaker = CircuitBreaker('teste', failure_threshold=1, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert not _short_circuited(breaker)  # a sonda
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert _short_circuited(breaker)  # outras chamadas esperam o resultado da sonda
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+    assert _short_circuited(breaker)
+
+    time.sleep(0.06)
+    assert not _short_circuited(breaker)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not _short_circuited(breaker) and not _short_circuited(breaker)
+
+    # Sonda cancelada (abandon) libera a vaga para a próxima sem contar falha
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.abandon()
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not _short_circuited(breaker)
+
+
+# Retries rápidos nos testes: atrasos de milissegundos e orçamento folgado
+FAST_RETRY = {'max_attempts': 3, 'base_delay': 0.001, 'max_delay': 0.002, 'max_retry_after': 1.0,
+              'budget_ratio': 1.0, 'budget_min_per_second': 100.0, 'budget_max_tokens': 100}
+
+
+def _http_error(status_code, retry_after=None):
+    return AmpeliAPIError(f"HTTP {status_code}", status_code=status_code,
+                          retryable=status_code in RETRYABLE_STATUS_CODES, retry_after=retry_after)
+
+
+class ScriptedService(AmpeliAPIService):
+    """Serviço cujo _send devolve, em ordem, as respostas ou erros do roteiro"""
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def _send(self, method, endpoint, url, data=None, headers=None):
+        self.calls.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class AsyncScriptedService(AsyncAmpeliAPIService):
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def _send(self, method, endpoint, url, data=None, headers=None):
+        self.calls.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _raises(fn, *args):
+    try:
+        fn(*args)
+    except AmpeliAPIError as e:
+        return e
+    raise AssertionError("AmpeliAPIError esperado")
+
+
+def test_backoff_delay_grows_and_is_capped():
+    """O teto do jitter dobra a cada tentativa até max_delay"""
+    options = {**FAST_RETRY, 'base_delay': 0.25, 'max_delay': 1.0}
+    for attempt, ceiling in ((1, 0.25), (2, 0.5), (3, 1.0), (6, 1.0)):
+        delays = [backoff_delay(attempt, options) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays), (attempt, max(delays))
+    assert max(backoff_delay(6, options) for _ in range(200)) > 0.5
+
+
+@override_settings(AMPELI_API_RETRY=FAST_RETRY)
+def test_retries_only_retryable_statuses():
+    """429/502/503/504 são repetidos até max_attempts; 4xx, 500 e POSTs falham na primeira tentativa"""
+    service = ScriptedService([_http_error(503), _http_error(429), {'ok': True}])
+    assert service._make_request('GET', '/members/1') == {'ok': True}
+    assert len(service.calls) == 3
+
+    service = ScriptedService([_http_error(502)] * 3)
+    assert _raises(service._make_request, 'GET', '/members/1').status_code == 502
+    assert len(service.calls) == retry_options()['max_attempts']
+
+    for status_code in (400, 404, 500):
+        service = ScriptedService([_http_error(status_code), {'ok': True}])
+        assert _raises(service._make_request, 'GET', '/members/1').status_code == status_code
+        assert len(service.calls) == 1
+
+    # POST não é idempotente: nunca repetido, mesmo com erro transitório
+    service = ScriptedService([_http_error(503), {'id': 1}])
+    assert _raises(service._make_request, 'POST', '/members', {'name': 'Ana'}).status_code == 503
+    assert service.calls == ['POST']
+
+
+@override_settings(AMPELI_API_RETRY=FAST_RETRY)
+def test_retry_after_is_honoured():
+    """Retry-After vira o atraso mínimo; acima de max_retry_after o erro sobe sem retry"""
+    sleeps = []
+    with mock.patch('members.services.time.sleep', sleeps.append):
+        service = ScriptedService([_http_error(429, retry_after=0.5), {'ok': True}])
+        assert service._make_request('GET', '/members/1') == {'ok': True}
+        assert sleeps == [0.5]
+
+        service = ScriptedService([_http_error(503, retry_after=30), {'ok': True}])
+        assert _raises(service._make_request, 'GET', '/members/1').retry_after == 30
+        assert len(service.calls) == 1 and sleeps == [0.5]
+
+
+@override_settings(AMPELI_API_RETRY={**FAST_RETRY, 'max_retry_after': 10.0})
+def test_retry_stops_at_deadline():
+    """Não esperar um retry que terminaria depois do deadline da requisição"""
+    sleeps = []
+    token = set_deadline(0.2)
+    try:
+        with mock.patch('members.services.time.sleep', sleeps.append):
+            service = ScriptedService([_http_error(503, retry_after=1.0), {'ok': True}])
+            _raises(service._make_request, 'GET', '/members/1')
+            assert len(service.calls) == 1 and sleeps == []
+
+            # Dentro do orçamento o retry acontece normalmente
+            service = ScriptedService([_http_error(503, retry_after=0.05), {'ok': True}])
+            assert service._make_request('GET', '/members/1') == {'ok': True}
+            assert sleeps == [0.05]
+    finally:
+        reset_deadline(token)
+
+
+@override_settings(AMPELI_API_RETRY={**FAST_RETRY, 'budget_ratio': 0.0, 'budget_min_per_second': 0.0,
+                                     'budget_max_tokens': 1})
+def test_retry_budget_exhaustion():
+    """Com o orçamento esgotado o erro sobe sem retry e a recusa é contada"""
+    budget = RetryBudget()
+    with mock.patch('members.services.retry_budget', budget), mock.patch('members.resilience.retry_budget', budget):
+        service = ScriptedService([_http_error(503), {'ok': True}])
+        assert service._make_request('GET', '/members/1') == {'ok': True}
+        assert budget.retries == 1
+
+        service = ScriptedService([_http_error(503), {'ok': True}])
+        assert _raises(service._make_request, 'GET', '/members/1').status_code == 503
+        assert len(service.calls) == 1
+        assert budget.retries == 1 and budget.exhausted == 1
+
+
+@override_settings(AMPELI_API_RETRY=FAST_RETRY)
+def test_async_retries_follow_the_same_rules():
+    """O serviço assíncrono repete 503 em GET, mas não 404 nem POST"""
+    async def scenario():
+        service = AsyncScriptedService([_http_error(503), {'ok': True}])
+        assert await service._make_request('GET', '/members/1') == {'ok': True}
+        assert len(service.calls) == 2
+
+        for method, status_code in (('GET', 404), ('POST', 503)):
+            service = AsyncScriptedService([_http_error(status_code), {'ok': True}])
+            try:
+                await service._make_request(method, '/members', {})
+            except AmpeliAPIError as e:
+                assert e.status_code == status_code
+            else:
+                raise AssertionError("AmpeliAPIError esperado")
+            assert len(service.calls) == 1
+
+    asyncio.run(scenario())
+
+
+@override_settings(AMPELI_API_RETRY=FAST_RETRY)
+def test_retry_delay_decisions():
+    """A decisão de retry compartilhada pelos dois serviços: espera, ou None para desistir"""
+    options = retry_options()
+    retryable = AmpeliAPIError('503', status_code=503, retryable=True)
+    assert 0 <= retry_delay('GET', '/members', retryable, 1, options) <= options['max_delay']
+    assert retry_delay('POST', '/members', retryable, 1, options) is None
+    assert retry_delay('GET', '/members', AmpeliAPIError('404', status_code=404), 1, options) is None
+    assert retry_delay('GET', '/members', retryable, options['max_attempts'], options) is None
+
+    throttled = AmpeliAPIError('429', status_code=429, retryable=True, retry_after=0.5)
+    assert retry_delay('GET', '/members', throttled, 1, options) == 0.5
+    throttled.retry_after = options['max_retry_after'] + 1
+    assert retry_delay('GET', '/members', throttled, 1, options) is None
+
+
+def test_timeouts_override_only_configured_groups():
+    """AMPELI_API_TIMEOUTS ajusta só as classes listadas; as demais usam DEFAULT_TIMEOUTS"""
+    assert get_timeouts('members') == DEFAULT_TIMEOUTS['members']
+    assert get_timeouts('desconhecido') == DEFAULT_TIMEOUTS['default']
+    with override_settings(AMPELI_API_TIMEOUTS={'recommendations': (1, 45)}):
+        assert get_timeouts('recommendations') == (1, 45)
+        assert get_timeouts('auth') == DEFAULT_TIMEOUTS['auth']
+
+
+if __name__ == "__main__":
+    test_single_flight_shares_result_and_errors()
+    test_async_single_flight_shares_result_and_errors()
+    test_circuit_breaker_opens_at_threshold_and_fails_fast()
+    test_circuit_breaker_half_open_single_probe()
+    test_backoff_delay_grows_and_is_capped()
+    test_retries_only_retryable_statuses()
+    test_retry_after_is_honoured()
+    test_retry_stops_at_deadline()
+    test_retry_budget_exhaustion()
+    test_async_retries_follow_the_same_rules()
+    test_retry_delay_decisions()
+    test_timeouts_override_only_configured_groups()
+    print("OK - Testes de resiliência passaram!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Teste do Roster em colunas usado como cache da lista de membros
+"""
+
+import os
+import pickle
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from members.roster import ChoiceColumn, MemberRow, Roster, StringColumn
+
+
+DIFFICULTIES = 'Tenho dificuldade em manter a disciplina de oração diária e a leitura da bíblia.'
+
+MEMBERS = [
+    {'id': i, 'user': {'id': 100 + i}, 'fullName': f'Membro {i}', 'email': f'm{i}@teste.com',
+     'memberStatus': 'active' if i % 3 else 'visitor', 'openToNewGroups': i % 2 == 0,
+     'faithDifficulties': DIFFICULTIES if i % 2 else None}
+    for i in range(1, 41)
+]
+
+
+def test_rows_round_trip():
+    """Linhas do Roster se comportam como os dicts originais da API"""
+    roster = Roster(MEMBERS + [{'id': 99, 'fullName': 'Sem email'}])
+    assert len(roster) == 41
+    assert all(isinstance(row, MemberRow) for row in roster[:3])
+    assert [dict(row) for row in roster][:40] == MEMBERS
+    assert roster[-1].to_dict() == {'id': 99, 'fullName': 'Sem email'}
+    assert roster[-1].get('email', 'n/a') == 'n/a'
+    assert 'email' not in roster[-1]
+    assert pickle.loads(pickle.dumps(roster)).to_list() == roster.to_list()
+
+
+def test_compact_columns():
+    """Campos de escolha viram códigos e textos longos ficam comprimidos"""
+    roster = Roster(MEMBERS)
+    status = roster._columns['memberStatus']
+    assert isinstance(status, ChoiceColumn) and status.choices == ['active', 'visitor']
+    assert isinstance(roster._columns['openToNewGroups'], ChoiceColumn)
+    difficulties = roster._columns['faithDifficulties']
+    assert isinstance(difficulties, StringColumn)
+    assert len(difficulties._data) < len(DIFFICULTIES.encode()) * 20
+    assert [row['id'] for row in roster.where('memberStatus', 'visitor')] == list(range(3, 41, 3))
+
+
+def test_upsert_overrides_columns():
+    """Alterações ficam sobrepostas às colunas, inclusive nos filtros por código"""
+    roster = Roster(MEMBERS)
+    roster.upsert({'id': 1, 'fullName': 'Membro Um', 'memberStatus': 'visitor'})
+    roster.upsert({'id': 41, 'fullName': 'Membro Novo', 'memberStatus': 'visitor'})
+    roster.remove_member(3)
+
+    assert roster[0].to_dict() == {'id': 1, 'fullName': 'Membro Um', 'memberStatus': 'visitor'}
+    assert [row['id'] for row in roster.where('memberStatus', 'visitor')][:3] == [1, 6, 9]
+    assert roster[-1]['id'] == 41 and len(roster) == 40
+
+
+if __name__ == "__main__":
+    test_rows_round_trip()
+    test_compact_columns()
+    test_upsert_overrides_columns()
+    print("OK - Testes do Roster passaram!")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Teste do cabeçalho Server-Timing (sessão, backend, renderização e controle por sessão)
+"""
+
+import os
+import sys
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from members.metrics import BackendCall
+from members.middleware import ServerTimingMiddleware
+
+
+def slow_page(request):
+    """View que chama o backend duas vezes e renderiza um template"""
+    for member_id in (1, 2):
+        with BackendCall('GET', f'/members/{member_id}') as call:
+            call.received(200, 512)
+    return HttpResponse(engines['django'].from_string('{{ nome }}').render({'nome': 'Ana'}))
+
+
+def get_page(email):
+    request = RequestFactory().get('/membros/1/')
+    request.session = {'api_user_id': 1, 'user_email': email}
+    return ServerTimingMiddleware(slow_page)(request)
+
+
+def test_admin_session_gets_breakdown():
+    with override_settings(AMPELI_SERVER_TIMING={'ADMIN_EMAILS': ['admin@igreja.org']}):
+        header = get_page('admin@igreja.org')['Server-Timing']
+    names = [entry.split(';', 1)[0] for entry in header.split(', ')]
+    assert names == ['total', 'session', 'backend', 'backend', 'render']
+    assert 'desc="GET /members/{id} 200"' in header
+
+
+def test_non_admin_toggle():
+    with override_settings(AMPELI_SERVER_TIMING={'ADMIN_EMAILS': ['admin@igreja.org']}):
+        assert not get_page('membro@igreja.org').has_header('Server-Timing')
+    with override_settings(AMPELI_SERVER_TIMING={'NON_ADMIN': True, 'MAX_ENTRIES': 3}):
+        header = get_page('membro@igreja.org')['Server-Timing']
+    assert header.startswith('total;dur=') and header.endswith('desc="2 omitidas"')
+
+
+if __name__ == "__main__":
+    test_admin_session_gets_breakdown()
+    test_non_admin_toggle()
+    print("OK - Testes do Server-Timing passaram!")
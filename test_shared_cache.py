@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""
+Teste do cache compartilhado entre workers (arquivo SQLite)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import django
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ampeli.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ampeli'))
+django.setup()
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+
+from members import cache as cache_module
+from members.cache import MISSING
+from members.roster import Roster
+from members.async_services import AsyncAmpeliAPIService
+from members.services import AmpeliAPIService
+from members.shared_cache import SharedFileCache
+
+
+MEMBERS = [{'id': i, 'fullName': f'Membro {i}', 'memberStatus': 'active'} for i in range(1, 21)]
+
+
+def shared_settings(path):
+    return override_settings(AMPELI_API_CACHE={
+        **settings.AMPELI_API_CACHE, 'BACKEND': 'members.shared_cache.SharedFileCache', 'SHARED_PATH': path,
+    })
+
+
+def test_values_and_generation_shared_between_instances():
+    """Duas instâncias (como dois workers) veem os mesmos valores, versões e reservas"""
+    path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+    with shared_settings(path):
+        first, second = SharedFileCache('members', 60, 4), SharedFileCache('members', 60, 4)
+
+        first.set('/members', Roster(MEMBERS))
+        roster = second.get('/members')
+        assert roster.to_list() == MEMBERS
+        assert second.get('/members') is roster  # mesma versão: sem decodificar de novo
+
+        generation = second.generation
+        first.update('/members', lambda r: (r.upsert({'id': 21, 'fullName': 'Nova'}), r)[1])
+        assert second.generation == generation + 1 and len(second.get('/members')) == 21
+
+        assert first.try_begin_refresh('/members') and not second.try_begin_refresh('/members')
+        first.end_refresh('/members')
+        assert second.try_begin_refresh('/members')
+        second.end_refresh('/members')
+
+        second.clear()
+        assert first.get('/members') is MISSING
+
+
+def test_cache_file_is_private():
+    """Banco criado com 0600; diretório gravável por outros (como o /tmp) é recusado"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'cache.sqlite3')
+    with shared_settings(path):
+        SharedFileCache('members', 60, 4).set('/members', MEMBERS)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    os.chmod(directory, 0o777)
+    with shared_settings(path):
+        try:
+            SharedFileCache('members', 60, 4)
+        except ImproperlyConfigured:
+            pass
+        else:
+            raise AssertionError('diretório gravável por outros usuários foi aceito')
+
+
+class SlowService(AmpeliAPIService):
+    def __init__(self, log_path):
+        super().__init__()
+        self.log_path = log_path
+
+    def _make_request(self, method, endpoint, data=None):
+        with open(self.log_path, 'a') as log:
+            log.write(f'{os.getpid()}\n')
+        time.sleep(0.3)
+        return MEMBERS
+
+
+def _worker(path, log_path, results):
+    cache_module._caches.clear()
+    with shared_settings(path):
+        results.put(len(SlowService(log_path).get_all_members()))
+
+
+def test_single_fetch_across_processes():
+    """Com vários processos e cache frio, só um busca a lista no backend"""
+    directory = tempfile.mkdtemp()
+    path, log_path = os.path.join(directory, 'cache.sqlite3'), os.path.join(directory, 'fetches.log')
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(path, log_path, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    assert [results.get(timeout=1) for _ in workers] == [20, 20, 20]
+    with open(log_path) as log:
+        assert len(log.readlines()) == 1
+
+
+class CountingService(AmpeliAPIService):
+    fetches = 0
+
+    def _make_request(self, method, endpoint, data=None):
+        self.fetches += 1
+        return MEMBERS
+
+
+def test_owner_commit_between_poll_and_reservation():
+    """Gravação do outro worker logo após a última leitura não leva a uma segunda busca"""
+    path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+    with shared_settings(path):
+        cache_module._caches.clear()
+        waiter, owner = cache_module.get_cache('members'), SharedFileCache('members', 60, 4)
+        assert owner.try_begin_refresh('/members')
+        reads = []
+        real_get_entry = waiter.get_entry
+
+        def get_entry(key):
+            reads.append(key)
+            if len(reads) <= 2:
+                if len(reads) == 2:
+                    # O dono grava e libera a reserva logo depois desta leitura
+                    owner.set('/members', MEMBERS)
+                    owner.end_refresh('/members')
+                return None
+            return real_get_entry(key)
+
+        waiter.get_entry = get_entry
+        service = CountingService()
+        assert service._cached_get('members', '/members') == MEMBERS
+        assert service.fetches == 0
+        cache_module._caches.clear()
+
+
+def test_refresh_leases_leave_no_files_and_expire():
+    """Reservas de muitas chaves não criam arquivos; a de um processo que morreu vence"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'cache.sqlite3')
+    with shared_settings(path):
+        first, second = SharedFileCache('member_email', 60, 4), SharedFileCache('member_email', 60, 4)
+        for i in range(50):
+            key = f'/members/email/membro{i}@exemplo.com'
+            assert first.try_begin_refresh(key) and not second.try_begin_refresh(key)
+            first.set(key, {'id': i})
+            first.end_refresh(key)
+        files = set(os.listdir(directory))
+        assert files <= {'cache.sqlite3', 'cache.sqlite3-wal', 'cache.sqlite3-shm', 'cache.sqlite3.init.lock'}, files
+        assert first._connection().execute('SELECT COUNT(*) FROM refreshes').fetchone()[0] == 0
+
+        # Reserva que ninguém vai liberar: só outra depois do prazo
+        first.refresh_lease = 0.05
+        assert first.try_begin_refresh('/members/email/x@exemplo.com')
+        assert not second.try_begin_refresh('/members/email/x@exemplo.com')
+        time.sleep(0.1)
+        assert second.try_begin_refresh('/members/email/x@exemplo.com')
+        # O dono antigo não apaga a reserva que passou para o outro
+        first.end_refresh('/members/email/x@exemplo.com')
+        assert not first.try_begin_refresh('/members/email/x@exemplo.com')
+        second.end_refresh('/members/email/x@exemplo.com')
+
+
+class RecordingSharedCache(SharedFileCache):
+    """SharedFileCache que anota a thread de cada acesso ao arquivo"""
+
+    threads = set()
+
+    def _connection(self):
+        RecordingSharedCache.threads.add(threading.get_ident())
+        return super()._connection()
+
+
+class AsyncBackend(AsyncAmpeliAPIService):
+    async def _make_request(self, method, endpoint, data=None):
+        return MEMBERS
+
+
+def test_async_service_keeps_sqlite_off_the_event_loop():
+    """Com o cache compartilhado, o serviço assíncrono acessa o SQLite em threads"""
+    path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+    backend = 'test_shared_cache.RecordingSharedCache'
+    # Rodando como script a classe configurada é a do módulo importado, não a de __main__
+    threads = import_string(backend).threads
+    with override_settings(AMPELI_API_CACHE={**settings.AMPELI_API_CACHE, 'BACKEND': backend, 'SHARED_PATH': path}):
+        cache_module._caches.clear()
+        threads.clear()
+
+        async def run():
+            loop_thread = threading.get_ident()
+            service = AsyncBackend()
+            assert await service._cached_get('member', '/members/1') == MEMBERS
+            assert await service._cached_get('member', '/members/1') == MEMBERS
+            return loop_thread
+
+        loop_thread = asyncio.run(run())
+        assert threads and loop_thread not in threads
+        cache_module._caches.clear()
+
+
+if __name__ == "__main__":
+    test_values_and_generation_shared_between_instances()
+    test_cache_file_is_private()
+    test_single_fetch_across_processes()
+    test_owner_commit_between_poll_and_reservation()
+    test_refresh_leases_leave_no_files_and_expire()
+    test_async_service_keeps_sqlite_off_the_event_loop()
+    print("OK - Testes do cache compartilhado passaram!")